@@ -1,67 +1,113 @@
 import csv
+import math
 import os
-import re
-from tabulate import tabulate
+from rendering import render_table, rows_needed
+from patterns import action_keywords
+from gherkin_parser import iter_feature_files
+from findings import snippet_hash
 
-def find_absence_background(feature_filenames, feature_files, csv_filename=None):
+# Bump whenever a change to the analysis can change the per-file results kept in the cache
+analysis_version = 3
+
+# Default share of the scenarios of a feature that must start with the same Given steps
+background_fraction = 1.0
+
+
+class AbsentBackgrounds:
+    """
+    The Given steps shared by enough scenarios of a file to belong in a background: its id,
+    the steps, number of scenarios starting with them and position of the first of them of
+    each prefix, and the number of scenarios of the file.
+    """
+    __slots__ = ("file_id", "prefixes", "scenarios")
+
+    def __init__(self, file_id, prefixes, scenarios):
+        self.file_id = file_id
+        self.prefixes = prefixes
+        self.scenarios = scenarios
+
+def find_absence_background(feature_filenames, feature_files, csv_filename=None, fraction=None):
     """
     Finds all the absence of background in the feature file.
 
     Args:
     - feature_filenames (list of str): The names of the feature files.
-    - feature_files (list of str): The content of the feature files.
+    - feature_files (list of str or Document): The content of the feature files.
     - csv_filename (str, optional): Name of the CSV file to save the report.
+    - fraction (float, optional): Share of the scenarios that must start with the same Given
+      steps, `background_fraction` by default.
 
     Returns:
     - None
     """
-    scenario_pattern = r"(Scenario:[\s\S]*?)(?=(?:([@#]\S*?)?Scenario:)|(?:([@#]\S*?)?Scenario Outline:)|(?:([@#]\S*?)?Example:)|(?:([@#]\S*?)?Rule:)|$)"
-    scenario_outline_pattern = r"(Scenario Outline:[\s\S]*?)(?=(?:([@#]\S*?)?Scenario:)|(?:([@#]\S*?)?Scenario Outline:)|(?:([@#]\S*?)?Example:)|(?:([@#]\S*?)?Rule:)|$)"
-    example_pattern = r"(Example:[\s\S]*?)(?=(?:([@#]\S*?)?Scenario:)|(?:([@#]\S*?)?Scenario Outline:)|(?:([@#]\S*?)?Example:)|(?:([@#]\S*?)?Rule:)|$)"
-    step_pattern = r"(?:Scenario:|Scenario Outline:|Example:)[\s\S]*?(?:(Given[\s\S]*?|And[\s\S]*?))(?=When|Then|Scenario:|Scenario Outline:|Example:|Examples:|Rule:|$)"
-    partition_pattern = r"(?:Given\s|And\s|But\s)"
+    # Documents are parsed and analyzed one at a time and the reports only keep the results
+    documents = iter_feature_files(feature_files)
+    report_absence_background(feature_filenames, (analyze_absence_background(document) for document in documents), csv_filename, fraction)
 
-    total_scenarios = []
-    total_scenario_pattern = r"^\s*(Scenario:|Example:|Scenario Outline:)\s*(.+)$"
 
-    absences_backgrounds = []
-    total_absence_backgrounds = 0
-    for feature_index, (filename, feature_file) in enumerate(zip(feature_filenames, feature_files)):
-        lines = feature_file.splitlines()
-        for idx, line in enumerate(lines, start=1):  # Enumerate lines with 1-based index
-            # Match Rule, Scenario, Example, and Scenario Outline titles
-            match_structure(line, total_scenarios, total_scenario_pattern)
+def analyze_absence_background(document):
+    """
+    Finds the Given step prefixes shared by several scenarios of a single parsed feature file.
+    The result does not depend on the reported fraction, which is only applied by the report.
+
+    Args:
+    - document (Document): The parsed feature file.
 
-        # Find scenarios into feature
-        scenarios = [match[0].strip() for match in re.findall(scenario_pattern, feature_file)]
-        scenarios_outline = [match[0].strip() for match in re.findall(scenario_outline_pattern, feature_file)]
-        examples = [match[0].strip() for match in re.findall(example_pattern, feature_file)]
+    Returns:
+    - tuple: Shared prefixes, as (steps, number of scenarios starting with them, largest number
+      of scenarios sharing a longer prefix, line and column of the prefix in the first scenario
+      starting with it), and the number of scenarios of the file.
+    """
+    # Scenarios, Scenario Outlines and Examples of the feature
+    prefixes = shared_prefixes(given_prefixes(document.scenarios))
+    return ([(steps, count, longer_count, line, document.indentation_column(line)) for steps, count, longer_count, line in prefixes],
+            len(document.scenarios))
 
-        # Calculating all feature scenarios
-        total_scenarios_feature = scenarios + scenarios_outline + examples
 
-        total_absence_backgrounds = absence_analysis(filename, total_scenarios_feature, step_pattern, partition_pattern,
-                                                     absences_backgrounds, len(total_scenarios), total_absence_backgrounds)
-        total_scenarios.clear()
+def report_absence_background(feature_filenames, analyses, csv_filename=None, fraction=None):
+    """
+    Merges the per-file results of analyze_absence_background and reports them.
 
-    if absences_backgrounds:
-        # Transforming absences_backgrounds into a string
-        for register in absences_backgrounds:
-            register["absence_background"] = '\n'.join(register["absence_background"])
+    Args:
+    - feature_filenames (list of str): The names of the feature files.
+    - analyses (iterable): The result of analyze_absence_background for each file, in the same order.
+    - csv_filename (str, optional): Name of the CSV file to save the report.
+    - fraction (float, optional): Share of the scenarios that must start with the same Given
+      steps, `background_fraction` by default.
 
-        report_data = [
-            [absence_background["filename"], absence_background["absence_background"], absence_background["scenarios"]]
-            for absence_background in absences_backgrounds
-        ]
+    Returns:
+    - int: Number of findings reported.
+    """
+    if fraction is None:
+        fraction = background_fraction
+
+    absences_backgrounds = []
+    total_absence_backgrounds = 0
+    for file_id, (prefixes, total_scenarios) in enumerate(analyses):
+        absent_prefixes = absent_backgrounds(prefixes, total_scenarios, fraction)
+        if absent_prefixes:
+            absences_backgrounds.append(AbsentBackgrounds(file_id, absent_prefixes, total_scenarios))
+        total_absence_backgrounds += sum(count for _, count, _, _ in absent_prefixes)
+
+    if absences_backgrounds:
+        # The filenames and steps are only formatted here, when shown or saved
+        report_data = None
+        if rows_needed(csv_filename):
+            report_data = [
+                [feature_filenames[absence_background.file_id],
+                 '\n'.join(absence_message(steps, count) for steps, count, _, _ in absence_background.prefixes),
+                 absence_background.scenarios]
+                for absence_background in absences_backgrounds
+            ]
 
         print(f"- Total number of absence backgrounds: {total_absence_backgrounds}")
-        print(tabulate(report_data, headers=["Filename", "Absence Background", "Scenarios"], tablefmt="grid"))
+        render_table(report_data, ["Filename", "Absence Background", "Scenarios"], count=len(absences_backgrounds))
 
         # Generate CSV if filename is provided
         if csv_filename:
-            report_dir = './reports'
-            if not os.path.exists(report_dir):
-                os.mkdir(report_dir)
+            report_dir = os.path.dirname(csv_filename)
+            if report_dir and not os.path.exists(report_dir):
+                os.makedirs(report_dir)
 
             file_exists = os.path.isfile(csv_filename)  # Check if file already exists
             with open(csv_filename, mode='a', newline='', encoding='utf-8') as csvfile:
@@ -73,77 +119,93 @@ def find_absence_background(feature_filenames, feature_files, csv_filename=None)
     else:
         print("No registers with absence of background.")
 
+    return len(absences_backgrounds)
 
-def match_structure(line, total_list, pattern):
-    match = re.match(pattern, line)
-    if match:
-        _, title_name = match.groups()  # Extract the title part after the colon
-        normalized_title = title_name.strip()  # Normalize by trimming whitespace
-
-        total_list.append(normalized_title)
-
-
-def absence_analysis(filename, registers, step_pattern, partition_pattern, absences_backgrounds, total_scenarios, total_absence_backgrounds):
-    steps_scenarios_feature = []
-    for register_index, register in enumerate(registers):
-        registers[register_index] = re.sub("\n\n", "\n", register)
-
-    for register_index, register in enumerate(registers):
-        register = register.strip()
-        untreated_steps_scenarios = re.findall(step_pattern, register)
-
-        for untreated_steps_scenario in untreated_steps_scenarios:
-            untreated_steps_scenario = untreated_steps_scenario.strip()
-            steps_scenario = [step.strip() for step in re.split(partition_pattern, untreated_steps_scenario) if step.strip()]
-
-            steps_scenarios_feature.append(steps_scenario)
 
-    absence_counts = absence_counter(steps_scenarios_feature)
+def iter_absence_background_findings(feature_filenames, analyses, fraction=None):
+    """
+    Yields the Given steps shared by enough scenarios of a file to belong in a background, from
+    the per-file results of analyze_absence_background, as the results arrive.
 
-    total_absence_backgrounds = absence_structure(filename, absence_counts, absences_backgrounds,
-                                                  total_scenarios, total_absence_backgrounds)
-    return total_absence_backgrounds
+    Args:
+    - feature_filenames (list of str): The names of the feature files.
+    - analyses (iterable): The result of analyze_absence_background for each file, in the same order.
+    - fraction (float, optional): Share of the scenarios that must start with the same Given
+      steps, `background_fraction` by default.
 
+    Returns:
+    - generator of tuples: Filename, line and column of the steps in the first scenario starting
+      with them, message and snippet hash of each finding.
+    """
+    if fraction is None:
+        fraction = background_fraction
 
-def absence_counter(steps_scenarios_feature):
-    # Using the biggest scenario to increment
-    biggest_scenario = max(steps_scenarios_feature, key=len, default=[])
+    for filename, (prefixes, total_scenarios) in zip(feature_filenames, analyses):
+        for steps, count, line, column in absent_backgrounds(prefixes, total_scenarios, fraction):
+            yield filename, line, column, absence_message(steps, count), snippet_hash("\n".join(steps))
 
-    # Going through the list by largest size and reducing loops
-    step_counts = {}
-    for size in range(len(biggest_scenario), 0, -1):
-        # Counting occurrences
-        step_counts.clear()
-        for steps_scenario in steps_scenarios_feature:
-            key = tuple(steps_scenario[:size])
-            if key in step_counts:
-                step_counts[key] += 1
-            else:
-                step_counts[key] = 1
 
-        # Checking if step_counts meets criteria
-        if max(step_counts.values(), default=0) >= len(steps_scenarios_feature):
-            return step_counts
+def given_prefixes(scenarios):
+    steps_scenarios_feature = []
+    for scenario in scenarios:
+        # Given steps (and their And/But continuations) before the first When or Then
+        steps_scenario = []
+        for step in scenario.steps:
+            if step.keyword in action_keywords:
+                break
+            steps_scenario.append(step.full_text)
 
-    return step_counts
+        if steps_scenario:
+            steps_scenarios_feature.append((steps_scenario, scenario.steps[0].line))
+    return steps_scenarios_feature
 
 
-def absence_structure(filename, absence_counts, absences_backgrounds, total_scenarios, total_absence_backgrounds):
-    absence_background = []
-    for step, count in absence_counts.items():
-        if count >= total_scenarios > 1:
-            formatted_step = "\n ".join(line.strip() for line in step)
-            absence_background.append(f"'{formatted_step}' appears {count} times")
-            total_absence_backgrounds += count
+def shared_prefixes(steps_scenarios_feature):
+    """
+    Builds a prefix trie of the Given steps of the scenarios in one pass over the steps, and
+    keeps the prefixes that a longer prefix cannot replace: those shared by more scenarios
+    than any of their extensions.
 
-    if absence_background:
-        absences_backgrounds.append({
-            "filename": filename,
-            "absence_background": absence_background,
-            "scenarios": total_scenarios
-        })
-    return total_absence_backgrounds
+    Args:
+    - steps_scenarios_feature (list of tuples): The Given steps of each scenario and the line
+      of the first of them.
 
+    Returns:
+    - list of tuples: (steps, count, largest count of an extension, line of the steps in the
+      first scenario starting with them) of each prefix shared by at least two scenarios, in
+      trie order.
+    """
+    # Each node is [number of scenarios going through it, children by step, line of the
+    # prefix in the first of them]
+    root = [0, {}, None]
+    for steps_scenario, line in steps_scenarios_feature:
+        node = root
+        for step in steps_scenario:
+            node = node[1].setdefault(step, [0, {}, line])
+            node[0] += 1
+
+    prefixes = []
+    pending = [(child, [step]) for step, child in reversed(root[1].items())]
+    while pending:
+        (count, children, line), steps = pending.pop()
+        if count < 2:
+            continue
+        longer_count = max((child[0] for child in children.values()), default=0)
+        if longer_count < count:
+            prefixes.append((steps, count, longer_count, line))
+        pending.extend((child, steps + [step]) for step, child in reversed(children.items()))
+    return prefixes
+
+
+def absent_backgrounds(prefixes, total_scenarios, fraction):
+    # The longest prefixes shared by at least the fraction of the scenarios, i.e. those whose
+    # extensions are all shared by fewer scenarios than required
+    required = max(2, math.ceil(fraction * total_scenarios - 1e-9))
+    return [(steps, count, line, column) for steps, count, longer_count, line, column in prefixes if count >= required > longer_count]
+
+def absence_message(steps, count):
+    formatted_step = "\n ".join(line.strip() for line in steps)
+    return f"'{formatted_step}' appears {count} times"
 
 # Example usage
 feature_files_example = [
@@ -0,0 +1,246 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from tabulate import tabulate
+import runner
+from untitled_feature import find_untitled_features
+from duplicate_feature_title import find_duplicate_feature_titles
+from duplicate_scenario_title import find_duplicate_scenario_titles
+from duplicate_test_case import find_duplicate_test_cases
+from near_duplicate_test_case import find_near_duplicate_test_cases
+from absence_background import find_absence_background
+from vicious_tag import find_vicious_tags
+from duplicate_step import find_duplicate_steps
+from starting_with_the_left_foot import find_starting_with_the_left_foot
+from malformed_test import find_malformed_test
+
+# Each find_* function parses, analyzes and reports a whole corpus by itself
+find_functions = {
+    "find_untitled_features": find_untitled_features,
+    "find_duplicate_feature_titles": find_duplicate_feature_titles,
+    "find_duplicate_scenario_titles": find_duplicate_scenario_titles,
+    "find_duplicate_test_cases": find_duplicate_test_cases,
+    "find_near_duplicate_test_cases": find_near_duplicate_test_cases,
+    "find_absence_background": find_absence_background,
+    "find_vicious_tags": find_vicious_tags,
+    "find_duplicate_steps": find_duplicate_steps,
+    "find_starting_with_the_left_foot": find_starting_with_the_left_foot,
+    "find_malformed_test": find_malformed_test,
+}
+
+# Directory of the results by default, next to this script and ignored by git
+results_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+
+words = ["user", "account", "order", "payment", "cart", "item", "page", "button", "email", "password",
+         "admin", "report", "invoice", "search", "result", "profile", "message", "session", "token", "file"]
+
+def step_pool(rng, size):
+    # Step texts drawn by the scenarios, so some steps and bodies repeat as in real projects
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(3, 8))) for _ in range(size)]
+
+def scenario(rng, pool, index, tags=0, outline=False, docstring_lines=0, table_rows=0):
+    lines = []
+    if tags:
+        lines.append("  " + " ".join(f"@tag{rng.randrange(tags * 2)}" for _ in range(tags)))
+    lines.append(f"  {'Scenario Outline' if outline else 'Scenario'}: scenario {index} {rng.choice(pool)}")
+
+    # Mostly well-formed scenarios, with a few repeated steps and left feet for the detectors
+    keywords = ["Given", "And", "When", "Then", "And"][:rng.randint(3, 5)]
+    if rng.random() < 0.1:
+        keywords[0] = "Then"
+    for position, keyword in enumerate(keywords):
+        text = rng.choice(pool)
+        if outline and position == 0:
+            text += " <value>"
+        lines.append(f"    {keyword} {text}")
+        if position == 0 and docstring_lines:
+            lines.append('      """')
+            lines.extend(f"      {rng.choice(pool)}" for _ in range(docstring_lines))
+            lines.append('      """')
+        if keyword == "When" and table_rows:
+            lines.extend(f"      | {rng.choice(words)} | {row} |" for row in range(table_rows))
+    if rng.random() < 0.05:
+        lines.append(lines[-1])
+
+    if outline:
+        lines.append("    Examples:")
+        lines.append("      | value |")
+        lines.extend(f"      | {rng.choice(words)}{row} |" for row in range(max(table_rows, 2)))
+    return "\n".join(lines)
+
+def feature_file(rng, pool, index, scenarios, **options):
+    # A few untitled features and shared titles, the rest unique
+    roll = rng.random()
+    title = "" if roll < 0.02 else "shared title" if roll < 0.1 else f"feature {index}"
+    body = "\n\n".join(scenario(rng, pool, number, **options) for number in range(scenarios))
+    return f"Feature: {title}\n\n{body}\n"
+
+# Shapes of corpora: (number of files, scenarios per file, scenario options), for a scale of 1
+corpus_shapes = {
+    "many small files": lambda scale: (200 * scale, 2, {}),
+    "few huge files": lambda scale: (2, 200 * scale, {}),
+    "tag heavy": lambda scale: (20 * scale, 10, {"tags": 8}),
+    "outline heavy": lambda scale: (20 * scale, 10, {"outline": True, "table_rows": 10}),
+    "docstrings and tables": lambda scale: (20 * scale, 10, {"docstring_lines": 30, "table_rows": 10}),
+}
+
+def generate_corpus(shape, scale, seed):
+    """
+    Generates a synthetic corpus, the same for the same arguments.
+
+    Args:
+    - shape (str): Key of corpus_shapes.
+    - scale (int): Multiplies the size of the corpus.
+    - seed (int): Seed of the generator.
+
+    Returns:
+    - list of tuples: Filename and content of each feature file.
+    """
+    rng = random.Random(f"{seed}:{shape}:{scale}")
+    files, scenarios, options = corpus_shapes[shape](scale)
+    pool = step_pool(rng, 50 * scale)
+    return [(f"file{index}.feature", feature_file(rng, pool, index, scenarios, **options)) for index in range(files)]
+
+def best_time(run, repeat):
+    # Best of several runs with the reports thrown away, the printing is still measured
+    best = float("inf")
+    with open(os.devnull, "w", encoding="utf-8") as devnull, redirect_stdout(devnull):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - start)
+    return best
+
+def time_paths(corpus, repeat):
+    # The whole pipeline on the corpus written to disk, as a project of a temporary directory
+    root = tempfile.mkdtemp()
+    project = os.path.join(root, "project")
+    report_dir = os.path.join(root, "reports")  # The CSV reports go to the temporary directory too
+    try:
+        os.makedirs(project)
+        for filename, content in corpus:
+            with open(os.path.join(project, filename), "w", encoding="utf-8") as file:
+                file.write(content)
+        return best_time(lambda: (shutil.rmtree(report_dir, ignore_errors=True), runner.execute_paths([project], report_dir=report_dir)), repeat)
+    finally:
+        shutil.rmtree(root)
+
+def run_benchmark(shapes, scales, seed, repeat):
+    """
+    Times every find_* function and runner.execute_paths on each corpus shape at each scale.
+
+    Args:
+    - shapes (list of str): Keys of corpus_shapes.
+    - scales (list of int): Scales of the corpora, in ascending order.
+    - seed (int): Seed of the corpora.
+    - repeat (int): Number of measures per target, the best one is kept.
+
+    Returns:
+    - list of dicts: One measure per shape, scale and target.
+    """
+    measures = []
+    for shape in shapes:
+        for scale in scales:
+            corpus = generate_corpus(shape, scale, seed)
+            filenames = [filename for filename, _ in corpus]
+            feature_files = [content for _, content in corpus]
+            size = {
+                "shape": shape,
+                "scale": scale,
+                "files": len(corpus),
+                "lines": sum(content.count("\n") for content in feature_files),
+                "bytes": sum(len(content.encode("utf-8")) for content in feature_files),
+            }
+            for target, find in find_functions.items():
+                seconds = best_time(lambda: find(filenames, feature_files), repeat)
+                measures.append({**size, "target": target, "seconds": seconds})
+            measures.append({**size, "target": "execute_paths", "seconds": time_paths(corpus, repeat)})
+    return measures
+
+def growth_report(measures, max_growth):
+    """
+    Compares the time per line of each target between the smallest and the largest scale of
+    each shape. A ratio well above 1 means the target grows faster than its input.
+
+    Args:
+    - measures (list of dicts): The result of run_benchmark.
+    - max_growth (float): Largest accepted ratio.
+
+    Returns:
+    - list of dicts: Shape, target, ratio and whether it is flagged as super-linear.
+    """
+    series = {}
+    for measure in measures:
+        series.setdefault((measure["shape"], measure["target"]), []).append(measure)
+
+    growths = []
+    for (shape, target), points in series.items():
+        smallest = min(points, key=lambda point: point["scale"])
+        largest = max(points, key=lambda point: point["scale"])
+        ratio = (largest["seconds"] / largest["lines"]) / (smallest["seconds"] / smallest["lines"])
+        growths.append({"shape": shape, "target": target, "growth": ratio, "super_linear": ratio > max_growth})
+    return growths
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare_with(baseline_filename, measures):
+    # Ratio of the new time to the baseline time of the same measures, above 1 being slower
+    with open(baseline_filename, encoding="utf-8") as file:
+        baseline = {(measure["shape"], measure["scale"], measure["target"]): measure["seconds"]
+                    for measure in json.load(file)["measures"]}
+    return [[measure["shape"], measure["scale"], measure["target"], f"{measure['seconds'] / baseline[key]:.2f}"]
+            for measure in measures
+            if (key := (measure["shape"], measure["scale"], measure["target"])) in baseline]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of every detector and of the whole pipeline on seeded synthetic corpora.")
+    parser.add_argument("--shapes", nargs="+", choices=list(corpus_shapes), default=list(corpus_shapes))
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-growth", type=float, default=3.0,
+                        help="largest accepted growth of the time per line between the smallest and largest scale")
+    parser.add_argument("--output", default=os.path.join(results_dir, "benchmark_corpus.json"),
+                        help="JSON file the results are saved to (default: benchmark_corpus.json in the benchmarks directory next to this script)")
+    parser.add_argument("--baseline", default=None, help="JSON results of a previous run to compare with")
+    args = parser.parse_args()
+
+    measures = run_benchmark(args.shapes, sorted(args.scales), args.seed, args.repeat)
+    growths = growth_report(measures, args.max_growth)
+
+    print(tabulate([[measure["shape"], measure["scale"], measure["files"], measure["lines"], measure["target"],
+                     f"{measure['seconds'] * 1000:.1f}"] for measure in measures],
+                   headers=["Corpus", "Scale", "Files", "Lines", "Target", "Time (ms)"], tablefmt="grid"))
+    print(tabulate([[growth["shape"], growth["target"], f"{growth['growth']:.2f}", "super-linear" if growth["super_linear"] else ""]
+                    for growth in growths],
+                   headers=["Corpus", "Target", "Growth per line", ""], tablefmt="grid"))
+    if args.baseline:
+        print(tabulate(compare_with(args.baseline, measures), headers=["Corpus", "Scale", "Target", "Time / baseline"], tablefmt="grid"))
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump({"commit": current_commit(), "python": platform.python_version(), "seed": args.seed,
+                   "scales": sorted(args.scales), "repeat": args.repeat, "measures": measures, "growths": growths}, file, indent=2)
+    print(f"Results saved to {args.output}.")
+
+    if any(growth["super_linear"] for growth in growths):
+        print("Some targets grow faster than their input.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import re
+import time
+from tabulate import tabulate
+from runner import expand_paths
+from read_file import read_files
+import line_classifier
+import patterns
+
+# The block and step patterns the parser tried on every line before the line classifier, kept
+# here as the reference the dispatch tables are measured against
+keyword_pattern = re.compile(r"^\s*(Feature|Rule|Background|Scenario Outline|Scenario Template|Scenario|Examples|Scenarios|Example):(.*)$")
+step_pattern = re.compile(r"^\s*(Given|When|Then|And|But|\*)(?:\s+(.*)|$)")
+
+def pattern_classify(keyword_match, step_match):
+    # Classification of a line trying one pattern after the other, as the parser did
+    def classify(line):
+        stripped = line.strip()
+        if not stripped:
+            return line_classifier.blank, stripped
+        if stripped.startswith("#"):
+            return line_classifier.comment, stripped
+        if stripped.startswith("@"):
+            return line_classifier.tag, stripped
+        match = keyword_match(line)
+        if match:
+            return match.group(1), match.group(2).strip()
+        if stripped.startswith("|"):
+            return line_classifier.table_row, stripped
+        match = step_match(line)
+        if match:
+            return match.group(1), (match.group(2) or "").strip()
+        if stripped.startswith('"""') or stripped.startswith("```"):
+            return line_classifier.docstring_delimiter, stripped[:3]
+        return line_classifier.text, stripped
+    return classify
+
+# Ways of classifying a line, the dispatch tables of the parser first
+classifiers = {
+    "dispatch tables": line_classifier.classify_line,
+    "precompiled patterns": pattern_classify(keyword_pattern.match, step_pattern.match),
+    "re module functions": pattern_classify(lambda line: re.match(keyword_pattern.pattern, line),
+                                            lambda line: re.match(step_pattern.pattern, line)),
+}
+
+def time_calls(function, lines, repeat):
+    """
+    Times a function called on each line.
+
+    Args:
+    - function (callable): Function taking a single line.
+    - lines (list of str): The lines.
+    - repeat (int): Number of measures, the best one is kept.
+
+    Returns:
+    - float: Best time in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            function(line)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def line_groups(lines):
+    # The lines by kind, as the dispatch tables classify them, after all the lines together.
+    # Doc string contents are classified as any other line here.
+    groups = {"all": lines}
+    for line in lines:
+        kind, _ = line_classifier.classify_line(line)
+        group = "keyword" if kind in line_classifier.block_kinds else "step" if kind in line_classifier.step_kinds else kind
+        groups.setdefault(group, []).append(line)
+    return groups
+
+def run_benchmark(lines, repeat):
+    """
+    Compares classifying the lines with the dispatch tables of the line classifier against
+    trying the block and step patterns one after the other, precompiled or through re.match,
+    which looks the compiled pattern up in the cache of the re module on every call. Also
+    compares the precompiled tag pattern with re.findall on the tag lines.
+
+    Args:
+    - lines (list of str): The lines of the feature files.
+    - repeat (int): Number of measures per classifier and group of lines.
+
+    Returns:
+    - None
+    """
+    # The classifiers must agree before they are compared
+    for name, classify in classifiers.items():
+        for line in lines:
+            if classify(line) != line_classifier.classify_line(line):
+                raise ValueError(f"{name} classifies {line!r} as {classify(line)}, not {line_classifier.classify_line(line)}")
+
+    report_data = []
+    for group, group_lines in line_groups(lines).items():
+        times = [time_calls(classify, group_lines, repeat) / len(group_lines) * 1e9 for classify in classifiers.values()]
+        report_data.append([group, len(group_lines), *(f"{ns:.0f}" for ns in times)])
+
+    tag_lines = [line.strip() for line in lines if line.lstrip().startswith("@")]
+    if tag_lines:
+        precompiled = time_calls(patterns.tag_pattern.findall, tag_lines, repeat)
+        cached = time_calls(lambda line: re.findall(patterns.tag_pattern.pattern, line), tag_lines, repeat)
+        report_data.append(["tag findall", len(tag_lines), "", f"{precompiled / len(tag_lines) * 1e9:.0f}",
+                            f"{cached / len(tag_lines) * 1e9:.0f}"])
+
+    print(f"{len(lines)} lines")
+    print(tabulate(report_data, headers=["Lines", "Count", *(f"{name} (ns/line)" for name in classifiers)], tablefmt="grid"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark of the line classifier against the patterns it replaced.")
+    parser.add_argument("paths", nargs="*", default=["../opencypher_openCypher"],
+                        help="feature files, directories or globs whose lines are classified (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    filenames = expand_paths(args.paths)
+    lines = [line for content in read_files(filenames) for line in content.split("\n")]
+    run_benchmark(lines, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import sys
+import time
+from tabulate import tabulate
+from gherkin_parser import parse_feature_file
+from duplicate_step import analyze_duplicate_steps
+
+def tags_and_comments(size):
+    # Every step argument holds tags and comment markers, and a scenario only comes at the end
+    steps = "\n".join(f"    And user @user{i} posts #{{id}} with tag @tag{i} # not a comment" for i in range(size))
+    tags = "\n".join(f"  @tag{i} @other{i}\n  # comment {i}" for i in range(size))
+    return f"Feature: Tags\n  Scenario: First\n    Given a start\n{steps}\n{tags}\n  Scenario: Last\n    Given an end\n"
+
+def long_docstrings(size):
+    # A single doc string full of keywords, tags and comments that must not split the scenario
+    body = "\n".join(f"      @tag{i} Scenario: not a scenario # Given {i} When Then And But" for i in range(size))
+    return f'Feature: Doc strings\n  Scenario: First\n    Given a document:\n      """\n{body}\n      """\n    Then it is stored\n'
+
+def large_tables(size):
+    # A data table and an Examples table with one row per size unit
+    rows = "\n".join(f"      | Given {i} | @tag{i} | #{i} |" for i in range(size))
+    return (f"Feature: Tables\n  Scenario Outline: First\n    Given the rows:\n{rows}\n    Then <value> is used\n"
+            f"    Examples:\n      | value |\n{rows}\n")
+
+def keywords_in_words(size):
+    # Step texts containing Given/When/Then/And/But inside other words
+    steps = "\n".join(f"    And Android device {i} Whenever Thenceforth Butterfly Given{i}" for i in range(size))
+    return f"Feature: Words\n  Scenario: First\n    Given a start\n{steps}\n    Then Android stops\n"
+
+adversarial_inputs = {
+    "tags and comments": tags_and_comments,
+    "long doc strings": long_docstrings,
+    "large tables": large_tables,
+    "keywords in words": keywords_in_words,
+}
+
+def time_segmentation(feature_file, repeat):
+    """
+    Times the segmentation of a feature file and the duplicate step analysis built on it.
+
+    Args:
+    - feature_file (str): The content of the feature file.
+    - repeat (int): Number of measures, the best one is kept.
+
+    Returns:
+    - float: Best time in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        analyze_duplicate_steps(parse_feature_file(feature_file))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run_benchmark(sizes, repeat, max_growth):
+    """
+    Times every adversarial input at increasing sizes and checks that the time per line stays
+    bounded, i.e. that segmentation stays linear in the size of the file.
+
+    Args:
+    - sizes (list of int): Sizes of the generated inputs, in ascending order.
+    - repeat (int): Number of measures per input.
+    - max_growth (float): Largest accepted ratio between the time per line of the biggest
+      and of the smallest input.
+
+    Returns:
+    - bool: True if every input stayed within the bound.
+    """
+    report_data = []
+    linear = True
+    for name, generate in adversarial_inputs.items():
+        times_per_line = []
+        for size in sizes:
+            feature_file = generate(size)
+            seconds = time_segmentation(feature_file, repeat)
+            times_per_line.append(seconds / feature_file.count("\n"))
+            report_data.append([name, size, feature_file.count("\n"), f"{seconds * 1000:.2f}"])
+
+        growth = times_per_line[-1] / times_per_line[0]
+        report_data[-1].append(f"{growth:.2f}")
+        if growth > max_growth:
+            linear = False
+
+    print(tabulate(report_data, headers=["Input", "Size", "Lines", "Time (ms)", "Growth per line"], tablefmt="grid"))
+    return linear
+
+def main():
+    parser = argparse.ArgumentParser(description="Regression benchmark of feature file segmentation on adversarial inputs.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 1000, 2000, 4000, 8000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-growth", type=float, default=3.0,
+                        help="largest accepted growth of the time per line between the smallest and biggest input")
+    args = parser.parse_args()
+
+    if run_benchmark(args.sizes, args.repeat, args.max_growth):
+        print("Segmentation time grows linearly with the input size.")
+    else:
+        print("Segmentation time grows faster than the input size.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
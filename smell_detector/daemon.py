@@ -0,0 +1,388 @@
+import argparse
+import ctypes
+import ctypes.util
+import glob
+import io
+import json
+import os
+import select
+import socket
+import struct
+import time
+from contextlib import redirect_stdout
+import engine
+import runner
+from detector_registry import detector_names, select_detectors, combined_needs
+from discovery import discover_feature_files, glob_match, is_selected
+from incremental import path_order
+from utils import title
+
+# inotify flags, see inotify(7)
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+watch_mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+event_header = struct.Struct("iIII")  # wd, mask, cookie, len
+
+# Seconds a client waits for the answer of the daemon, and the daemon for the request of a client
+client_timeout = 60.0
+
+class Corpus:
+    """
+    Per-file analyzer results of every feature file of the watched paths, kept in memory so a
+    change only costs the analysis of the changed file and queries only cost the reports. The
+    paths are given as on the command line of main.py, see runner.expand_paths, and the files
+    are named by their path, as in its reports. Only the detectors chosen when starting it
+    analyze the files and can be reported.
+    """
+    def __init__(self, jobs=1, cache_dir=None, extension=".feature", include=None, exclude=None, detector_names=None):
+        self.detectors = select_detectors(detector_names)
+        self.analyzers = runner.analyzers(self.detectors)
+        self.needs = combined_needs(self.detectors)
+        self.cache_dir = cache_dir
+        self.results = {}  # Filename -> result of each analyzer
+        self.jobs = jobs
+        self.extension = extension
+        self.include = include
+        self.exclude = exclude
+        self.paths = []
+
+    def add_paths(self, paths):
+        # Analyzed as the directories are walked
+        filename_groups = runner.path_groups(paths, self.extension, self.include, self.exclude)
+        self.paths.extend(paths)
+        items = ((filename, filename) for filenames in filename_groups for filename in filenames)
+        for filename, results in engine.iter_keyed_analyses(items, self.analyzers, self.jobs, self.cache_dir, self.needs):
+            self.results[filename] = results
+
+    def selects(self, filename):
+        # Whether runner.expand_paths would find a changed file from the paths (the .gitignore
+        # files aside)
+        for path in self.paths:
+            if glob.has_magic(path):
+                if glob_match(filename, path):
+                    return True
+            elif os.path.isdir(path):
+                directory = path.rstrip("/") + "/"
+                if (filename.startswith(directory) and filename.endswith(self.extension)
+                        and is_selected(filename[len(directory):], self.include, self.exclude)):
+                    return True
+            elif filename == path:
+                return True
+        return False
+
+    def update(self, filename):
+        # Analyzes a created or modified file again, or forgets it when it is gone
+        try:
+            self.results[filename] = engine.analyze_file(filename, self.analyzers, self.cache_dir, self.needs)
+        except (OSError, UnicodeDecodeError):
+            self.results.pop(filename, None)
+
+    def remove_directory(self, directory):
+        prefix = directory.rstrip("/") + "/"
+        for filename in [name for name in self.results if name.startswith(prefix)]:
+            del self.results[filename]
+
+    def report(self, detector_names=None, filenames=None):
+        """
+        Runs the reports of the detectors on the results in memory.
+
+        Args:
+        - detector_names (list of str, optional): Command-line names of the detectors to run, as
+          with main.py --detector, all the detectors of the corpus by default.
+        - filenames (list of str, optional): Filenames the per-file smells are reported for, all
+          by default. Cross-file smells are always reported against every file.
+
+        Returns:
+        - str: The reports.
+
+        Raises:
+        - ValueError: If a name is not in the registry or its detector does not analyze the corpus.
+        """
+        selected_detectors = self.detectors if detector_names is None else select_detectors(detector_names)
+        missing = [detector.name for detector in selected_detectors if detector not in self.detectors]
+        if missing:
+            raise ValueError(f"detectors not run by the daemon: {', '.join(missing)}, start it with --detector to run them")
+        indexed_filenames = sorted(self.results, key=path_order)
+        selected_filenames = indexed_filenames if filenames is None else [name for name in filenames if name in self.results]
+        output = io.StringIO()
+        with redirect_stdout(output):
+            for position, detector in enumerate(self.detectors):
+                if detector not in selected_detectors:
+                    continue
+                names = indexed_filenames if detector.cross_file else selected_filenames
+                title(detector.title, "blue")
+                detector.report(names, [self.results[name][position] for name in names])
+        return output.getvalue()
+
+
+def watched_directories(root):
+    for directory, subdirectories, _ in os.walk(root):
+        subdirectories[:] = [name for name in subdirectories if name != ".git"]
+        yield directory
+
+
+class InotifyWatcher:
+    """
+    Watches directory trees with inotify, through ctypes so no extra package is needed.
+    """
+    def __init__(self, roots):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = {}  # Watch descriptor -> directory
+        for root in roots:
+            self.watch_tree(root)
+
+    def watch_tree(self, root):
+        for directory in watched_directories(root):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), watch_mask)
+            if wd >= 0:
+                self.directories[wd] = directory
+
+    def fileno(self):
+        return self.fd
+
+    def read_changes(self):
+        """
+        Reads the pending events.
+
+        Returns:
+        - tuple: Sets of the changed files and of the directories created or removed.
+        """
+        changed_files = set()
+        changed_directories = set()
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return changed_files, changed_directories
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = event_header.unpack_from(data, offset)
+            offset += event_header.size
+            name = data[offset:offset + length].rstrip(b"\0").decode("utf-8", "surrogateescape")
+            offset += length
+            directory = self.directories.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                changed_directories.add(path)
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self.watch_tree(path)
+            else:
+                changed_files.add(path)
+        return changed_files, changed_directories
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """
+    Watches directory trees by comparing the modification time and size of their files
+    between scans, for systems without inotify.
+    """
+    def __init__(self, roots):
+        self.roots = roots
+        self.snapshot = self.scan()
+
+    def scan(self):
+        snapshot = {}
+        for root in self.roots:
+            for filename in discover_feature_files(root):
+                try:
+                    stat = os.stat(filename)
+                except OSError:
+                    continue
+                snapshot[filename] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def fileno(self):
+        return None
+
+    def read_changes(self):
+        snapshot = self.scan()
+        changed_files = {filename for filename, state in snapshot.items() if self.snapshot.get(filename) != state}
+        changed_files.update(filename for filename in self.snapshot if filename not in snapshot)
+        self.snapshot = snapshot
+        return changed_files, set()
+
+    def close(self):
+        pass
+
+
+def make_watcher(roots):
+    # inotify when the system has it, polling otherwise
+    try:
+        return InotifyWatcher(roots)
+    except (OSError, AttributeError):
+        return PollingWatcher(roots)
+
+
+def answer(corpus, request):
+    """
+    Answers a query of a client.
+
+    Args:
+    - corpus (Corpus): The results in memory.
+    - request (dict): {"command": "report", "detectors": [...], "files": [...]} (detectors and
+      files being optional), {"command": "files"} or {"command": "stop"}.
+
+    Returns:
+    - dict: The response.
+    """
+    command = request.get("command")
+    if command == "report":
+        return {"output": corpus.report(request.get("detectors"), request.get("files"))}
+    if command == "files":
+        return {"files": sorted(corpus.results, key=path_order)}
+    if command == "stop":
+        return {"stopped": True}
+    return {"error": f"unknown command {command!r}"}
+
+
+def serve(paths, socket_path, jobs=1, cache_dir=None, poll_interval=1.0, extension=".feature", include=None, exclude=None,
+          detector_names=None):
+    """
+    Analyzes the feature files of the paths, then keeps their results up to date as files
+    change and answers queries on a Unix socket, one JSON request and response per line, until
+    asked to stop. Everything runs in one thread around a select loop, so queries never see a
+    half-updated corpus.
+
+    Args:
+    - paths (list of str): Files, directories or globs to watch, see runner.expand_paths.
+    - socket_path (str): Path of the Unix socket.
+    - jobs (int, optional): Number of worker processes for the initial analysis.
+    - cache_dir (str, optional): Directory of the persistent result cache.
+    - poll_interval (float, optional): Seconds between two scans when polling.
+    - extension (str, optional): Extension of the feature files.
+    - include (list of str, optional): Globs the files found in directories must match.
+    - exclude (list of str, optional): Globs of the files and directories skipped in directories.
+    - detector_names (list of str, optional): Command-line names of the detectors analyzing the
+      files, the default ones of select_detectors by default.
+
+    Returns:
+    - None
+
+    Raises:
+    - FileNotFoundError: If a path does not exist or a glob matches nothing.
+    """
+    corpus = Corpus(jobs, cache_dir, extension, include, exclude, detector_names)
+    corpus.add_paths(paths)
+
+    watcher = make_watcher(runner.path_roots(paths))
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen()
+
+    polling = watcher.fileno() is None
+    readers = [server] if polling else [server, watcher]
+    last_poll = time.monotonic()
+    running = True
+    try:
+        while running:
+            ready, _, _ = select.select(readers, [], [], poll_interval)
+            if watcher in ready or (polling and time.monotonic() - last_poll >= poll_interval):
+                last_poll = time.monotonic()
+                changed_files, changed_directories = watcher.read_changes()
+                for directory in changed_directories:
+                    corpus.remove_directory(directory)
+                    changed_files.update(discover_feature_files(directory))
+                for filename in sorted(changed_files):
+                    if corpus.selects(filename):
+                        corpus.update(filename)
+            if server in ready:
+                connection, _ = server.accept()
+                # A client that never sends its request or never reads the response must not
+                # block the daemon for good
+                connection.settimeout(client_timeout)
+                try:
+                    with connection, connection.makefile("rw", encoding="utf-8") as stream:
+                        try:
+                            response = answer(corpus, json.loads(stream.readline()))
+                        except ValueError as error:
+                            response = {"error": str(error)}
+                        stream.write(json.dumps(response) + "\n")
+                except OSError:
+                    continue
+                running = not response.get("stopped")
+    finally:
+        server.close()
+        watcher.close()
+        os.remove(socket_path)
+
+
+def query(socket_path, request, timeout=None):
+    """
+    Sends a query to a running daemon.
+
+    Args:
+    - socket_path (str): Path of the Unix socket of the daemon.
+    - request (dict): The request, see answer.
+    - timeout (float, optional): Seconds to wait for the daemon, `client_timeout` by default.
+
+    Returns:
+    - dict: The response.
+
+    Raises:
+    - TimeoutError: If the daemon does not answer in time.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(client_timeout if timeout is None else timeout)
+        client.connect(socket_path)
+        with client.makefile("rw", encoding="utf-8") as stream:
+            stream.write(json.dumps(request) + "\n")
+            stream.flush()
+            return json.loads(stream.readline())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keeps the smells of feature files up to date and answers queries on a Unix socket.")
+    parser.add_argument("--socket", default="/tmp/smell_detector.sock", help="path of the Unix socket")
+    parser.add_argument("--timeout", type=float, default=client_timeout,
+                        help="seconds to wait for the daemon to answer (default: %(default)s)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser("serve", help="start the daemon")
+    serve_parser.add_argument("paths", nargs="+",
+                              help="feature files, directories searched recursively, or globs (quote them, ** matches any depth)")
+    serve_parser.add_argument("--include", action="append", metavar="GLOB",
+                              help="only keep the files of the given directories matching this glob, may be repeated")
+    serve_parser.add_argument("--exclude", action="append", metavar="GLOB",
+                              help="skip the files and directories of the given directories matching this glob, may be repeated")
+    serve_parser.add_argument("--detector", action="append", dest="detectors", metavar="NAME", choices=detector_names(),
+                              help="detector analyzing the files, may be repeated (default: all but the opt-in near_duplicate_test_case). One of: %(choices)s")
+    serve_parser.add_argument("--jobs", type=int, default=1)
+    serve_parser.add_argument("--cache-dir", default=None)
+    serve_parser.add_argument("--poll-interval", type=float, default=1.0)
+    report_parser = subparsers.add_parser("report", help="print the reports of a running daemon")
+    report_parser.add_argument("--detector", action="append", dest="detectors", metavar="NAME", choices=detector_names(),
+                               help="detector to report, may be repeated (default: all the detectors of the daemon). One of: %(choices)s")
+    report_parser.add_argument("--file", action="append", dest="files")
+    subparsers.add_parser("stop", help="stop a running daemon")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.paths, args.socket, args.jobs, args.cache_dir, args.poll_interval, include=args.include, exclude=args.exclude,
+              detector_names=args.detectors)
+    elif args.command == "report":
+        response = query(args.socket, {"command": "report", "detectors": args.detectors, "files": args.files}, args.timeout)
+        if "error" in response:
+            parser.exit(2, f"ERROR: {response['error']}\n")
+        print(response["output"], end="")
+    else:
+        query(args.socket, {"command": "stop"}, args.timeout)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import importlib
+from findings import Finding
+
+class Detector:
+    """
+    Entry of the detector registry. The module of the detector is only imported when its
+    analysis or report is first used, so running a few detectors never loads the others.
+
+    `needs` lists the parts of the parsed document the analysis reads, so the parser can skip
+    the others (see gherkin_parser.parse_feature_file): "blocks" for the rules, backgrounds,
+    scenarios and steps, "tags", "examples" for the rows of the Examples tables and
+    "line_kinds". The Feature line is always parsed.
+
+    Besides its report, each module has an `iter_<name>_findings` generator merging the same
+    per-file results into (filename, line, column, message, snippet hash) tuples, which the
+    registry turns into Finding records with the severity of the smell.
+
+    Detectors with `default` False are opt-in: they only run when named, e.g. with --detector.
+    """
+    __slots__ = ("name", "title", "module_name", "analyze_name", "report_name", "findings_name", "csv_filename",
+                 "needs", "severity", "cross_file", "description", "default")
+
+    def __init__(self, name, title, analyze_name, report_name, needs, severity="warning", cross_file=False, description="", default=True):
+        self.name = name
+        self.title = title
+        self.module_name = name
+        self.analyze_name = analyze_name
+        self.report_name = report_name
+        self.findings_name = f"iter_{name}_findings"
+        self.csv_filename = f"reports/{name}.csv"
+        self.needs = frozenset(needs)
+        self.severity = severity
+        self.cross_file = cross_file  # Compares files with each other, so needs the results of the whole project
+        self.description = description  # Shown with the rules of the SARIF logs
+        self.default = default
+
+    @property
+    def module(self):
+        return importlib.import_module(self.module_name)
+
+    @property
+    def analyze(self):
+        return getattr(self.module, self.analyze_name)
+
+    @property
+    def report(self):
+        return getattr(self.module, self.report_name)
+
+    def findings(self, filenames, analyses):
+        """
+        Merges the per-file results of the analysis into findings, lazily.
+
+        Args:
+        - filenames (list of str): The names of the feature files.
+        - analyses (iterable): The result of the analysis for each file, in the same order.
+
+        Returns:
+        - generator of Finding: The findings, in the order of the files for per-file smells.
+        """
+        iter_findings = getattr(self.module, self.findings_name)
+        for filename, line, column, message, snippet_hash in iter_findings(filenames, analyses):
+            yield Finding(self.name, filename, line, column, self.severity, message, snippet_hash)
+
+
+# Every detector, in report order. Severities follow SARIF: error, warning or note.
+detectors = [
+    Detector("untitled_feature", "Untitled Feature", "analyze_untitled_feature", "report_untitled_features", [],
+             description="A Feature keyword without a title, leaving the purpose of the feature file unstated."),
+    Detector("duplicate_feature_title", "Duplicate Feature Title", "analyze_feature_title", "report_duplicate_feature_titles", [],
+             cross_file=True, description="Several feature files share the same Feature title."),
+    Detector("duplicate_scenario_title", "Duplicate Title Scenario", "analyze_scenario_titles", "report_duplicate_scenario_titles", ["blocks"],
+             cross_file=True, description="Several scenarios share the same title."),
+    Detector("duplicate_test_case", "Duplicate Scenario", "analyze_test_cases", "report_duplicate_test_cases", ["blocks"],
+             cross_file=True, description="Several scenarios have exactly the same steps."),
+    Detector("near_duplicate_test_case", "Near Duplicate Scenario", "analyze_near_duplicate_test_cases", "report_near_duplicate_test_cases", ["blocks"],
+             "note", cross_file=True, description="Scenarios with nearly the same steps, which a Scenario Outline could merge.",
+             default=False),
+    Detector("absence_background", "Absence of Background", "analyze_absence_background", "report_absence_background", ["blocks"],
+             "note", description="The same Given steps start the scenarios of a feature instead of being in a Background."),
+    Detector("vicious_tag", "Vicious Tag", "analyze_vicious_tags", "report_vicious_tags", ["blocks", "tags"],
+             "note", description="A tag repeated on every rule or scenario of a feature instead of being on the feature."),
+    Detector("duplicate_step", "Duplicate Step", "analyze_duplicate_steps", "report_duplicate_steps", ["blocks"],
+             description="The same step appears several times in one scenario or background."),
+    Detector("starting_with_the_left_foot", "Starting With The Left Foot", "analyze_starting_with_the_left_foot", "report_starting_with_the_left_foot", ["blocks"],
+             description="A scenario starting with another step than a Given or When step."),
+    Detector("malformed_test", "Malformed Test", "analyze_malformed_test", "report_malformed_test", ["blocks"],
+             "error", description="A scenario missing its When or Then steps, or repeating its Given, When or Then keywords."),
+]
+
+def detector_names():
+    return [detector.name for detector in detectors]
+
+def select_detectors(names=None):
+    """
+    Picks detectors from the registry without importing them.
+
+    Args:
+    - names (list of str, optional): Names of the detectors, all but the opt-in ones by default.
+
+    Returns:
+    - list of Detector: The selected detectors, in report order.
+
+    Raises:
+    - ValueError: If a name is not in the registry.
+    """
+    if names is None:
+        return [detector for detector in detectors if detector.default]
+    unknown = set(names) - set(detector_names())
+    if unknown:
+        raise ValueError(f"unknown detectors: {', '.join(sorted(unknown))}")
+    return [detector for detector in detectors if detector.name in names]
+
+def combined_needs(selected_detectors):
+    # Parts of the document the selected detectors need together
+    return frozenset().union(*(detector.needs for detector in selected_detectors))
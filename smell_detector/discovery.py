@@ -0,0 +1,216 @@
+import os
+import re
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def glob_regex(pattern):
+    """
+    Compiles a glob with the semantics of .gitignore: "*" and "?" never match a "/", "**"
+    matches any number of directories and [...] is a character class.
+
+    Args:
+    - pattern (str): The glob.
+
+    Returns:
+    - re.Pattern: Regex matching the whole paths the glob matches.
+    """
+    parts = []
+    position = 0
+    while position < len(pattern):
+        if pattern.startswith("**/", position):
+            parts.append("(?:.*/)?")
+            position += 3
+        elif pattern.startswith("**", position):
+            parts.append(".*")
+            position += 2
+        elif pattern[position] == "*":
+            parts.append("[^/]*")
+            position += 1
+        elif pattern[position] == "?":
+            parts.append("[^/]")
+            position += 1
+        elif pattern[position] == "[" and "]" in pattern[position + 2:]:
+            end = pattern.index("]", position + 2)
+            characters = pattern[position + 1:end]
+            if characters.startswith("!"):
+                characters = "^" + characters[1:]
+            parts.append("[" + characters.replace("\\", "\\\\") + "]")
+            position = end + 1
+        elif pattern[position] == "\\" and position + 1 < len(pattern):
+            parts.append(re.escape(pattern[position + 1]))
+            position += 2
+        else:
+            parts.append(re.escape(pattern[position]))
+            position += 1
+    return re.compile("".join(parts))
+
+def glob_match(path, pattern):
+    return glob_regex(pattern).fullmatch(path) is not None
+
+def read_gitignore(directory, relative_directory, outer_prefix=""):
+    """
+    Reads the rules of the .gitignore file of a directory, if it has one.
+
+    Args:
+    - directory (str): Path of the directory.
+    - relative_directory (str): Path of the directory relative to the discovery root ("" for
+      the root or a directory above it).
+    - outer_prefix (str, optional): For a directory above the root, path of the root relative
+      to it, ending with "/".
+
+    Returns:
+    - list of tuples: (relative directory, outer prefix, pattern, negated, directory only,
+      anchored) for each rule.
+    """
+    rules = []
+    try:
+        with open(os.path.join(directory, ".gitignore"), "r", encoding="utf-8") as gitignore:
+            lines = gitignore.read().splitlines()
+    except OSError:
+        return rules
+
+    for line in lines:
+        pattern = line.rstrip()
+        if not pattern or pattern.startswith("#"):
+            continue
+        negated = pattern.startswith("!")
+        pattern = pattern.removeprefix("!")
+        directory_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        # A slash anywhere but at the end ties the pattern to the directory of the .gitignore
+        anchored = "/" in pattern
+        rules.append((relative_directory, outer_prefix, pattern.lstrip("/"), negated, directory_only, anchored))
+    return rules
+
+def outer_gitignore_rules(root):
+    """
+    Reads the .gitignore files of the directories above the root, up to the top of the git
+    working tree it belongs to, as git applies them too. Outside a working tree there are none.
+
+    Args:
+    - root (str): The discovery root.
+
+    Returns:
+    - list of tuples: Rules as returned by read_gitignore, outermost first.
+    """
+    root = os.path.abspath(root)
+    ancestors = []
+    directory = root
+    while not os.path.exists(os.path.join(directory, ".git")):
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return []
+        directory = parent
+        ancestors.append(directory)
+
+    rules = []
+    for ancestor in reversed(ancestors):
+        outer_prefix = os.path.relpath(root, ancestor).replace(os.sep, "/") + "/"
+        rules += read_gitignore(ancestor, "", outer_prefix)
+    return rules
+
+def is_ignored(relative_path, is_directory, rules):
+    """
+    Checks a path against .gitignore rules, the last matching rule winning as in git.
+
+    Args:
+    - relative_path (str): Path relative to the discovery root, with "/" separators.
+    - is_directory (bool): Whether the path is a directory.
+    - rules (list of tuples): Rules returned by read_gitignore, outermost first.
+
+    Returns:
+    - bool: True if the path is ignored.
+    """
+    ignored = False
+    name = relative_path.rsplit("/", 1)[-1]
+    for base, outer_prefix, pattern, negated, directory_only, anchored in rules:
+        if directory_only and not is_directory:
+            continue
+        if base:
+            if not relative_path.startswith(base + "/"):
+                continue
+            path_from_base = relative_path[len(base) + 1:]
+        else:
+            path_from_base = outer_prefix + relative_path
+        if glob_match(path_from_base, pattern) if anchored else glob_match(name, pattern):
+            ignored = not negated
+    return ignored
+
+def matches_any(relative_path, patterns):
+    return any(glob_match(relative_path, pattern) for pattern in patterns)
+
+def is_selected(relative_path, include=None, exclude=None):
+    # Whether a file passes the include and exclude globs, for files found without a walk
+    if exclude and any(matches_any(prefix, exclude) for prefix in path_prefixes(relative_path)):
+        return False
+    return not include or matches_any(relative_path, include)
+
+def path_prefixes(relative_path):
+    # The path and the paths of its directories, as the walk would meet them
+    parts = relative_path.split("/")
+    return ["/".join(parts[:count]) for count in range(1, len(parts) + 1)]
+
+def discover_feature_files(root, include=None, exclude=None, extension=".feature", use_gitignore=True):
+    """
+    Walks a directory recursively and yields its feature files as they are found, so the
+    analysis can start before the walk is over. Entries come from os.scandir, whose cached
+    file types avoid an extra stat call per entry, and are visited in name order so every run
+    sees the files in the same order.
+
+    Args:
+    - root (str): Directory to walk.
+    - include (list of str, optional): Globs on the path relative to `root`, see glob_regex;
+      when given, only matching files are yielded.
+    - exclude (list of str, optional): Globs on the path relative to `root`; matching files and
+      directories are skipped.
+    - extension (str, optional): Extension of the feature files.
+    - use_gitignore (bool, optional): Whether to skip what the .gitignore files of the walked
+      directories, and of the directories above `root` in its git working tree, ignore.
+
+    Returns:
+    - generator of str: Paths of the feature files, prefixed by `root`.
+    """
+    visited = set()  # Real directories already walked, so symlink loops are only followed once
+    pending = [(root, "", outer_gitignore_rules(root) if use_gitignore else [])]
+
+    while pending:
+        directory, relative_directory, rules = pending.pop()
+        try:
+            directory_stat = os.stat(directory)
+            key = (directory_stat.st_dev, directory_stat.st_ino)
+            if key in visited:
+                continue
+            visited.add(key)
+            with os.scandir(directory) as iterator:
+                entries = sorted(iterator, key=lambda entry: entry.name)
+        except OSError:
+            continue
+
+        if use_gitignore:
+            rules = rules + read_gitignore(directory, relative_directory)
+
+        subdirectories = []
+        for entry in entries:
+            relative_path = f"{relative_directory}/{entry.name}" if relative_directory else entry.name
+            try:
+                is_directory = entry.is_dir()
+            except OSError:
+                continue
+
+            if is_directory:
+                if entry.name == ".git" or (use_gitignore and is_ignored(relative_path, True, rules)):
+                    continue
+                if exclude and matches_any(relative_path, exclude):
+                    continue
+                subdirectories.append((entry.path, relative_path, rules))
+            elif entry.name.endswith(extension) and entry.is_file():
+                if use_gitignore and is_ignored(relative_path, False, rules):
+                    continue
+                if exclude and matches_any(relative_path, exclude):
+                    continue
+                if include and not matches_any(relative_path, include):
+                    continue
+                yield entry.path
+
+        # Sub-directories are walked depth-first, in name order
+        pending.extend(reversed(subdirectories))
@@ -1,7 +1,11 @@
-import re
 import csv
 import os
-from tabulate import tabulate
+from rendering import render_table
+from gherkin_parser import iter_feature_files
+from findings import snippet_hash
+
+# Bump whenever a change to the analysis can change the per-file results kept in the cache
+analysis_version = 2
 
 def extract_features(filenames, feature_files):
     """
@@ -9,20 +13,41 @@ def extract_features(filenames, feature_files):
     
     Args:
     - filenames (list of str): The names of the feature files.
-    - feature_files (list of str): The content of the feature files.
+    - feature_files (list of str or Document): The content of the feature files.
     
     Returns:
     - list of tuples: List of extracted feature titles with corresponding filenames.
     """
-    pattern = r"Feature:.*"
-    features = []
+    analyses = (analyze_feature_title(document) for document in iter_feature_files(feature_files))
+    return collect_features(filenames, analyses)
 
-    for feature_file, filename in zip(feature_files, filenames):
-        match = re.search(pattern, feature_file, re.MULTILINE)
-        if match:
-            features.append((match.group(), filename))
-    
-    return features
+def analyze_feature_title(document):
+    """
+    Extracts the feature title line of a single parsed feature file.
+
+    Args:
+    - document (Document): The parsed feature file.
+
+    Returns:
+    - tuple or None: The "Feature:" line and its line number, if the file has one.
+    """
+    feature = document.feature
+    if feature and feature.keyword:
+        return document.lines[feature.line - 1].lstrip(), feature.line
+    return None
+
+def collect_features(filenames, analyses):
+    """
+    Pairs the per-file results of analyze_feature_title with their filenames.
+
+    Args:
+    - filenames (list of str): The names of the feature files.
+    - analyses (iterable): The result of analyze_feature_title for each file, in the same order.
+
+    Returns:
+    - list of tuples: List of extracted feature titles with corresponding filenames.
+    """
+    return [(feature[0], filename) for feature, filename in zip(analyses, filenames) if feature]
 
 def analyze_features(features):
     """
@@ -66,7 +91,7 @@ def print_report(total_features, total_distinct_features, report_data, csv_filen
     - csv_filename (str, optional): Name of the CSV file to save the report.
     
     Returns:
-    - None
+    - int: Number of findings reported.
     """
     print(f"- Total number of features across all files: {total_features}")
     print(f"- Total number of distinct features across all files: {total_distinct_features}")
@@ -77,13 +102,13 @@ def print_report(total_features, total_distinct_features, report_data, csv_filen
             [item[0], item[1], item[2]] 
             for i, item in enumerate(report_data)
         ]
-        print(tabulate(indexed_report_data, headers=["Feature", "Count", "Filenames"], tablefmt="pretty"))
+        render_table(indexed_report_data, ["Feature", "Count", "Filenames"], tablefmt="pretty")
         
         # Generate CSV if filename is provided
         if csv_filename:
-            report_dir = './reports'
-            if not os.path.exists(report_dir):
-                os.mkdir(report_dir)
+            report_dir = os.path.dirname(csv_filename)
+            if report_dir and not os.path.exists(report_dir):
+                os.makedirs(report_dir)
             file_exists = os.path.isfile(csv_filename)  # Check if file already exists
             with open(csv_filename, mode='a', newline='', encoding='utf-8') as csvfile:
                 csv_writer = csv.writer(csvfile)
@@ -94,12 +119,14 @@ def print_report(total_features, total_distinct_features, report_data, csv_filen
     else:
         print("No features appeared more than once.")
 
+    return len(report_data)
+
 def find_duplicate_feature_titles(feature_files, filenames, csv_filename=None):
     """
     Main function to find and report duplicate feature titles.
     
     Args:
-    - feature_files (list of str): The content of the feature files.
+    - feature_files (list of str or Document): The content of the feature files.
     - filenames (list of str): The names of the feature files.
     - csv_filename (str, optional): Name of the CSV file to save the report.
     
@@ -110,6 +137,45 @@ def find_duplicate_feature_titles(feature_files, filenames, csv_filename=None):
     total_features, total_distinct_features, report_data = analyze_features(features)
     print_report(total_features, total_distinct_features, report_data, csv_filename)
 
+def report_duplicate_feature_titles(filenames, analyses, csv_filename=None):
+    """
+    Merges the per-file results of analyze_feature_title and reports the duplicates.
+
+    Args:
+    - filenames (list of str): The names of the feature files.
+    - analyses (iterable): The result of analyze_feature_title for each file, in the same order.
+    - csv_filename (str, optional): Name of the CSV file to save the report.
+
+    Returns:
+    - int: Number of findings reported.
+    """
+    total_features, total_distinct_features, report_data = analyze_features(collect_features(filenames, analyses))
+    return print_report(total_features, total_distinct_features, report_data, csv_filename)
+
+def iter_duplicate_feature_title_findings(filenames, analyses):
+    """
+    Yields every occurrence of the feature titles found in several files, from the per-file
+    results of analyze_feature_title.
+
+    Args:
+    - filenames (list of str): The names of the feature files.
+    - analyses (iterable): The result of analyze_feature_title for each file, in the same order.
+
+    Returns:
+    - generator of tuples: Filename, line, column (None, not tracked), message and snippet
+      hash of each finding.
+    """
+    locations = {}
+    for filename, analysis in zip(filenames, analyses):
+        if analysis:
+            feature, line_number = analysis
+            locations.setdefault(feature, []).append((filename, line_number))
+
+    for feature in sorted(locations):
+        if len(locations[feature]) > 1:
+            for filename, line_number in locations[feature]:
+                yield filename, line_number, None, f"'{feature}' appears {len(locations[feature])} times", snippet_hash(feature)
+
 # Example usage
 def run_example():
     feature_files_example = [
@@ -1,7 +1,11 @@
-import re
 import csv
 import os
-from tabulate import tabulate
+from rendering import render_table, rows_needed
+from gherkin_parser import iter_feature_files
+from findings import snippet_hash
+
+# Bump whenever a change to the analysis can change the per-file results kept in the cache
+analysis_version = 1
 
 def find_duplicate_scenario_titles(filenames, feature_files, csv_filename=None):
     """
@@ -10,47 +14,69 @@ def find_duplicate_scenario_titles(filenames, feature_files, csv_filename=None):
 
     Args:
     - filenames (list of str): The names of the feature files.
-    - feature_files (list of str): The content of the feature files.
+    - feature_files (list of str or Document): The content of the feature files.
     - csv_filename (str, optional): The name of the CSV file to save the report.
 
     Returns:
     - None
     """
-    title_count = {}
+    # Documents are parsed and analyzed one at a time and the reports only keep the results
+    documents = iter_feature_files(feature_files)
+    report_duplicate_scenario_titles(filenames, (analyze_scenario_titles(document) for document in documents), csv_filename)
+
+def analyze_scenario_titles(document):
+    """
+    Extracts the scenario titles of a single parsed feature file.
+
+    Args:
+    - document (Document): The parsed feature file.
+
+    Returns:
+    - list of tuples: Title (already normalized by the parser) and line number of each
+      Scenario, Example, and Scenario Outline.
+    """
+    return [(scenario.title, scenario.line) for scenario in document.scenarios]
+
+def report_duplicate_scenario_titles(filenames, analyses, csv_filename=None):
+    """
+    Merges the per-file results of analyze_scenario_titles and reports the duplicates.
+
+    Args:
+    - filenames (list of str): The names of the feature files.
+    - analyses (iterable): The result of analyze_scenario_titles for each file, in the same order.
+    - csv_filename (str, optional): The name of the CSV file to save the report.
+
+    Returns:
+    - int: Number of findings reported.
+    """
+    # Title -> (file id, line) of each occurrence
+    title_locations = {}
+    total_titles = 0
 
     # Process each feature file
-    for filename, text in zip(filenames, feature_files):
-        lines = text.splitlines()
-        for idx, line in enumerate(lines, start=1):  # Enumerate lines with 1-based index
-            # Match Scenario, Example, and Scenario Outline titles
-            match = re.match(r"^\s*(Scenario:|Example:|Scenario Outline:)\s*(.+)$", line)
-            if match:
-                _, title_name = match.groups()  # Extract the title part after the colon
-                normalized_title = title_name.strip()  # Normalize by trimming whitespace
-
-                if normalized_title not in title_count:
-                    title_count[normalized_title] = {'count': 0, 'locations': []}
-                title_count[normalized_title]['count'] += 1
-                title_count[normalized_title]['locations'].append(f"{filename}:{idx}")
-
-    # Prepare data for reporting duplicates
-    report_data = []
-    for title, data in title_count.items():
-        if data['count'] > 1:
+    for file_id, scenario_titles in enumerate(analyses):
+        for title, line in scenario_titles:
+            total_titles += 1
+            if title:
+                title_locations.setdefault(title, []).append((file_id, line))
+
+    duplicates = [(title, locations) for title, locations in title_locations.items() if len(locations) > 1]
+
+    # Prepare data for reporting duplicates, only their locations are formatted, when shown or saved
+    report_data = None
+    if rows_needed(csv_filename):
+        report_data = []
+        for title, locations in duplicates:
             # Sort the locations alphabetically
-            sorted_locations = sorted(set(data['locations']))
-            report_data.append([title, data['count'], '\n'.join(sorted_locations)])
+            sorted_locations = sorted({f"{filenames[file_id]}:{line}" for file_id, line in locations})
+            report_data.append([title, len(locations), '\n'.join(sorted_locations)])
 
     # Print overall report
-    total_titles = sum(
-        len(re.findall(r"^\s*(Scenario:|Example:|Scenario Outline:)", text, re.MULTILINE))
-        for text in feature_files
-    )
     print(f"- Total number of scenario titles: {total_titles}")
     print(f"- Duplicate scenario titles:")
 
-    if report_data:
-        print(tabulate(report_data, headers=["Title", "Count", "Files And Line Numbers"], tablefmt="grid"))
+    if duplicates:
+        render_table(report_data, ["Title", "Count", "Files And Line Numbers"], count=len(duplicates))
 
         # Generate CSV if filename is provided
         if csv_filename:
@@ -65,6 +91,32 @@ def find_duplicate_scenario_titles(filenames, feature_files, csv_filename=None):
     else:
         print("No scenario titles appeared more than once.")
 
+    return len(duplicates)
+
+def iter_duplicate_scenario_title_findings(filenames, analyses):
+    """
+    Yields every occurrence of the scenario titles found more than once, from the per-file
+    results of analyze_scenario_titles.
+
+    Args:
+    - filenames (list of str): The names of the feature files.
+    - analyses (iterable): The result of analyze_scenario_titles for each file, in the same order.
+
+    Returns:
+    - generator of tuples: Filename, line, column (None, not tracked), message and snippet
+      hash of each finding.
+    """
+    locations = {}
+    for filename, scenario_titles in zip(filenames, analyses):
+        for title, line in scenario_titles:
+            if title:
+                locations.setdefault(title, []).append((filename, line))
+
+    for title, title_locations in locations.items():
+        if len(title_locations) > 1:
+            for filename, line in sorted(set(title_locations)):
+                yield filename, line, None, f"Scenario title '{title}' appears {len(title_locations)} times", snippet_hash(title)
+
 # Example usage
 def run_example():
     feature_files_example = [
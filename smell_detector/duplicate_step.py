@@ -1,7 +1,24 @@
 import csv
 import os
-import re
-from tabulate import tabulate
+from rendering import render_table, rows_needed
+from findings import SourceSpan, SourceReader, KeptSources, snippet_hash
+from read_file import read_source
+
+# Bump whenever a change to the analysis can change the per-file results kept in the cache
+analysis_version = 2
+
+
+class DuplicateSteps:
+    """
+    A background or scenario repeating some of its steps: its span, and the line of the first
+    occurrence, text and number of occurrences of each repeated step.
+    """
+    __slots__ = ("span", "steps")
+
+    def __init__(self, span, steps):
+        self.span = span
+        self.steps = steps
+
 
 def find_duplicate_steps(feature_filenames, feature_files, csv_filename=None):
     """
@@ -9,55 +26,79 @@ def find_duplicate_steps(feature_filenames, feature_files, csv_filename=None):
 
     Args:
     - feature_filenames (list of str): The names of the feature files.
-    - feature_files (list of str): The content of the feature files.
+    - feature_files (iterable of str or Document): The content of the feature files.
     - csv_filename (str, optional): Name of the CSV file to save the report.
 
     Returns:
     - None
     """
-    background_pattern = r"(Background:.*)([\s\S]*?)(?=(?:([@#][\s\S]*?)?Scenario:)|(?:([@#][\s\S]*?)?Scenario Outline:)|(?:([@#][\s\S]*?)?Example:)|(?:([@#][\s\S]*?)?Rule:)|$)"
-    scenario_pattern = r"(Scenario:.*)([\s\S]*?)(?=(?:([@#][\s\S]*?)?Scenario:)|(?:([@#][\s\S]*?)?Scenario Outline:)|(?:([@#][\s\S]*?)?Example:)|(?:([@#][\s\S]*?)?Rule:)|$)"
-    scenario_outline_pattern = r"(Scenario Outline:.*)([\s\S]*?)(?=(?:([@#][\s\S]*?)?Scenario:)|(?:([@#][\s\S]*?)?Scenario Outline:)|(?:([@#][\s\S]*?)?Example:)|(?:([@#][\s\S]*?)?Rule:)|$)"
-    example_pattern = r"(Example:.*)([\s\S]*?)(?=(?:([@#][\s\S]*?)?Scenario:)|(?:([@#][\s\S]*?)?Scenario Outline:)|(?:([@#][\s\S]*?)?Example:)|(?:([@#][\s\S]*?)?Rule:)|$)"
-    step_pattern = r"(?:Given|When|Then|And|But)([\s\S]*?)(?=Given|When|Then|And|But|Scenario:|Scenario Outline:|Example:|Examples:|Rule:|$)"
+    # Documents are parsed and analyzed one at a time and only the contents of the files with
+    # registers are kept to be read back
+    sources = KeptSources(feature_filenames)
+    report_duplicate_steps(feature_filenames, sources.analyses(feature_files, analyze_duplicate_steps), csv_filename, sources.read_source)
+
+
+def analyze_duplicate_steps(document):
+    """
+    Finds the duplicate steps in a single parsed feature file.
 
+    Args:
+    - document (Document): The parsed feature file.
+
+    Returns:
+    - tuple: Registers found in the file, as the start and end offsets and the hash of their
+      text and the (line, step, count) of each repeated step, and their number of occurrences.
+    """
     duplicate_steps = []
-    total_duplicate_steps = 0
 
-    for feature_index, (filename, feature_file) in enumerate(zip(feature_filenames, feature_files)):
-        # Find background or scenarios into feature
-        backgrounds = [(match.group().strip(), feature_file[:match.start()].count('\n') + 1)
-                       for match in re.finditer(background_pattern, feature_file)]
-        scenarios = [(match.group().strip(), feature_file[:match.start()].count('\n') + 1)
-                     for match in re.finditer(scenario_pattern, feature_file)]
-        scenarios_outline = [(match.group().strip(), feature_file[:match.start()].count('\n') + 1)
-                             for match in re.finditer(scenario_outline_pattern, feature_file)]
-        examples = [(match.group().strip(), feature_file[:match.start()].count('\n') + 1)
-                    for match in re.finditer(example_pattern, feature_file)]
+    # Backgrounds and scenarios of the feature
+    total_registers = document.backgrounds + document.scenarios
 
-        total_registers = backgrounds + scenarios + scenarios_outline + examples
+    total_duplicate_steps = stuttering_analysis(document, total_registers, duplicate_steps, 0)
+    return duplicate_steps, total_duplicate_steps
 
-        total_duplicate_steps = stuttering_analysis(filename, total_registers, step_pattern, duplicate_steps, total_duplicate_steps)
 
-    if duplicate_steps:
-        # Transforming file_and_line and duplicate_step into a string
-        for register in duplicate_steps:
-            register["file_and_line"] = '\n'.join(register["file_and_line"])
-            register["duplicate_step"] = '\n'.join(register["duplicate_step"])
+def report_duplicate_steps(feature_filenames, analyses, csv_filename=None, read_source=read_source):
+    """
+    Merges the per-file results of analyze_duplicate_steps and reports them.
+
+    Args:
+    - feature_filenames (list of str): The names of the feature files.
+    - analyses (iterable): The result of analyze_duplicate_steps for each file, in the same order.
+    - csv_filename (str, optional): Name of the CSV file to save the report.
+    - read_source (callable, optional): Returns the content or Document of a feature file from
+      its name, to read the registers back. Reads the file of that name by default.
+
+    Returns:
+    - int: Number of findings reported.
+    """
+    duplicate_steps = []
+    total_duplicate_steps = 0
+    for file_id, (registers, total) in enumerate(analyses):
+        for start, end, _, steps in registers:
+            duplicate_steps.append(DuplicateSteps(SourceSpan(file_id, start, end), steps))
+        total_duplicate_steps += total
 
-        report_data = [
-            [duplicate_step["file_and_line"], duplicate_step["duplicate_step"], duplicate_step["register"]]
-            for duplicate_step in duplicate_steps
-        ]
+    if duplicate_steps:
+        # The lines, steps and registers are only formatted and read back here, when shown or saved
+        report_data = None
+        if rows_needed(csv_filename):
+            source_reader = SourceReader(feature_filenames, read_source)
+            report_data = [
+                ['\n'.join(f"{feature_filenames[duplicate_step.span.file_id]}:{step_line}" for step_line, _, _ in duplicate_step.steps),
+                 '\n'.join(f"'{step}' appears {count} times" for _, step, count in duplicate_step.steps),
+                 source_reader.text(duplicate_step.span)]
+                for duplicate_step in duplicate_steps
+            ]
 
         print(f"- Total number of duplicate steps: {total_duplicate_steps}")
-        print(tabulate(report_data, headers=["File and Line Position", "Duplicate Step", "Reference"], tablefmt="grid"))
+        render_table(report_data, ["File and Line Position", "Duplicate Step", "Reference"], count=len(duplicate_steps))
 
         # Generate CSV if filename is provided
         if csv_filename:
-            report_dir = './reports'
-            if not os.path.exists(report_dir):
-                os.mkdir(report_dir)
+            report_dir = os.path.dirname(csv_filename)
+            if report_dir and not os.path.exists(report_dir):
+                os.makedirs(report_dir)
 
             file_exists = os.path.isfile(csv_filename)  # Check if file already exists
             with open(csv_filename, mode='a', newline='', encoding='utf-8') as csvfile:
@@ -69,56 +110,69 @@ def find_duplicate_steps(feature_filenames, feature_files, csv_filename=None):
     else:
         print("No registers with duplicate steps.")
 
+    return len(duplicate_steps)
 
-# Verifying into background or scenario if it has some duplicate step
-def stuttering_analysis(filename, registers, step_pattern, duplicate_steps, total_duplicate_steps):
-    original_registers = [register_content for register_content, _ in registers]
 
-    for register_index, (register, register_line) in enumerate(registers):
-        registers[register_index] = re.sub("\n\n", "\n", register)
-        register = register.strip()
-        steps = re.findall(step_pattern, register)
+def iter_duplicate_step_findings(feature_filenames, analyses):
+    """
+    Yields the first occurrence of each duplicate step, from the per-file results of
+    analyze_duplicate_steps, as the results arrive.
+
+    Args:
+    - feature_filenames (list of str): The names of the feature files.
+    - analyses (iterable): The result of analyze_duplicate_steps for each file, in the same order.
+
+    Returns:
+    - generator of tuples: Filename, line, column (None, not tracked), message and snippet
+      hash of each finding.
+    """
+    for filename, (registers, _) in zip(feature_filenames, analyses):
+        for _, _, register_hash, steps in registers:
+            for step_line, step, count in steps:
+                yield filename, step_line, None, f"'{step}' appears {count} times", register_hash
 
+
+# Verifying into background or scenario if it has some duplicate step
+def stuttering_analysis(document, registers, duplicate_steps, total_duplicate_steps):
+    for register in registers:
         # Counting duplicate steps
-        stuttering_counts = stuttering_counter(steps)
+        stuttering_counts = stuttering_counter(register.steps)
 
         # Organizing the result into a list
-        total_duplicate_steps = duplicate_steps_structure(filename, register_line, stuttering_counts, original_registers[register_index],
-                                                            duplicate_steps, total_duplicate_steps)
+        total_duplicate_steps = duplicate_steps_structure(register.steps, stuttering_counts,
+                                                          lambda: register_text(document, register),
+                                                          duplicate_steps, total_duplicate_steps)
     return total_duplicate_steps
 
 
+def register_text(document, register):
+    # Offsets and hash of the text of the background or scenario
+    start, end = document.text_span(register.line, register.end_line)
+    return start, end, snippet_hash(document.text(register.line, register.end_line))
+
+
 def stuttering_counter(steps):
     step_counts = {}
     for step in steps:
-        step = step.strip()
+        step = step.full_text.strip()
         step_counts[step] = step_counts.get(step, 0) + 1
     return step_counts
 
 
-def duplicate_steps_structure(filename, register_line, stuttering_counts, register, duplicate_steps,
+def duplicate_steps_structure(steps, stuttering_counts, locate_register, duplicate_steps,
                                total_duplicate_steps):
     duplicate_step = []
-    file_and_line = []
     for step, count in stuttering_counts.items():
         if count > 1:
-            step_line = 0
-            lines = register.split("\n")
-            for line_index, line in enumerate(lines):
-                if re.search(re.escape(step), line):
-                    step_line = register_line + line_index
-                    break
-
-            file_and_line.append(f"{filename}:{step_line}")
-            duplicate_step.append(f"'{step}' appears {count} times")
+            # Line of the first occurrence of the step
+            step_line = next(register_step.line for register_step in steps if register_step.full_text.strip() == step)
+
+            duplicate_step.append((step_line, step, count))
             total_duplicate_steps += count
 
     if duplicate_step:
-        duplicate_steps.append({
-            "file_and_line": file_and_line,
-            "duplicate_step": duplicate_step,
-            "register": register
-        })
+        # The register is only located once it is known to repeat steps
+        duplicate_steps.append((*locate_register(), duplicate_step))
     return total_duplicate_steps
 
 # Example usage
@@ -1,7 +1,24 @@
-import re
 import csv
 import os
-from tabulate import tabulate
+from rendering import render_table, rows_needed
+from read_file import read_source
+from findings import SourceSpan, SourceReader, KeptSources, snippet_hash
+
+# Bump whenever a change to the analysis can change the per-file results kept in the cache
+analysis_version = 3
+
+
+class DuplicateTestCase:
+    """
+    Test cases with the same body: the span of the body of the first one, and the file id,
+    line and title of each.
+    """
+    __slots__ = ("span", "locations")
+
+    def __init__(self, span, locations):
+        self.span = span
+        self.locations = locations
+
 
 def find_duplicate_test_cases(filenames, feature_files, csv_filename=None):
     """
@@ -10,51 +27,95 @@ def find_duplicate_test_cases(filenames, feature_files, csv_filename=None):
 
     Args:
     - filenames (list of str): The names of the feature files.
-    - feature_files (list of str): The content of the feature files.
+    - feature_files (iterable of str or Document): The content of the feature files.
     - csv_filename (str, optional): The name of the CSV file to save the report.
 
     Returns:
     - None
     """
-    test_case_count = {}
+    # Documents are parsed and analyzed one at a time and only the contents of the files with
+    # test cases are kept to be read back
+    sources = KeptSources(filenames)
+    report_duplicate_test_cases(filenames, sources.analyses(feature_files, analyze_test_cases, bool), csv_filename, sources.read_source)
+
+def analyze_test_cases(document):
+    """
+    Extracts the test cases of a single parsed feature file.
+
+    Args:
+    - document (Document): The parsed feature file.
+
+    Returns:
+    - list of tuples: Digest, start and end offsets of the body (excluding the title line),
+      line number and title line of each "Scenario:", "Example:" and "Scenario Outline:"
+      block, without its Examples tables.
+    """
+    test_cases = []
+    for scenario in document.scenarios:
+        title = document.lines[scenario.line - 1].strip()
+
+        # Exclude the first line (title) for comparison. The fixed-size digest stands for the
+        # body, so the index does not grow with the text of the test cases.
+        test_case_body = document.text(scenario.line + 1, scenario.body_end_line).strip()
+        start, end = document.text_span(scenario.line + 1, scenario.body_end_line, strip=True)
+        test_cases.append((snippet_hash(test_case_body), start, end, scenario.line, title))
+    return test_cases
+
+def report_duplicate_test_cases(filenames, analyses, csv_filename=None, read_source=read_source):
+    """
+    Merges the per-file results of analyze_test_cases and reports the duplicates.
+
+    Args:
+    - filenames (list of str): The names of the feature files.
+    - analyses (iterable): The result of analyze_test_cases for each file, in the same order.
+    - csv_filename (str, optional): The name of the CSV file to save the report.
+    - read_source (callable, optional): Returns the content or Document of a feature file from
+      its name, to read the bodies of the duplicates back. Reads the file of that name by
+      default.
+
+    Returns:
+    - int: Number of findings reported.
+    """
+    # Digest of the body -> test cases with that body
+    test_case_index = {}
+    total_test_cases = 0
     
     # Process each feature file
-    for index, (filename, text) in enumerate(zip(filenames, feature_files)):
-        lines = text.splitlines()
-        
-        # Use re.findall to capture "Scenario:", "Example:", and "Scenario Outline:"
-        test_cases = re.finditer(r"(Scenario:[^\n]*|Example:[^\n]*|Scenario Outline:[^\n]*)([\s\S]*?)(?=\n(?:\n\s*)*[@#]|Scenario:|Example:|Examples:|Scenario Outline:|Rule:|$)", text)
-        for match in test_cases:
-            test_case = match.group(0).strip()
-            line_number = text.count('\n', 0, match.start(0)) + 1  # Calculate line number
-            
-            # Exclude the first line (title) for comparison
-            test_case_lines = test_case.splitlines()
-            test_case_body = '\n'.join(test_case_lines[1:]).strip()
-            if test_case_body not in test_case_count:
-                test_case_count[test_case_body] = {'count': 0, 'titles_and_files': []}
-            test_case_count[test_case_body]['count'] += 1
-            test_case_count[test_case_body]['titles_and_files'].append(f"{filename}:{line_number} - {test_case_lines[0]}")
+    for file_id, test_cases in enumerate(analyses):
+        for digest, start, end, line_number, title in test_cases:
+            total_test_cases += 1
+            duplicate = test_case_index.get(digest)
+            if duplicate is None:
+                duplicate = test_case_index[digest] = DuplicateTestCase(SourceSpan(file_id, start, end), [])
+            duplicate.locations.append((file_id, line_number, title))
+
+    duplicates = [duplicate for duplicate in test_case_index.values() if len(duplicate.locations) > 1]
 
-    # Prepare data for reporting duplicates
-    report_data = []
-    for test_case_body, data in test_case_count.items():
-        if data['count'] > 1:
-            report_data.append([data['count'], '\n'.join(data['titles_and_files']), test_case_body])
+    # Prepare data for reporting duplicates, only the body of their first test case is read
+    # back, when shown or saved. The index keeps the order of the first test cases, so the
+    # files are read back in order.
+    report_data = None
+    if rows_needed(csv_filename):
+        source_reader = SourceReader(filenames, read_source)
+        report_data = [
+            [len(duplicate.locations),
+             '\n'.join(f"{filenames[file_id]}:{line} - {title}" for file_id, line, title in duplicate.locations),
+             source_reader.text(duplicate.span)]
+            for duplicate in duplicates
+        ]
 
     # Print overall report
-    total_test_cases = sum(len(re.findall(r"(Scenario:[\s\S]*?|Example:[\s\S]*?|Scenario Outline:[\s\S]*?)(?=\n(?:\n\s*)*[@#]|Scenario:|Example:|Scenario Outline:|$)", text)) for text in feature_files)
     print(f"- Total number of test cases: {total_test_cases}")
     print(f"- Duplicate test cases:")
     
-    if report_data:
-        print(tabulate(report_data, headers=["Count", "Files And Scenario Titles", "Test Case Body"], tablefmt="grid"))
+    if duplicates:
+        render_table(report_data, ["Count", "Files And Scenario Titles", "Test Case Body"], count=len(duplicates))
 
         # Generate CSV if filename is provided
         if csv_filename:
-            report_dir = './reports'
-            if not os.path.exists(report_dir):
-                os.mkdir(report_dir)
+            report_dir = os.path.dirname(csv_filename)
+            if report_dir and not os.path.exists(report_dir):
+                os.makedirs(report_dir)
             file_exists = os.path.isfile(csv_filename)  # Check if file already exists
             with open(csv_filename, mode='a', newline='', encoding='utf-8') as csvfile:
                 csv_writer = csv.writer(csvfile)
@@ -65,6 +126,32 @@ def find_duplicate_test_cases(filenames, feature_files, csv_filename=None):
     else:
         print("No test cases appeared more than once.")
 
+    return len(duplicates)
+
+def iter_duplicate_test_case_findings(filenames, analyses):
+    """
+    Yields every occurrence of the test cases whose body is found more than once, from the
+    per-file results of analyze_test_cases. The digests of the bodies are their snippet hashes,
+    so nothing is read back.
+
+    Args:
+    - filenames (list of str): The names of the feature files.
+    - analyses (iterable): The result of analyze_test_cases for each file, in the same order.
+
+    Returns:
+    - generator of tuples: Filename, line, column (None, not tracked), message and snippet
+      hash of each finding.
+    """
+    test_case_index = {}
+    for filename, test_cases in zip(filenames, analyses):
+        for digest, _, _, line_number, title in test_cases:
+            test_case_index.setdefault(digest, []).append((filename, line_number, title))
+
+    for digest, locations in test_case_index.items():
+        if len(locations) > 1:
+            for filename, line_number, title in locations:
+                yield filename, line_number, None, f"Body of '{title}' appears {len(locations)} times", digest
+
 # Example usage
 def run_example():
     feature_files_example = [
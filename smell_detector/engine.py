@@ -0,0 +1,203 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import read_file
+import result_cache
+from instrumentation import new_timings, add_timings, subtract_timings
+from gherkin_parser import parse_feature_file
+
+def timed_call(timing, function, *arguments):
+    # Adds the wall and CPU time of the call to timing, unless it is None
+    if timing is None:
+        return function(*arguments)
+    wall, cpu = time.perf_counter(), time.process_time()
+    result = function(*arguments)
+    timing[0] += time.perf_counter() - wall
+    timing[1] += time.process_time() - cpu
+    return result
+
+def analyze_content(content, analyzers, cache_dir=None, needs=None, timings=None):
+    """
+    Parses the content of a single feature file and runs every analyzer on it. With a cache
+    directory, results are looked up by content hash first and the file is only parsed when
+    some analyzer has no cached result. The document is dropped once analyzed, only the
+    results are kept.
+
+    Args:
+    - content (str): The content of the feature file.
+    - analyzers (list of callable): Per-file analysis functions taking a Document.
+    - cache_dir (str, optional): Directory of the persistent result cache.
+    - needs (set of str, optional): Parts of the document the analyzers read, see
+      gherkin_parser.parse_feature_file. Everything is parsed by default.
+    - timings (list of lists, optional): [wall, CPU] seconds the parsing and each analyzer
+      took are added to it, see instrumentation.new_timings. Cached results take no time.
+
+    Returns:
+    - list: The result of each analyzer, in the same order.
+    """
+    parse_timing, analyzer_timings = (None, [None] * len(analyzers)) if timings is None else (timings[0], timings[1:])
+
+    if cache_dir is None:
+        document = timed_call(parse_timing, parse_feature_file, content, needs)
+        return [timed_call(timing, analyze, document) for analyze, timing in zip(analyzers, analyzer_timings)]
+
+    digest = result_cache.content_hash(content)
+    cached_results = result_cache.load_results(cache_dir, digest)
+    keys = [result_cache.analyzer_key(analyze) for analyze in analyzers]
+    if all(key in cached_results for key in keys):
+        return [cached_results[key] for key in keys]
+
+    document = timed_call(parse_timing, parse_feature_file, content, needs)
+    for key, analyze, timing in zip(keys, analyzers, analyzer_timings):
+        if key not in cached_results:
+            cached_results[key] = timed_call(timing, analyze, document)
+    result_cache.store_results(cache_dir, digest, cached_results)
+    return [cached_results[key] for key in keys]
+
+def analyze_file(filename, analyzers, cache_dir=None, needs=None, timings=None):
+    """
+    Reads a single feature file and runs every analyzer on it, see analyze_content.
+
+    Args:
+    - filename (str): The path of the feature file.
+    - analyzers (list of callable): Per-file analysis functions taking a Document.
+    - cache_dir (str, optional): Directory of the persistent result cache.
+    - needs (set of str, optional): Parts of the document the analyzers read.
+    - timings (list of lists, optional): Times of the parsing and of each analyzer, added up.
+
+    Returns:
+    - list: The result of each analyzer, in the same order.
+    """
+    return analyze_content(read_file.read_file(filename), analyzers, cache_dir, needs, timings)
+
+def analyze_chunk(filenames, analyzers, cache_dir=None, needs=None, timed=False):
+    # The results of a few files, with their added up times when timed, for the workers
+    timings = new_timings(len(analyzers)) if timed else None
+    return [analyze_file(filename, analyzers, cache_dir, needs, timings) for filename in filenames], timings
+
+def iter_chunks(filenames, size):
+    iterator = iter(filenames)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+def iter_analyses(filenames, analyzers, jobs=1, cache_dir=None, needs=None, timings=None):
+    """
+    Runs the per-file analyzers on all the feature files, optionally spreading the files over
+    a pool of worker processes. Files are read lazily and results are yielded as soon as they
+    are ready, always in the order of `filenames`, so the reports merged from them are
+    identical to the ones of a serial run.
+
+    Args:
+    - filenames (iterable of str): The paths of the feature files.
+    - analyzers (list of callable): Per-file analysis functions taking a Document. They must be
+      module-level functions so they can be sent to the workers.
+    - jobs (int, optional): Number of worker processes. 1 runs everything in this process and
+      0 uses one worker per CPU.
+    - cache_dir (str, optional): Directory of the persistent result cache.
+    - needs (set of str, optional): Parts of the document the analyzers read.
+    - timings (list of lists, optional): Times of the parsing and of each analyzer, added up
+      wherever they run. They include a file once its results are yielded.
+
+    Returns:
+    - generator of lists: For each file, the result of each analyzer.
+    """
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+
+    if jobs == 1:
+        for _, content in read_file.iter_files(filenames):
+            yield analyze_content(content, analyzers, cache_dir, needs, timings)
+        return
+
+    # Several files per task keeps the inter-process overhead low. Only a few tasks per worker
+    # are submitted ahead, so a generator of filenames, such as the discovery walk, is consumed
+    # as the workers progress rather than all at once. Its length is unknown, so its tasks are
+    # kept small.
+    chunksize = max(1, min(len(filenames) // (jobs * 4), 64)) if isinstance(filenames, list) else 8
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = deque()
+        for chunk in iter_chunks(filenames, chunksize):
+            pending.append(executor.submit(analyze_chunk, chunk, analyzers, cache_dir, needs, timings is not None))
+            if len(pending) < jobs * 2:
+                continue
+            yield from chunk_results(pending.popleft(), timings)
+        while pending:
+            yield from chunk_results(pending.popleft(), timings)
+
+def chunk_results(future, timings):
+    results, chunk_timings = future.result()
+    if timings is not None:
+        add_timings(timings, chunk_timings)
+    return results
+
+def iter_keyed_analyses(items, analyzers, jobs=1, cache_dir=None, needs=None, timings=None):
+    """
+    Same as iter_analyses on (key, filename) pairs, yielding each analysis with the key of its
+    file, so the files can come from a generator while the caller still knows which file, or
+    group of files, each result belongs to.
+
+    Args:
+    - items (iterable of tuples): Key and path of each feature file, e.g. the discovery walk.
+    - analyzers (list of callable): Per-file analysis functions taking a Document.
+    - jobs (int, optional): Number of worker processes, as in iter_analyses.
+    - cache_dir (str, optional): Directory of the persistent result cache.
+    - needs (set of str, optional): Parts of the document the analyzers read.
+    - timings (list of lists, optional): Times of the parsing and of each analyzer, added up.
+
+    Returns:
+    - generator of tuples: Key and result of each analyzer of each file, in the order of items.
+    """
+    keys = deque()  # Keys of the files handed to iter_analyses and not yielded yet
+
+    def filenames():
+        for key, filename in items:
+            keys.append(key)
+            yield filename
+
+    for analysis in iter_analyses(filenames(), analyzers, jobs, cache_dir, needs, timings):
+        yield keys.popleft(), analysis
+
+def analyze_files(filenames, analyzers, jobs=1, cache_dir=None, needs=None, timings=None):
+    """
+    Same as iter_analyses, collecting the results in a list.
+
+    Returns:
+    - list of lists: For each file, the result of each analyzer.
+    """
+    return list(iter_analyses(filenames, analyzers, jobs, cache_dir, needs, timings))
+
+def analyze_file_groups(filename_groups, analyzers, jobs=1, cache_dir=None, needs=None, group_timings=None):
+    """
+    Runs the per-file analyzers on several groups of feature files (e.g. projects) at once, so
+    the workers are shared by every group instead of analysing one group after the other: the
+    files of a group are handed to them right after those of the previous group, as they are
+    found.
+
+    Args:
+    - filename_groups (list of iterables of str): The paths of the feature files of each
+      group, possibly generators such as the discovery walk, consumed in order.
+    - analyzers (list of callable): Per-file analysis functions taking a Document.
+    - jobs (int, optional): Number of worker processes, as in analyze_files.
+    - cache_dir (str, optional): Directory of the persistent result cache.
+    - needs (set of str, optional): Parts of the document the analyzers read.
+    - group_timings (list of lists, optional): Times of the parsing and of each analyzer, see
+      instrumentation.new_timings, added up separately for each group.
+
+    Returns:
+    - list of lists: For each group, in the given order, the result of analyze_files on its files.
+    """
+    timings = None if group_timings is None else new_timings(len(analyzers))
+    items = ((index, filename) for index, filenames in enumerate(filename_groups) for filename in filenames)
+
+    # Splitting the results back into their groups, along with the times spent on each group.
+    # Times are added up per task, so a task spanning two groups counts for the first one.
+    group_analyses = [[] for _ in filename_groups]
+    earlier_timings = None if timings is None else new_timings(len(analyzers))
+    for index, analysis in iter_keyed_analyses(items, analyzers, jobs, cache_dir, needs, timings):
+        group_analyses[index].append(analysis)
+        if timings is not None:
+            add_timings(group_timings[index], subtract_timings(timings, earlier_timings))
+            earlier_timings = [timing[:] for timing in timings]
+    return group_analyses
@@ -0,0 +1,60 @@
+import sys
+
+class FileTable:
+    """
+    Ids, names and paths of the feature files of a group, assigned once when the files are
+    found. The reports are given the table as their filenames: indexing it or iterating over
+    it gives the names in id order, so the position of a file is its id, their indexes keep
+    (file id, line) pairs and only format "name:line" strings for the output, and the
+    snippets are read back from the paths, see findings.SourceReader.
+    """
+    __slots__ = ("prefix", "names", "paths")
+
+    def __init__(self, prefix=""):
+        self.prefix = prefix  # Removed from the paths to get the names shown in the reports
+        self.names = []
+        self.paths = []
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, file_id):
+        return self.names[file_id]
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def add(self, path):
+        """
+        Gives the next id to a feature file.
+
+        Args:
+        - path (str or Path): Path of the feature file.
+
+        Returns:
+        - int: The id of the file.
+        """
+        path = str(path)
+        self.paths.append(path)
+        # Interned, as the names are compared and used as keys all over the reports
+        self.names.append(sys.intern(path.removeprefix(self.prefix)))
+        return len(self.paths) - 1
+
+    def extend(self, paths):
+        for path in paths:
+            self.add(path)
+        return self
+
+    def added(self, paths):
+        """
+        Gives the next ids to feature files as they are consumed, e.g. while the discovery walk
+        is analyzed, so the table never holds more than the files already handed out.
+
+        Args:
+        - paths (iterable of str or Path): Paths of the feature files.
+
+        Returns:
+        - generator of str: The paths, in id order.
+        """
+        for path in paths:
+            yield self.paths[self.add(path)]
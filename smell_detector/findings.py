@@ -0,0 +1,121 @@
+import hashlib
+import json
+from collections import namedtuple
+from read_file import read_source
+from gherkin_parser import iter_feature_files
+from file_table import FileTable
+
+# One smell found in one place, the unit of the machine-readable outputs.
+# - detector (str): Name of the detector, as in detector_registry.
+# - file (str): Name of the feature file.
+# - line (int or None): 1-based line of the smell, None when it concerns the whole file.
+# - column (int or None): 1-based column of the smell, None when only the line is known.
+# - severity (str): "error", "warning" or "note".
+# - message (str): What was found.
+# - snippet_hash (str or None): Hash of the text the smell is about, equal for equal texts, so
+#   the same snippet can be followed across files and runs without shipping its text.
+Finding = namedtuple("Finding", ["detector", "file", "line", "column", "severity", "message", "snippet_hash"])
+
+def snippet_hash(text):
+    # Also the digest of the bodies indexed by duplicate_test_case, so its digests are used as they are
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+class SourceSpan:
+    """
+    Characters start to end of the feature file file_id, its position in the list of files of
+    the report. Findings point at their snippet with it instead of keeping a copy of the text,
+    which is only read back when the report is rendered, see SourceReader.
+    """
+    __slots__ = ("file_id", "start", "end")
+
+    def __init__(self, file_id, start, end):
+        self.file_id = file_id
+        self.start = start
+        self.end = end
+
+
+class SourceReader:
+    """
+    Reads the snippets of source spans back from their feature files. Reports go through the
+    files in order, so only the content of the last file read is kept. The files are read from
+    the paths of a FileTable, or from the names of a list.
+    """
+    def __init__(self, filenames, read_source=read_source):
+        self.filenames = filenames.paths if isinstance(filenames, FileTable) else filenames
+        self.read_source = read_source  # Content or Document of a feature file from its name
+        self.file_id = None
+        self.content = None
+
+    def text(self, span):
+        if span.file_id != self.file_id:
+            source = self.read_source(self.filenames[span.file_id])
+            self.content = source if isinstance(source, str) else "\n".join(source.lines)
+            self.file_id = span.file_id
+        return self.content[span.start:span.end]
+
+
+class KeptSources:
+    """
+    Feature files given as contents instead of being read from their files, as the find_*
+    functions take them, for SourceReader. The contents are parsed once and only those of the
+    files with registers are kept, so the contents can come from a generator and the other
+    files are dropped as soon as they are analyzed.
+    """
+    def __init__(self, filenames):
+        self.filenames = filenames
+        self.contents = {}  # Filename -> content, until SourceReader reads it back
+
+    def analyses(self, feature_files, analyze, registers=lambda analysis: analysis[0]):
+        """
+        Parses and analyzes the feature files one at a time.
+
+        Args:
+        - feature_files (iterable of str or Document): The content of the feature files.
+        - analyze (callable): Per-file analysis function taking a Document.
+        - registers (callable, optional): Returns the registers of an analysis, whose file is
+          read back if there are any. The first item of the analysis by default.
+
+        Returns:
+        - generator: The analysis of each file.
+        """
+        for filename, document in zip(self.filenames, iter_feature_files(feature_files)):
+            analysis = analyze(document)
+            if registers(analysis):
+                self.contents[filename] = "\n".join(document.lines)
+            yield analysis
+
+    def read_source(self, filename):
+        # SourceReader reads each file once, in order, so its content is no longer needed after
+        return self.contents.pop(filename)
+
+def write_ndjson(findings, stream):
+    """
+    Writes findings as newline-delimited JSON, one object per line, as they are produced, so
+    they never have to be held in memory together.
+
+    Args:
+    - findings (iterable of Finding): The findings, possibly a generator.
+    - stream (file): Text stream to write to.
+
+    Returns:
+    - int: Number of findings written.
+    """
+    count = 0
+    for finding in findings:
+        stream.write(json.dumps(finding._asdict(), ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+class NdjsonWriter:
+    """
+    Writes the findings of a run to a text stream as NDJSON, see write_ndjson.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, findings):
+        return write_ndjson(findings, self.stream)
+
+    def close(self):
+        pass
@@ -0,0 +1,330 @@
+from patterns import tag_pattern, scenario_keywords, examples_keywords, step_keywords
+import line_classifier
+from line_classifier import classify_line, block_kinds
+from line_index import build_line_index_from_lines, line_and_column, offset_of
+
+# Bump whenever a change to the parser can change what the detectors find
+parser_version = 2
+
+class Document:
+    """
+    Parsed representation of a single feature file.
+
+    The tree starts at `feature` (Feature -> Background/Rule -> Scenario -> Steps/Examples).
+    The flat `backgrounds`, `rules` and `scenarios` lists hold every node of that kind in
+    file order, including the ones nested inside rules, so detectors don't have to walk the tree.
+    `line_kinds` holds the kind the line classifier gave to each line, doc string content
+    being of kind "docstring", when the parser was asked for it.
+    """
+    __slots__ = ("lines", "line_kinds", "feature", "backgrounds", "rules", "scenarios", "_line_starts")
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.line_kinds = []
+        self.feature = None
+        self.backgrounds = []
+        self.rules = []
+        self.scenarios = []
+        self._line_starts = None
+
+    def text(self, start_line, end_line):
+        # Lines are 1-based and the range is inclusive
+        return '\n'.join(self.lines[start_line - 1:end_line])
+
+    @property
+    def line_starts(self):
+        # Built on first use, once per file
+        if self._line_starts is None:
+            self._line_starts = build_line_index_from_lines(self.lines)
+        return self._line_starts
+
+    def position(self, offset):
+        # 1-based line and column of an offset in the file
+        return line_and_column(self.line_starts, offset)
+
+    def offset(self, line, column=1):
+        # Offset in the file of a 1-based line and column
+        return offset_of(self.line_starts, line, column)
+
+    def text_span(self, start_line, end_line, strip=False):
+        # Offsets in the file of the start and end of text(start_line, end_line), stripped if asked
+        text = self.text(start_line, end_line)
+        if not text:
+            return 0, 0
+        start = self.offset(start_line)
+        if strip:
+            stripped = text.lstrip()
+            start += len(text) - len(stripped)
+            text = stripped.rstrip()
+        return start, start + len(text)
+
+    def indentation_column(self, line):
+        # 1-based column of the first character of a line that is not whitespace
+        text = self.lines[line - 1]
+        return len(text) - len(text.lstrip()) + 1
+
+
+class Feature:
+    __slots__ = ("keyword", "title", "line", "tags", "background", "rules", "scenarios")
+
+    def __init__(self, keyword, title, line, tags):
+        self.keyword = keyword
+        self.title = title
+        self.line = line
+        self.tags = tags
+        self.background = None
+        self.rules = []
+        self.scenarios = []
+
+
+class Rule:
+    __slots__ = ("keyword", "title", "line", "tags", "background", "scenarios")
+
+    def __init__(self, keyword, title, line, tags):
+        self.keyword = keyword
+        self.title = title
+        self.line = line
+        self.tags = tags
+        self.background = None
+        self.scenarios = []
+
+
+class Background:
+    __slots__ = ("keyword", "title", "line", "end_line", "steps")
+
+    def __init__(self, keyword, title, line):
+        self.keyword = keyword
+        self.title = title
+        self.line = line
+        self.end_line = line
+        self.steps = []
+
+
+class Scenario:
+    """
+    A Scenario, Example or Scenario Outline. `keyword` keeps the exact keyword used in the file.
+    """
+    __slots__ = ("keyword", "title", "line", "end_line", "tags", "steps", "examples")
+
+    def __init__(self, keyword, title, line, tags):
+        self.keyword = keyword
+        self.title = title
+        self.line = line
+        self.end_line = line
+        self.tags = tags
+        self.steps = []
+        self.examples = []
+
+    @property
+    def body_end_line(self):
+        # Last line of the steps (and their arguments), Examples tables excluded
+        return self.steps[-1].end_line if self.steps else self.line
+
+
+class Step:
+    """
+    A step line. `text` is everything after the keyword; `argument` holds the raw lines of an
+    attached doc string or data table.
+    """
+    __slots__ = ("keyword", "text", "line", "end_line", "argument")
+
+    def __init__(self, keyword, text, line):
+        self.keyword = keyword
+        self.text = text
+        self.line = line
+        self.end_line = line
+        self.argument = []
+
+    @property
+    def full_text(self):
+        # Step text followed by its argument, as it is written in the file
+        if self.argument:
+            return '\n'.join([self.text] + self.argument)
+        return self.text
+
+
+class Examples:
+    __slots__ = ("keyword", "title", "line", "end_line", "tags", "rows")
+
+    def __init__(self, keyword, title, line, tags):
+        self.keyword = keyword
+        self.title = title
+        self.line = line
+        self.end_line = line
+        self.tags = tags
+        self.rows = []
+
+
+class Tag:
+    __slots__ = ("name", "line", "column")
+
+    def __init__(self, name, line, column):
+        self.name = name
+        self.line = line
+        self.column = column
+
+
+def parse_feature_file(text, needs=None):
+    """
+    Parses the content of a feature file into a Document, reading it line by line only once.
+
+    Args:
+    - text (str): The content of the feature file.
+    - needs (set of str, optional): Parts of the document to build besides the Feature line,
+      "blocks" (rules, backgrounds, scenarios and steps), "tags", "examples" (rows of the
+      Examples tables) and "line_kinds". All but "line_kinds", which no detector reads, by
+      default. Without "blocks", parsing stops at the Feature line.
+
+    Returns:
+    - Document: The parsed feature file.
+    """
+    # Splitting on "\n" only keeps line numbers and offsets consistent with the line index
+    lines = text.split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    document = Document(lines)
+
+    container = None  # Feature or Rule receiving the next blocks
+    block = None  # Background or Scenario receiving the next steps
+    examples = None  # Examples receiving the next table rows
+    step = None  # Step receiving the next doc string or table lines
+    pending_tags = []
+    docstring_delimiter = None
+
+    parse_blocks = needs is None or "blocks" in needs
+    parse_tags = needs is None or "tags" in needs
+    parse_examples = needs is None or "examples" in needs
+    # Appending to a throwaway list costs less than testing the need on every line
+    line_kinds = document.line_kinds if needs is not None and "line_kinds" in needs else []
+    for line_number, line in enumerate(lines, start=1):
+        # Doc string content belongs to the last step, whatever it looks like
+        if docstring_delimiter:
+            step.argument.append(line)
+            step.end_line = line_number
+            block.end_line = line_number
+            if line.strip().startswith(docstring_delimiter):
+                docstring_delimiter = None
+                line_kinds.append(line_classifier.docstring_delimiter)
+            else:
+                line_kinds.append(line_classifier.docstring)
+            continue
+
+        # Each line is classified once, the rest of the parser only dispatches on its kind
+        kind, value = classify_line(line)
+        line_kinds.append(kind)
+
+        if kind == line_classifier.blank or kind == line_classifier.comment:
+            continue
+
+        if kind == line_classifier.tag:
+            if parse_tags:
+                # value is the stripped line, so the columns start after the indentation
+                indentation = len(line) - len(line.lstrip())
+                pending_tags.extend(Tag(match.group(), line_number, indentation + match.start() + 1)
+                                    for match in tag_pattern.finditer(value.split(" #")[0]))
+            continue
+
+        if kind in block_kinds:
+            keyword, title = kind, value
+            tags, pending_tags = pending_tags, []
+            step = None
+
+            if keyword == "Feature":
+                if document.feature is None:
+                    document.feature = Feature(keyword, title, line_number, tags)
+                    container = document.feature
+                    block = examples = None
+                    if not parse_blocks:
+                        break
+                continue
+
+            # Blocks found before any "Feature:" line are attached to an implicit feature
+            if container is None:
+                document.feature = Feature("", "", line_number, [])
+                container = document.feature
+                if not parse_blocks:
+                    break
+
+            if keyword == "Rule":
+                rule = Rule(keyword, title, line_number, tags)
+                document.feature.rules.append(rule)
+                document.rules.append(rule)
+                container = rule
+                block = examples = None
+            elif keyword == "Background":
+                block = Background(keyword, title, line_number)
+                container.background = block
+                document.backgrounds.append(block)
+                examples = None
+            elif keyword in scenario_keywords:
+                block = Scenario(keyword, title, line_number, tags)
+                container.scenarios.append(block)
+                document.scenarios.append(block)
+                examples = None
+            elif keyword in examples_keywords and isinstance(block, Scenario):
+                examples = Examples(keyword, title, line_number, tags)
+                block.examples.append(examples)
+                block.end_line = line_number
+            continue
+
+        # Tags only belong to the block right below them
+        pending_tags = []
+
+        if block is None:
+            continue  # Free-form description of a Feature or Rule
+
+        if examples is not None:
+            if kind == line_classifier.table_row:
+                if parse_examples:
+                    examples.rows.append((line_number, [cell.strip() for cell in value.strip("|").split("|")]))
+                examples.end_line = line_number
+                block.end_line = line_number
+            continue
+
+        if kind in step_keywords:
+            step = Step(kind, value, line_number)
+            block.steps.append(step)
+            block.end_line = line_number
+        elif step is not None and kind == line_classifier.docstring_delimiter:
+            docstring_delimiter = value
+            step.argument.append(line)
+            step.end_line = line_number
+            block.end_line = line_number
+        elif step is not None and kind == line_classifier.table_row:
+            step.argument.append(line)
+            step.end_line = line_number
+            block.end_line = line_number
+        else:
+            block.end_line = line_number  # Description or free text inside the block
+
+    return document
+
+
+def iter_feature_files(feature_files):
+    """
+    Parses feature files lazily, one at a time, so a caller that only keeps what it extracts
+    from each document never holds more than one of them. Entries that are already parsed are
+    reused as they are, so detectors can be given either raw contents or the documents built
+    by the runner.
+
+    Args:
+    - feature_files (iterable of str or Document): The content of the feature files.
+
+    Returns:
+    - generator of Document: The parsed feature files.
+    """
+    for feature_file in feature_files:
+        yield feature_file if isinstance(feature_file, Document) else parse_feature_file(feature_file)
+
+
+def parse_feature_files(feature_files):
+    """
+    Parses a list of feature files, see iter_feature_files.
+
+    Args:
+    - feature_files (list of str or Document): The content of the feature files.
+
+    Returns:
+    - list of Document: The parsed feature files.
+    """
+    return list(iter_feature_files(feature_files))
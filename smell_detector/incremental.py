@@ -0,0 +1,140 @@
+import json
+import os
+import subprocess
+import tempfile
+from read_file import read_file
+from result_cache import content_hash
+
+def git_lines(directory, arguments):
+    # Output lines of a git command run from a directory of the repository. Failures are
+    # raised as ValueError, with the error git printed, like the other bad inputs of a run.
+    try:
+        completed = subprocess.run(["git", "-C", directory, *arguments], capture_output=True, text=True, check=True)
+    except FileNotFoundError as error:
+        raise ValueError(f"git is needed to compare with a revision: {error}") from error
+    except subprocess.CalledProcessError as error:
+        raise ValueError(f"git {arguments[0]} failed in {directory}: {error.stderr.strip()}") from error
+    return [line for line in completed.stdout.split("\n") if line]
+
+def changed_feature_files(directory, base_revision, extension=".feature"):
+    """
+    Lists the feature files of a directory that differ between a base revision and the working
+    tree, untracked files included, as reported by the local git repository.
+
+    Args:
+    - directory (str): Directory inside a git repository.
+    - base_revision (str): Revision the working tree is compared with, e.g. "origin/main".
+    - extension (str, optional): Extension of the feature files.
+
+    Returns:
+    - tuple: Sorted paths, relative to `directory`, of the added or modified feature files and
+      of the deleted ones.
+    """
+    changed = set()
+    deleted = set()
+    # Renames are reported as a deletion and an addition
+    for line in git_lines(directory, ["diff", "--name-status", "--no-renames", "--relative", base_revision, "--"]):
+        status, path = line.split("\t", 1)
+        if path.endswith(extension):
+            (deleted if status == "D" else changed).add(path)
+    for path in git_lines(directory, ["ls-files", "--others", "--exclude-standard"]):
+        if path.endswith(extension):
+            changed.add(path)
+    return sorted(changed, key=path_order), sorted(deleted, key=path_order)
+
+def path_order(path):
+    # Same order as the discovery: depth-first, the files of a directory by name before its
+    # subdirectories by name
+    *directories, name = path.split("/")
+    return [(1, directory) for directory in directories] + [(0, name)]
+
+def current_revision(directory):
+    # Commit checked out in the repository of a directory
+    return git_lines(directory, ["rev-parse", "HEAD"])[0]
+
+def file_state(filename):
+    # Modification time and size, which change with the content in practice
+    status = os.stat(filename)
+    return [status.st_mtime_ns, status.st_size]
+
+def load_index(index_path, keys):
+    """
+    Loads the persisted project index, holding for every feature file of a project its
+    analyzer results, the content hash they were computed from and the state of the file
+    when it was hashed.
+
+    Args:
+    - index_path (str): Path of the index file.
+    - keys (list of str): Cache keys of the current analyzers, see result_cache.analyzer_key.
+
+    Returns:
+    - tuple: Revision checked out when the index was saved, and entry of each file by
+      filename. (None, {}) if there is no index, if it is unreadable or if it was built by
+      other analyzer versions.
+    """
+    try:
+        with open(index_path, "r", encoding="utf-8") as index_file:
+            index = json.load(index_file)
+    except (OSError, ValueError):
+        return None, {}
+    if index.get("keys") != keys:
+        return None, {}
+    return index.get("revision"), index["files"]
+
+def outdated_files(filenames, files, same_revision):
+    """
+    Finds the feature files whose indexed results no longer match their content, as the files
+    arrive. A file whose state did not change since it was hashed is trusted, as long as the
+    same revision is checked out; any other file is hashed again and only analyzed again if
+    its content hash changed.
+
+    Args:
+    - filenames (iterable of str): Feature files of the project, as found now, e.g. the
+      discovery walk.
+    - files (dict): Entries of the index by filename, updated in place: the state of the files
+      with an unchanged content is refreshed and, once filenames is exhausted, the entries of
+      the files that are gone are removed.
+    - same_revision (bool): Whether the index was saved with the revision checked out now.
+
+    Returns:
+    - generator of tuples: Filename, state and content hash of each file to analyze, in the
+      order of filenames.
+    """
+    found = set()
+    for filename in filenames:
+        found.add(filename)
+        state = file_state(filename)
+        entry = files.get(filename)
+        if entry is not None and same_revision and entry["state"] == state:
+            continue
+        digest = content_hash(read_file(filename))
+        if entry is not None and entry["hash"] == digest:
+            entry["state"] = state
+            continue
+        yield filename, state, digest
+    for filename in set(files).difference(found):
+        del files[filename]
+
+def index_entry(state, digest, results):
+    return {"state": state, "hash": digest, "results": results}
+
+def store_index(index_path, keys, revision, files):
+    """
+    Saves the project index, writing it to a temporary file first and moving it in place so
+    an interrupted run never leaves a partial index.
+
+    Args:
+    - index_path (str): Path of the index file.
+    - keys (list of str): Cache keys of the analyzers that produced the results.
+    - revision (str): Revision checked out when the files were checked.
+    - files (dict): Entry of each file by filename, see index_entry.
+
+    Returns:
+    - None
+    """
+    directory = os.path.dirname(index_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(file_descriptor, "w", encoding="utf-8") as index_file:
+        json.dump({"keys": keys, "revision": revision, "files": {filename: files[filename] for filename in sorted(files, key=path_order)}}, index_file)
+    os.replace(temporary_path, index_path)
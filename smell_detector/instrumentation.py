@@ -0,0 +1,180 @@
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from tabulate import tabulate
+
+# Peak memory is only measured on demand, tracing allocations slows the run down
+trace_memory = False
+
+def new_timings(count):
+    # [wall, CPU] seconds of the parsing, then of each of `count` analyzers, see engine.analyze_content
+    return [[0.0, 0.0] for _ in range(count + 1)]
+
+def add_timings(total, timings):
+    for total_timing, timing in zip(total, timings):
+        total_timing[0] += timing[0]
+        total_timing[1] += timing[1]
+
+def subtract_timings(timings, earlier):
+    return [[timing[0] - earlier_timing[0], timing[1] - earlier_timing[1]] for timing, earlier_timing in zip(timings, earlier)]
+
+def cpu_time():
+    # CPU time of this process and of the worker processes it has already waited for
+    times = os.times()
+    return time.process_time() + times.children_user + times.children_system
+
+
+class Measure:
+    """
+    Wall time, CPU time, peak memory, input size and findings of one stage of a run: the whole
+    run of a project or the work of one detector on it.
+    """
+    __slots__ = ("project", "stage", "wall_time", "cpu_time", "peak_memory", "files", "bytes", "findings")
+
+    def __init__(self, project, stage):
+        self.project = project
+        self.stage = stage
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.peak_memory = 0  # Bytes, 0 when memory is not traced
+        self.files = 0
+        self.bytes = 0
+        self.findings = 0
+
+    @property
+    def files_per_second(self):
+        return self.files / self.wall_time if self.wall_time else 0.0
+
+    @property
+    def bytes_per_second(self):
+        return self.bytes / self.wall_time if self.wall_time else 0.0
+
+    def as_dict(self):
+        return {
+            **{name: getattr(self, name) for name in self.__slots__},
+            "files_per_second": self.files_per_second,
+            "bytes_per_second": self.bytes_per_second,
+        }
+
+
+@contextmanager
+def measure(*measures):
+    """
+    Adds the wall time, CPU time and peak memory of the block to measures, e.g. those of a
+    detector and of its project. Blocks must not be nested, the peak memory of the outer one
+    would be lost.
+
+    Args:
+    - measures (Measure or None): The measures, None ones are skipped.
+
+    Returns:
+    - context manager
+    """
+    measures = [stage_measure for stage_measure in measures if stage_measure is not None]
+    if not measures:
+        yield
+        return
+    if trace_memory:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+    wall, cpu = time.perf_counter(), cpu_time()
+    try:
+        yield
+    finally:
+        wall, cpu = time.perf_counter() - wall, cpu_time() - cpu
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+        for stage_measure in measures:
+            stage_measure.wall_time += wall
+            stage_measure.cpu_time += cpu
+            stage_measure.peak_memory = max(stage_measure.peak_memory, peak)
+
+
+class RunProfile:
+    """
+    Measures of a run, per project and per detector. The total of a project covers reading,
+    parsing and analyzing its files and every report. The measure of a detector covers its
+    share of the analysis, parsing excluded, and its report.
+    """
+    total_stage = "total"
+
+    def __init__(self):
+        self.measures = {}  # (project, detector name or "total") -> Measure, in the order of the run
+
+    def stage(self, project, stage):
+        key = (project, stage)
+        if key not in self.measures:
+            self.measures[key] = Measure(project, stage)
+        return self.measures[key]
+
+    def total(self, project):
+        return self.stage(project, self.total_stage)
+
+    def record_analysis(self, project, selected_detectors, filenames, timings):
+        """
+        Records the size of the analyzed files of a project and the time spent in the analysis
+        of each detector.
+
+        Args:
+        - project (str): Name of the project.
+        - selected_detectors (list of Detector): The detectors that analyzed the files.
+        - filenames (list of str): The paths of the analyzed files.
+        - timings (list of lists): [wall, CPU] seconds of the parsing and of each detector,
+          see new_timings.
+
+        Returns:
+        - None
+        """
+        size = sum(os.path.getsize(filename) for filename in filenames)
+        stages = [self.total(project)] + [self.stage(project, detector.name) for detector in selected_detectors]
+        for stage_measure in stages:
+            stage_measure.files = len(filenames)
+            stage_measure.bytes = size
+        for stage_measure, (wall, cpu) in zip(stages[1:], timings[1:]):
+            stage_measure.wall_time += wall
+            stage_measure.cpu_time += cpu
+
+    def record_findings(self, project, detector_name, findings):
+        self.stage(project, detector_name).findings += findings
+        self.total(project).findings += findings
+
+    def summary(self, file=None):
+        """
+        Prints one row per detector and project, then one per project.
+
+        Args:
+        - file (file, optional): Stream the table is printed to, the standard output by default.
+
+        Returns:
+        - None
+        """
+        report_data = []
+        for stage_measure in sorted(self.measures.values(), key=lambda stage_measure: stage_measure.stage == self.total_stage):
+            report_data.append([
+                stage_measure.project,
+                stage_measure.stage,
+                f"{stage_measure.wall_time:.3f}",
+                f"{stage_measure.cpu_time:.3f}",
+                f"{stage_measure.peak_memory / 2 ** 20:.1f}" if trace_memory else "-",
+                f"{stage_measure.files_per_second:.0f}",
+                f"{stage_measure.bytes_per_second / 2 ** 20:.2f}",
+                stage_measure.findings,
+            ])
+        print(tabulate(report_data, headers=["Project", "Detector", "Wall (s)", "CPU (s)", "Peak memory (MiB)",
+                                             "Files/s", "MiB/s", "Findings"], tablefmt="grid"), file=file)
+
+    def write(self, filename):
+        """
+        Saves the measures as JSON.
+
+        Args:
+        - filename (str): Path of the JSON file.
+
+        Returns:
+        - None
+        """
+        with open(filename, "w", encoding="utf-8") as file:
+            json.dump({"trace_memory": trace_memory, "measures": [stage_measure.as_dict() for stage_measure in self.measures.values()]},
+                      file, indent=2)
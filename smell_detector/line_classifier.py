@@ -0,0 +1,61 @@
+from patterns import block_keywords, step_keywords
+
+# Kinds of the lines that don't start with a keyword
+blank = "blank"
+comment = "comment"
+tag = "tag"
+table_row = "table_row"
+docstring_delimiter = "docstring_delimiter"
+docstring = "docstring"  # Content of a doc string, only known to the parser
+text = "text"  # Descriptions and any other free text
+
+# First character of the stripped line -> kind, for the kinds recognized by their first character
+first_character_kinds = {
+    "#": comment,
+    "@": tag,
+    "|": table_row,
+}
+
+# First token of the stripped line -> kind, for the step keywords
+step_kinds = {keyword: keyword for keyword in step_keywords}
+
+# Text before the first colon -> kind, for the block keywords
+block_kinds = {keyword: keyword for keyword in block_keywords}
+
+def classify_line(line):
+    """
+    Tags a line with its Gherkin kind in a single pass, using dispatch tables on its first
+    character, its first token and the text before its first colon instead of trying one
+    pattern after the other.
+
+    Args:
+    - line (str): The line, without its line break.
+
+    Returns:
+    - tuple: The kind of the line (the keyword for block and step lines, otherwise one of the
+      kinds of this module) and its value: the title of a block, the text of a step, the
+      delimiter of a doc string or the stripped line.
+    """
+    stripped = line.strip()
+    if not stripped:
+        return blank, stripped
+
+    kind = first_character_kinds.get(stripped[0])
+    if kind:
+        return kind, stripped
+
+    if stripped.startswith('"""') or stripped.startswith("```"):
+        return docstring_delimiter, stripped[:3]
+
+    head, colon, title = stripped.partition(":")
+    if colon:
+        kind = block_kinds.get(head)
+        if kind:
+            return kind, title.strip()
+
+    tokens = stripped.split(None, 1)
+    kind = step_kinds.get(tokens[0])
+    if kind:
+        return kind, tokens[1] if len(tokens) > 1 else ""
+
+    return text, stripped
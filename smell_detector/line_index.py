@@ -0,0 +1,43 @@
+from bisect import bisect_right
+from itertools import accumulate
+
+def build_line_index_from_lines(lines):
+    """
+    Builds the offset of the start of every line of a text already split on "\\n", so offsets
+    can be turned into line numbers without counting the newlines before them again.
+
+    Args:
+    - lines (list of str): The lines of the text, without their "\\n".
+
+    Returns:
+    - list of int: Offset of the first character of each line, the first line starting at 0.
+    """
+    return [0] + list(accumulate(len(line) + 1 for line in lines[:-1])) if lines else [0]
+
+def line_and_column(line_starts, offset):
+    """
+    Turns an offset into a line and column by bisection over the line index.
+
+    Args:
+    - line_starts (list of int): The line index of the text.
+    - offset (int): Offset of a character in the text.
+
+    Returns:
+    - tuple: 1-based line number and 1-based column of the offset.
+    """
+    line = bisect_right(line_starts, offset)
+    return line, offset - line_starts[line - 1] + 1
+
+def offset_of(line_starts, line, column=1):
+    """
+    Turns a line and column back into an offset.
+
+    Args:
+    - line_starts (list of int): The line index of the text.
+    - line (int): 1-based line number.
+    - column (int, optional): 1-based column.
+
+    Returns:
+    - int: Offset of the character in the text.
+    """
+    return line_starts[line - 1] + column - 1
@@ -1,41 +1,140 @@
+import argparse
+import os
+import sys
+from contextlib import contextmanager
 import runner
-from utils import title
-from tabulate import tabulate
-
-projects = [
-    "inukshuk_jekyll-scholar",
-    "keygen-sh_keygen-api",
-    "opencypher_openCypher",
-    "scality_Zenko",
-    "sdkman_sdkman-cli",
-    "serverlessworkflow_specification",
-    "thoughtbot_factory_bot_rails",
-    "RUN ALL PROJECTS",
-    "sample",
-    "EXIT"
-]
-
-title("Select Project", "white")
-if projects:
-    options = [
-        [i + 1, item]
-        for i, item in enumerate(projects)
-    ]
-    print(tabulate(options, headers=["Project Index", "Description"], tablefmt="pretty"))
-else:
-    print("No content available")
-
-try:
-    choice = int(input("Choice: "))
-    choice -= 1
-
-    if -1 < choice < 7 or choice == 8:
-        runner.execute_project(projects[choice])
-    elif choice == 7:
-        runner.execute_projects(projects[:-3])
-    elif choice == 9:
-        print("goodbye...")
-    else:
-        print("choice doesn't exist")
-except Exception as e:
-    print("ERROR: ", e)
\ No newline at end of file
+import rendering
+import instrumentation
+from instrumentation import RunProfile
+from profiling import DetectorProfiler
+from detector_registry import detectors, detector_names, select_detectors
+from findings import NdjsonWriter
+from sarif import SarifWriter
+
+# Exit codes
+exit_clean = 0  # No findings
+exit_findings = 1  # At least one finding
+exit_error = 2  # Bad arguments or unreadable paths, as argparse does
+
+def fraction(value):
+    # Type of the similarity thresholds and shares of scenarios, which 0 or less would make
+    # match everything and more than 1 nothing
+    number = float(value)
+    if not 0 < number <= 1:
+        raise argparse.ArgumentTypeError(f"{value} is not in (0, 1]")
+    return number
+
+def parse_arguments(arguments=None):
+    parser = argparse.ArgumentParser(description="Detects smells in Gherkin feature files.",
+                                     epilog="Exits with 0 when nothing is found, 1 when smells are found and 2 on errors.")
+    parser.add_argument("paths", nargs="+",
+                        help="feature files, directories walked recursively or globs (** matches any depth), each analyzed as a group of its own, e.g. a project")
+    parser.add_argument("--include", action="append", metavar="GLOB",
+                        help="only analyze the files of the given directories matching this glob, relative to the "
+                             "directory (* does not cross /, ** does), may be repeated")
+    parser.add_argument("--exclude", action="append", metavar="GLOB",
+                        help="skip the files and directories of the given directories matching this glob, may be repeated")
+    parser.add_argument("--detector", action="append", dest="detectors", metavar="NAME",
+                        choices=detector_names(),
+                        help="detector to run, may be repeated (default: all but the opt-in near_duplicate_test_case). One of: %(choices)s")
+    parser.add_argument("--format", choices=["table", "csv", "ndjson", "sarif"], default="table",
+                        help="table only prints the reports, csv also saves them in --report-dir, "
+                             "ndjson streams one JSON finding per line to --output and sarif a SARIF 2.1.0 log")
+    parser.add_argument("--report-dir", default="reports",
+                        help="directory of the CSV reports")
+    parser.add_argument("--render", choices=("auto",) + rendering.render_modes, default="auto",
+                        help="how the tables of the reports are printed: full grids, grids with truncated cells, "
+                             "tab-separated rows, only their number of rows or nothing (default: auto, full on a "
+                             "terminal and plain otherwise)")
+    parser.add_argument("--snippet-lines", type=int, default=rendering.snippet_lines,
+                        help="lines kept in each cell by --render truncated")
+    parser.add_argument("--output", default=None,
+                        help="file the ndjson or sarif findings are written to (default: standard output)")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="number of worker processes analysing the files (0 uses one per CPU)")
+    parser.add_argument("--cache-dir", default=None,
+                        help="directory where per-file results are cached between runs")
+    parser.add_argument("--near-duplicate-threshold", type=fraction, default=None,
+                        help="Jaccard similarity of the steps from which scenarios are reported as near-duplicates, in (0, 1] (default: 0.8)")
+    parser.add_argument("--background-fraction", type=fraction, default=None,
+                        help="share of the scenarios of a feature that must start with the same Given steps to report a missing background, in (0, 1] (default: 1.0)")
+    parser.add_argument("--base-revision", default=None,
+                        help="only analyze the feature files changed since this git revision (paths must be directories)")
+    parser.add_argument("--index-dir", default=".smell_index",
+                        help="directory of the indexes kept between incremental runs")
+    parser.add_argument("--stats", action="store_true",
+                        help="print the time, CPU, throughput and findings of each detector on standard error")
+    parser.add_argument("--stats-output", default=None,
+                        help="JSON file the measures of the run are saved to")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="also measure the peak memory of each detector with tracemalloc, which slows the run down")
+    parser.add_argument("--profile", default=None, metavar="DIR",
+                        help="profile each detector with cProfile and save <detector>.pstats and <detector>.folded "
+                             "collapsed stacks for flame graphs in DIR (the files are then analyzed by one process)")
+    parser.add_argument("--profile-top", type=int, default=15,
+                        help="hot functions of each detector printed on standard error by --profile")
+    return parser.parse_args(arguments)
+
+def set_setting(detector_name, setting, value):
+    # Overrides a module setting of a detector, which imports it, so only when given
+    if value is not None:
+        setattr(select_detectors([detector_name])[0].module, setting, value)
+
+@contextmanager
+def findings_writer(args):
+    # Writer of the ndjson or sarif findings, None for the reports
+    if args.format not in ("ndjson", "sarif"):
+        yield None
+        return
+    stream = sys.stdout if args.output is None else open(args.output, "w", encoding="utf-8")
+    try:
+        if args.format == "ndjson":
+            writer = NdjsonWriter(stream)
+        else:
+            # The SARIF locations are relative to the deepest directory holding every path
+            root = os.path.commonpath([os.path.abspath(root) for root in runner.path_roots(args.paths)])
+            writer = SarifWriter(stream, detectors, root=root)
+        yield writer
+        writer.close()
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+def main(arguments=None):
+    args = parse_arguments(arguments)
+    set_setting("near_duplicate_test_case", "jaccard_threshold", args.near_duplicate_threshold)
+    set_setting("absence_background", "background_fraction", args.background_fraction)
+    rendering.mode = rendering.auto_mode() if args.render == "auto" else args.render
+    rendering.snippet_lines = args.snippet_lines
+    report_dir = args.report_dir if args.format == "csv" else None
+    instrumentation.trace_memory = args.trace_memory
+    profile = RunProfile() if args.stats or args.stats_output else None
+    profiler = DetectorProfiler() if args.profile else None
+
+    try:
+        with findings_writer(args) as writer:
+            if args.base_revision:
+                findings = sum(runner.execute_changes(path, args.base_revision, args.detectors, args.jobs, args.cache_dir,
+                                                      args.index_dir, report_dir, writer, profile, profiler,
+                                                      args.include, args.exclude)
+                               for path in args.paths)
+            else:
+                findings = runner.execute_paths(args.paths, args.detectors, args.jobs, args.cache_dir, report_dir,
+                                                writer, profile, profiler, args.include, args.exclude)
+    except (OSError, ValueError) as error:
+        print(f"ERROR: {error}", file=sys.stderr)
+        return exit_error
+
+    if args.stats:
+        profile.summary(sys.stderr)
+    if args.stats_output:
+        profile.write(args.stats_output)
+    if args.profile:
+        profiler.hot_functions(args.profile_top, sys.stderr)
+        profiler.write(args.profile)
+        print(f"Profiles saved to {args.profile}.", file=sys.stderr)
+    return exit_findings if findings else exit_clean
+
+# Worker processes import this module too, so the analysis only runs from the command line
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,25 @@
 import csv
 import os
-import re
-from tabulate import tabulate
+from rendering import render_table, rows_needed
+from patterns import structure_keywords
+from findings import SourceSpan, SourceReader, KeptSources, snippet_hash
+from read_file import read_source
+
+# Bump whenever a change to the analysis can change the per-file results kept in the cache
+analysis_version = 2
+
+
+class MalformedRegister:
+    """
+    A background or scenario with missing or repeated keywords: the span of its content below
+    its title line, and the line, keyword and number of occurrences of each of them.
+    """
+    __slots__ = ("span", "keywords")
+
+    def __init__(self, span, keywords):
+        self.span = span
+        self.keywords = keywords
+
 
 def find_malformed_test(feature_filenames, feature_files, csv_filename=None):
     """
@@ -9,60 +27,81 @@ def find_malformed_test(feature_filenames, feature_files, csv_filename=None):
 
     Args:
     - feature_filenames (list of str): The names of the feature files.
-    - feature_files (list of str): The content of the feature files.
+    - feature_files (iterable of str or Document): The content of the feature files.
     - csv_filename (str, optional): Name of the CSV file to save the report.
 
     Returns:
     - None
     """
-    background_pattern = r"(Background:.*)([\s\S]*?)(?=(?:([@#]\S*?)?Scenario:)|(?:([@#]\S*?)?Scenario Outline:)|(?:([@#]\S*?)?Example:)|(?:([@#]\S*?)?Rule:)|$)"
-    scenario_pattern = r"(Scenario:.*)([\s\S]*?)(?=(?:([@#]\S*?)?Scenario:)|(?:([@#]\S*?)?Scenario Outline:)|(?:([@#]\S*?)?Example:)|(?:([@#]\S*?)?Rule:)|$)"
-    scenario_outline_pattern = r"(Scenario Outline:.*)([\s\S]*?)(?=(?:([@#]\S*?)?Scenario:)|(?:([@#]\S*?)?Scenario Outline:)|(?:([@#]\S*?)?Example:)|(?:([@#]\S*?)?Rule:)|$)"
-    example_pattern = r"(Example:.*)([\s\S]*?)(?=(?:([@#]\S*?)?Scenario:)|(?:([@#]\S*?)?Scenario Outline:)|(?:([@#]\S*?)?Example:)|(?:([@#]\S*?)?Rule:)|$)"
-    step_pattern = r"(Given.*|When.*|Then.*)"
+    # Documents are parsed and analyzed one at a time and only the contents of the files with
+    # registers are kept to be read back
+    sources = KeptSources(feature_filenames)
+    report_malformed_test(feature_filenames, sources.analyses(feature_files, analyze_malformed_test), csv_filename, sources.read_source)
+
+
+def analyze_malformed_test(document):
+    """
+    Finds the malformed tests in a single parsed feature file.
+
+    Args:
+    - document (Document): The parsed feature file.
 
+    Returns:
+    - tuple: Registers found in the file, as the start and end offsets and the hash of their
+      content and the (line, keyword, count) of each missing or repeated keyword, and their
+      number of occurrences.
+    """
     malformed_registers = []
     total_malformed_tests = 0
-    for feature_index, (filename, feature_file) in enumerate(zip(feature_filenames, feature_files)):
-        # Find background or scenarios into feature
-        backgrounds = [(group.strip(), feature_file[:match.start()].count('\n') + 1)
-                       for match in re.finditer(background_pattern, feature_file)
-                       for group in match.groups()[1:] if group]
-        scenarios = [(group.strip(), feature_file[:match.start()].count('\n') + 1)
-                     for match in re.finditer(scenario_pattern, feature_file)
-                     for group in match.groups()[1:] if group]
-        scenarios_outline = [(group.strip(), feature_file[:match.start()].count('\n') + 1)
-                             for match in re.finditer(scenario_outline_pattern, feature_file)
-                             for group in match.groups()[1:] if group]
-        examples = [(group.strip(), feature_file[:match.start()].count('\n') + 1)
-                    for match in re.finditer(example_pattern, feature_file)
-                    for group in match.groups()[1:] if group]
-
-        total_registers = scenarios + scenarios_outline + examples
-
-        if len(backgrounds) != 0:
-            total_malformed_tests = malformed_analysis_backgrounds(filename, backgrounds, step_pattern, malformed_registers, total_malformed_tests)
-        total_malformed_tests = malformed_analysis(filename, total_registers, step_pattern, malformed_registers, total_malformed_tests)
 
-    if malformed_registers:
-        # Transforming file_and_line and malformed_tests into a string
-        for register in malformed_registers:
-            register["file_and_line"] = '\n'.join(register["file_and_line"])
-            register["justification"] = '\n'.join(register["justification"])
+    # Find background or scenarios into feature
+    if len(document.backgrounds) != 0:
+        total_malformed_tests = malformed_analysis_backgrounds(document, document.backgrounds, malformed_registers, total_malformed_tests)
+    total_malformed_tests = malformed_analysis(document, document.scenarios, malformed_registers, total_malformed_tests)
+    return malformed_registers, total_malformed_tests
+
+
+def report_malformed_test(feature_filenames, analyses, csv_filename=None, read_source=read_source):
+    """
+    Merges the per-file results of analyze_malformed_test and reports them.
+
+    Args:
+    - feature_filenames (list of str): The names of the feature files.
+    - analyses (iterable): The result of analyze_malformed_test for each file, in the same order.
+    - csv_filename (str, optional): Name of the CSV file to save the report.
+    - read_source (callable, optional): Returns the content or Document of a feature file from
+      its name, to read the registers back. Reads the file of that name by default.
+
+    Returns:
+    - int: Number of findings reported.
+    """
+    malformed_registers = []
+    total_malformed_tests = 0
+    for file_id, (registers, total) in enumerate(analyses):
+        for start, end, _, keywords in registers:
+            malformed_registers.append(MalformedRegister(SourceSpan(file_id, start, end), keywords))
+        total_malformed_tests += total
 
-        report_data = [
-            [malformed_register["file_and_line"], malformed_register["justification"], malformed_register["register"]]
-            for malformed_register in malformed_registers
-        ]
+    if malformed_registers:
+        # The lines, justifications and registers are only formatted and read back here, when shown or saved
+        report_data = None
+        if rows_needed(csv_filename):
+            source_reader = SourceReader(feature_filenames, read_source)
+            report_data = [
+                ['\n'.join(f"{feature_filenames[malformed_register.span.file_id]}:{line}" for line, _, _ in malformed_register.keywords),
+                 '\n'.join(justification(keyword, count) for _, keyword, count in malformed_register.keywords),
+                 source_reader.text(malformed_register.span)]
+                for malformed_register in malformed_registers
+            ]
 
         print(f"- Total number of malformed tests by occurrence: {total_malformed_tests}")
-        print(tabulate(report_data, headers=["File and Line Position", "Justification", "Reference"], tablefmt="grid"))
+        render_table(report_data, ["File and Line Position", "Justification", "Reference"], count=len(malformed_registers))
 
         # Generate CSV if filename is provided
         if csv_filename:
-            report_dir = './reports'
-            if not os.path.exists(report_dir):
-                os.mkdir(report_dir)
+            report_dir = os.path.dirname(csv_filename)
+            if report_dir and not os.path.exists(report_dir):
+                os.makedirs(report_dir)
 
             file_exists = os.path.isfile(csv_filename)  # Check if file already exists
             with open(csv_filename, mode='a', newline='', encoding='utf-8') as csvfile:
@@ -74,109 +113,103 @@ def find_malformed_test(feature_filenames, feature_files, csv_filename=None):
     else:
         print("No registers with malformed tests.")
 
+    return len(malformed_registers)
 
-# Verifying into background or scenario if it has some malformed test
-def malformed_analysis_backgrounds(filename, registers, step_pattern, malformed_registers, total_malformed_tests):
-    original_registers = [register_content for register_content, _ in registers]
 
-    for register_index, (register, register_line) in enumerate(registers):
-        registers[register_index] = re.sub("\n\n", "\n", register)
-        register = register.strip()
-        steps = re.findall(step_pattern, register)
+def iter_malformed_test_findings(feature_filenames, analyses):
+    """
+    Yields each keyword missing or repeated in a background or scenario, from the per-file
+    results of analyze_malformed_test, as the results arrive.
+
+    Args:
+    - feature_filenames (list of str): The names of the feature files.
+    - analyses (iterable): The result of analyze_malformed_test for each file, in the same order.
 
+    Returns:
+    - generator of tuples: Filename, line, column (None, not tracked), message and snippet
+      hash of each finding.
+    """
+    for filename, (registers, _) in zip(feature_filenames, analyses):
+        for _, _, register_hash, keywords in registers:
+            for line, keyword, count in keywords:
+                yield filename, line, None, justification(keyword, count), register_hash
+
+
+def justification(keyword, count):
+    return f"{keyword} appears {count or 'zero'} times"
+
+
+# Verifying into background or scenario if it has some malformed test
+def malformed_analysis_backgrounds(document, registers, malformed_registers, total_malformed_tests):
+    for register in registers:
         # Counting malformed test
-        keyword_counts = malformed_tests_counter(steps)
+        keyword_counts, keyword_lines = malformed_tests_counter(register.steps)
 
         # Organizing the result into a list
-        total_malformed_tests = malformed_tests_structure_backgrounds(filename, register_line, keyword_counts, original_registers[register_index],
-                                                          malformed_registers, total_malformed_tests)
+        total_malformed_tests = malformed_tests_structure_backgrounds(register.line, keyword_counts, keyword_lines,
+                                                                      lambda: register_body(document, register),
+                                                                      malformed_registers, total_malformed_tests)
     return total_malformed_tests
 
 
 # Verifying into background or scenario if it has some malformed test
-def malformed_analysis(filename, registers, step_pattern, malformed_registers, total_malformed_tests):
-    original_registers = [register_content for register_content, _ in registers]
-
-    for register_index, (register, register_line) in enumerate(registers):
-        registers[register_index] = re.sub("\n\n", "\n", register)
-        register = register.strip()
-        steps = re.findall(step_pattern, register)
-
+def malformed_analysis(document, registers, malformed_registers, total_malformed_tests):
+    for register in registers:
         # Counting malformed test
-        keyword_counts = malformed_tests_counter(steps)
+        keyword_counts, keyword_lines = malformed_tests_counter(register.steps)
 
         # Organizing the result into a list
-        total_malformed_tests = malformed_tests_structure(filename, register_line, keyword_counts, original_registers[register_index],
-                                                                  malformed_registers, total_malformed_tests)
+        total_malformed_tests = malformed_tests_structure(register.line, keyword_counts, keyword_lines,
+                                                          lambda: register_body(document, register),
+                                                          malformed_registers, total_malformed_tests)
     return total_malformed_tests
 
 
+def register_body(document, register):
+    # Offsets and hash of the content of the background or scenario below its title line
+    start, end = document.text_span(register.line + 1, register.end_line, strip=True)
+    return start, end, snippet_hash(document.text(register.line + 1, register.end_line).strip())
+
+
 def malformed_tests_counter(steps):
-    keyword_counts = {"Given": 0, "When": 0, "Then": 0}
+    keyword_counts = dict.fromkeys(structure_keywords, 0)
+    keyword_lines = {}
     for step in steps:
-        if step.startswith("Given"):
-            keyword_counts["Given"] += 1
-        elif step.startswith("When"):
-            keyword_counts["When"] += 1
-        elif step.startswith("Then"):
-            keyword_counts["Then"] += 1
-    return keyword_counts
+        if step.keyword in keyword_counts:
+            keyword_counts[step.keyword] += 1
+            keyword_lines.setdefault(step.keyword, step.line)  # Line of the first occurrence
+    return keyword_counts, keyword_lines
 
 
-def malformed_tests_structure_backgrounds(filename, register_line, keyword_counts, register, malformed_registers,
+def malformed_tests_structure_backgrounds(register_line, keyword_counts, keyword_lines, locate_register, malformed_registers,
                               total_malformed_tests):
     malformed_keywords = []
-    file_and_line = []
     for keyword, count in keyword_counts.items():
         if count > 1:
-            step_line = 0
-            lines = register.split("\n")
-            for line_index, line in enumerate(lines):
-                if re.search(re.escape(keyword), line):
-                    step_line = register_line + line_index + 1
-                    break
-
-            file_and_line.append(f"{filename}:{step_line}")
-            malformed_keywords.append(f"{keyword} appears {count} times")
+            malformed_keywords.append((keyword_lines[keyword], keyword, count))
             total_malformed_tests += count
 
     if malformed_keywords:
-        malformed_registers.append({
-            "file_and_line": file_and_line,
-            "justification": malformed_keywords,
-            "register": register
-        })
+        # The register is only located once it is known to be malformed
+        malformed_registers.append((*locate_register(), malformed_keywords))
     return total_malformed_tests
 
 
-def malformed_tests_structure(filename, register_line, keyword_counts, register, malformed_registers,
+def malformed_tests_structure(register_line, keyword_counts, keyword_lines, locate_register, malformed_registers,
                               total_malformed_tests):
     malformed_keywords = []
-    file_and_line = []
     for keyword, count in keyword_counts.items():
         if count > 1:
-            step_line = 0
-            lines = register.split("\n")
-            for line_index, line in enumerate(lines):
-                if re.search(re.escape(keyword), line):
-                    step_line = register_line + line_index + 1
-                    break
-
-            file_and_line.append(f"{filename}:{step_line}")
-            malformed_keywords.append(f"{keyword} appears {count} times")
+            malformed_keywords.append((keyword_lines[keyword], keyword, count))
             total_malformed_tests += count
 
         if count == 0 and keyword != "Given":
-            file_and_line.append(f"{filename}:{register_line}")
-            malformed_keywords.append(f"{keyword} appears zero times")
+            malformed_keywords.append((register_line, keyword, count))
             total_malformed_tests += 1
 
     if malformed_keywords:
-        malformed_registers.append({
-            "file_and_line": file_and_line,
-            "justification": malformed_keywords,
-            "register": register
-        })
+        # The register is only located once it is known to be malformed
+        malformed_registers.append((*locate_register(), malformed_keywords))
     return total_malformed_tests
 
 # Example usage
@@ -0,0 +1,139 @@
+import hashlib
+
+def shingle_hash(shingle):
+    # Stable across processes, unlike the salted built-in hash of strings
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+
+def shingles(tokens, size):
+    """
+    Builds the set of contiguous token sequences of a given size.
+
+    Args:
+    - tokens (list of str): The tokens.
+    - size (int): Number of tokens per shingle.
+
+    Returns:
+    - set of str: The shingles, a single one holding every token if there are fewer than `size`.
+    """
+    if len(tokens) <= size:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+def minhash_signature(shingle_set, num_bins):
+    """
+    Computes the MinHash signature of a set of shingles with one permutation hashing: each
+    shingle is hashed once, the hash picks a bin and the rest of it is the value kept when it
+    is the smallest of its bin. This costs one hash per shingle instead of one per shingle and
+    signature position. Empty bins borrow the value of the next non-empty bin, offset by the
+    distance so borrowed values never collide with genuine ones.
+
+    Args:
+    - shingle_set (set of str): The shingles, at least one.
+    - num_bins (int): Length of the signature, a power of two.
+
+    Returns:
+    - list of int: Smallest value of each bin.
+    """
+    bin_bits = num_bins.bit_length() - 1
+    empty = 1 << 64
+    signature = [empty] * num_bins
+    for shingle in shingle_set:
+        value = shingle_hash(shingle)
+        position = value & (num_bins - 1)
+        value >>= bin_bits
+        if value < signature[position]:
+            signature[position] = value
+
+    # Densification, walking the bins backwards so each one knows the next non-empty bin
+    last = next(position for position in range(num_bins - 1, -1, -1) if signature[position] != empty)
+    borrowed = signature[last]
+    distance = 0
+    for position in range(last + num_bins, last, -1):
+        position %= num_bins
+        if signature[position] == empty:
+            distance += 1
+            signature[position] = borrowed + distance * empty
+        else:
+            borrowed = signature[position]
+            distance = 0
+    return signature
+
+def estimated_similarity(signature, other_signature):
+    # The share of agreeing positions estimates the Jaccard similarity of the shingle sets
+    agreeing = sum(1 for value, other_value in zip(signature, other_signature) if value == other_value)
+    return agreeing / len(signature)
+
+def choose_bands(signature_length, threshold):
+    """
+    Chooses how to split the signatures into bands so that the similarity at which two sets
+    become likely to share a bucket, (1 / bands) ** (1 / rows), is closest to the threshold
+    without exceeding it, so few pairs above the threshold are missed.
+
+    Args:
+    - signature_length (int): Length of the signatures.
+    - threshold (float): Jaccard similarity from which sets are near-duplicates.
+
+    Returns:
+    - tuple: Number of bands and of rows per band.
+    """
+    best = (signature_length, 1)
+    best_distance = float("inf")
+    for rows in range(1, signature_length + 1):
+        if signature_length % rows:
+            continue
+        bands = signature_length // rows
+        band_threshold = (1 / bands) ** (1 / rows)
+        if band_threshold <= threshold and threshold - band_threshold < best_distance:
+            best = (bands, rows)
+            best_distance = threshold - band_threshold
+    return best
+
+def find_clusters(signatures, threshold):
+    """
+    Groups the signatures whose estimated similarity reaches the threshold, using
+    locality-sensitive hashing: signatures are only compared when they share a band, and
+    each bucket is compared against its first member only, so the work stays linear in the
+    number of signatures.
+
+    Args:
+    - signatures (list of lists of int): The MinHash signatures, all of the same length.
+    - threshold (float): Jaccard similarity from which sets are near-duplicates.
+
+    Returns:
+    - list of tuples: Indexes of the signatures of each cluster of at least two members, in
+      ascending order, and the lowest similarity that linked the cluster.
+    """
+    if not signatures:
+        return []
+    bands, rows = choose_bands(len(signatures[0]), threshold)
+
+    parents = list(range(len(signatures)))
+    lowest_similarity = {}
+
+    def find(index):
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    for band in range(bands):
+        buckets = {}
+        for index, signature in enumerate(signatures):
+            buckets.setdefault(tuple(signature[band * rows:(band + 1) * rows]), []).append(index)
+
+        for members in buckets.values():
+            first = members[0]
+            for index in members[1:]:
+                first_root, root = find(first), find(index)
+                if first_root == root:
+                    continue
+                similarity = estimated_similarity(signatures[first], signatures[index])
+                if similarity < threshold:
+                    continue
+                parents[root] = first_root
+                lowest_similarity[first_root] = min(similarity, lowest_similarity.get(first_root, 1.0), lowest_similarity.get(root, 1.0))
+
+    clusters = {}
+    for index in range(len(signatures)):
+        clusters.setdefault(find(index), []).append(index)
+    return [(members, lowest_similarity[root]) for root, members in clusters.items() if len(members) > 1]
@@ -0,0 +1,186 @@
+import csv
+import os
+from rendering import render_table, rows_needed
+from patterns import continuation_keywords
+from findings import snippet_hash
+from gherkin_parser import iter_feature_files
+from minhash import shingles, minhash_signature, find_clusters
+
+# Bump whenever a change to the analysis can change the per-file results kept in the cache
+analysis_version = 2
+
+# Default Jaccard similarity of the step shingles from which two test cases are near-duplicates
+jaccard_threshold = 0.8
+
+signature_length = 128
+shingle_size = 3
+
+def find_near_duplicate_test_cases(filenames, feature_files, csv_filename=None, threshold=None):
+    """
+    Finds test cases whose steps are nearly the same, e.g. copies differing by one parameter
+    or by whitespace, which the exact comparison of find_duplicate_test_cases misses.
+
+    Args:
+    - filenames (list of str): The names of the feature files.
+    - feature_files (list of str or Document): The content of the feature files.
+    - csv_filename (str, optional): The name of the CSV file to save the report.
+    - threshold (float, optional): Jaccard similarity from which test cases are reported,
+      `jaccard_threshold` by default.
+
+    Returns:
+    - None
+    """
+    # Documents are parsed and analyzed one at a time and the reports only keep the results
+    documents = iter_feature_files(feature_files)
+    report_near_duplicate_test_cases(filenames, (analyze_near_duplicate_test_cases(document) for document in documents), csv_filename, threshold)
+
+def normalized_step_tokens(steps):
+    """
+    Turns a sequence of steps into tokens insensitive to case, whitespace and to the choice
+    between And/But/* and the keyword they continue.
+
+    Args:
+    - steps (list of Step): The steps.
+
+    Returns:
+    - list of str: The tokens, with a "|" token closing each step.
+    """
+    tokens = []
+    keyword = "Given"
+    for step in steps:
+        if step.keyword not in continuation_keywords:
+            keyword = step.keyword
+        tokens.append(keyword.lower())
+        tokens.extend(step.full_text.lower().split())
+        tokens.append("|")
+    return tokens
+
+def analyze_near_duplicate_test_cases(document):
+    """
+    Computes the MinHash signature of the steps of each test case of a single parsed feature file.
+
+    Args:
+    - document (Document): The parsed feature file.
+
+    Returns:
+    - list of tuples: Line number, title line, signature and body digest of each test case
+      with steps. The digest is the one of duplicate_test_case, so exact duplicates, which it
+      reports, can be told apart.
+    """
+    test_cases = []
+    for scenario in document.scenarios:
+        shingle_set = shingles(normalized_step_tokens(scenario.steps), shingle_size)
+        if shingle_set:
+            title = document.lines[scenario.line - 1].strip()
+            digest = snippet_hash(document.text(scenario.line + 1, scenario.body_end_line).strip())
+            test_cases.append((scenario.line, title, minhash_signature(shingle_set, signature_length), digest))
+    return test_cases
+
+def near_duplicate_clusters(analyses, threshold):
+    """
+    Merges the per-file results of analyze_near_duplicate_test_cases into clusters. Test cases
+    with the same body are compared once, through the first of them, and all join its cluster:
+    a cluster is only formed when it holds at least two different bodies, as exact duplicates
+    alone are reported by duplicate_test_case.
+
+    Args:
+    - analyses (iterable): The result of analyze_near_duplicate_test_cases for each file.
+    - threshold (float): Jaccard similarity from which test cases are near-duplicates.
+
+    Returns:
+    - tuple: Number of test cases, and the (file id, line, title) of the members of each
+      cluster with the lowest similarity that linked it.
+    """
+    # (file id, line, title) of the test cases of each body, only formatted for the members of the clusters
+    bodies = {}
+    signatures = []
+    total = 0
+    for file_id, test_cases in enumerate(analyses):
+        for line_number, title, signature, digest in test_cases:
+            total += 1
+            locations = bodies.get(digest)
+            if locations is None:
+                locations = bodies[digest] = []
+                signatures.append(signature)
+            locations.append((file_id, line_number, title))
+
+    body_locations = list(bodies.values())
+    clusters = []
+    for members, similarity in find_clusters(signatures, threshold):
+        clusters.append(([location for index in members for location in body_locations[index]], similarity))
+    return total, clusters
+
+def report_near_duplicate_test_cases(filenames, analyses, csv_filename=None, threshold=None):
+    """
+    Merges the per-file results of analyze_near_duplicate_test_cases and reports the clusters
+    of near-duplicate test cases.
+
+    Args:
+    - filenames (list of str): The names of the feature files.
+    - analyses (iterable): The result of analyze_near_duplicate_test_cases for each file, in the same order.
+    - csv_filename (str, optional): The name of the CSV file to save the report.
+    - threshold (float, optional): Jaccard similarity from which test cases are reported,
+      `jaccard_threshold` by default.
+
+    Returns:
+    - int: Number of findings reported.
+    """
+    if threshold is None:
+        threshold = jaccard_threshold
+
+    total, clusters = near_duplicate_clusters(analyses, threshold)
+
+    # Prepare data for reporting the clusters, when shown or saved
+    report_data = None
+    if rows_needed(csv_filename):
+        report_data = []
+        for members, similarity in clusters:
+            report_data.append([len(members), '\n'.join(f"{filenames[file_id]}:{line_number} - {title}"
+                                                        for file_id, line_number, title in members), f"{similarity:.2f}"])
+
+    # Print overall report
+    print(f"- Total number of test cases: {total}")
+    print(f"- Near-duplicate test cases (similarity >= {threshold}):")
+
+    if clusters:
+        render_table(report_data, ["Count", "Files And Scenario Titles", "Lowest Similarity"], count=len(clusters))
+
+        # Generate CSV if filename is provided
+        if csv_filename:
+            report_dir = os.path.dirname(csv_filename)
+            if report_dir and not os.path.exists(report_dir):
+                os.makedirs(report_dir)
+            file_exists = os.path.isfile(csv_filename)  # Check if file already exists
+            with open(csv_filename, mode='a', newline='', encoding='utf-8') as csvfile:
+                csv_writer = csv.writer(csvfile)
+                if not file_exists:  # Write header only if the file is new
+                    csv_writer.writerow(["Count", "Files And Scenario Titles", "Lowest Similarity"])  # Write header
+                csv_writer.writerows(report_data)  # Write data
+            print(f"Report saved to {csv_filename}.")
+    else:
+        print("No near-duplicate test cases.")
+
+    return len(clusters)
+
+def iter_near_duplicate_test_case_findings(filenames, analyses, threshold=None):
+    """
+    Yields every member of the clusters of near-duplicate test cases, from the per-file results
+    of analyze_near_duplicate_test_cases.
+
+    Args:
+    - filenames (list of str): The names of the feature files.
+    - analyses (iterable): The result of analyze_near_duplicate_test_cases for each file, in the same order.
+    - threshold (float, optional): Jaccard similarity from which test cases are reported,
+      `jaccard_threshold` by default.
+
+    Returns:
+    - generator of tuples: Filename, line, column (None, not tracked), message and snippet
+      hash (None, near-duplicates differ by definition) of each finding.
+    """
+    if threshold is None:
+        threshold = jaccard_threshold
+
+    _, clusters = near_duplicate_clusters(analyses, threshold)
+    for members, similarity in clusters:
+        for file_id, line_number, title in members:
+            yield filenames[file_id], line_number, None, f"'{title}' is a near-duplicate of {len(members) - 1} other test cases (similarity >= {similarity:.2f})", None
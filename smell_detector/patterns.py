@@ -0,0 +1,20 @@
+import re
+
+# Registry of the patterns and keyword groups used to read feature files. The patterns are
+# compiled once when the module is imported, so matching a line never goes through the
+# lookup (and possible eviction) of the cache of the re module.
+
+# Tags of a tag line, which stop at whitespace, another tag or a comment
+tag_pattern = re.compile(r"@[^\s@#]+")
+
+# Block keywords
+block_keywords = ("Feature", "Rule", "Background", "Scenario Outline", "Scenario Template", "Scenario", "Examples", "Scenarios", "Example")
+scenario_keywords = ("Scenario", "Example", "Scenario Outline", "Scenario Template")
+examples_keywords = ("Examples", "Scenarios")
+
+# Step keywords
+step_keywords = ("Given", "When", "Then", "And", "But", "*")
+structure_keywords = ("Given", "When", "Then")  # Keywords giving the structure of a test
+action_keywords = ("When", "Then")  # Keywords ending the Given steps of a test
+continuation_keywords = ("And", "But", "*")  # Keywords continuing the previous step
+opening_keywords = ("Given", "When", "*")  # Keywords a test can start with
@@ -0,0 +1,130 @@
+import cProfile
+import functools
+import os
+import pstats
+from contextlib import nullcontext
+from tabulate import tabulate
+
+def function_label(function):
+    # "file.py:12(name)" for Python functions, the bare name for built-ins, without the
+    # semicolons separating the frames of collapsed stacks
+    filename, line, name = function
+    label = name if filename == "~" else f"{os.path.basename(filename)}:{line}({name})"
+    return label.replace(";", ",")
+
+def collapsed_stacks(stats, min_time=1e-6):
+    """
+    Turns profiling statistics into collapsed stacks, one "frame;frame;frame weight" line per
+    stack, as flamegraph.pl, speedscope or inferno expect. cProfile only keeps caller/callee
+    pairs, so the stacks are rebuilt from the call graph: the self time of a function is split
+    between its callers in proportion to the time spent under each of them. Recursive calls
+    are cut.
+
+    Args:
+    - stats (pstats.Stats): The statistics.
+    - min_time (float, optional): Stacks under this time in seconds are dropped.
+
+    Returns:
+    - list of str: The stacks, weighted in microseconds.
+    """
+    entries = stats.stats  # Function -> (primitive calls, calls, self time, cumulative time, callers)
+    callees = {}
+    for function, (_, _, _, _, callers) in entries.items():
+        for caller, (_, _, _, edge_time) in callers.items():
+            callees.setdefault(caller, []).append((function, edge_time))
+
+    weights = {}
+    pending = [((function,), 1.0) for function, entry in entries.items() if not entry[4]]
+    while pending:
+        stack, share = pending.pop()
+        function = stack[-1]
+        self_time = entries[function][2] * share
+        if self_time >= min_time:
+            weights[stack] = weights.get(stack, 0.0) + self_time
+        for callee, edge_time in callees.get(function, []):
+            callee_time = entries[callee][3]
+            if callee in stack or not callee_time or edge_time * share < min_time:
+                continue
+            pending.append((stack + (callee,), share * edge_time / callee_time))
+
+    return [f"{';'.join(function_label(function) for function in stack)} {round(weight * 1e6)}"
+            for stack, weight in sorted(weights.items(), key=lambda item: [function_label(function) for function in item[0]])
+            if round(weight * 1e6)]
+
+
+class DetectorProfiler:
+    """
+    One cProfile profile per detector, covering its per-file analyses and its report. The
+    profiles only see this process, so the analysis is not spread over worker processes
+    while profiling.
+    """
+    def __init__(self):
+        self.profiles = {}  # Detector name -> cProfile.Profile, in the order of the run
+
+    def profile(self, name):
+        # The profile of name, which profiles the blocks it is used as a context for
+        return self.profiles.setdefault(name, cProfile.Profile())
+
+    def wrap(self, name, function):
+        # The same function, profiled under name. It is called once per file, so the profile is
+        # switched directly rather than through a context manager showing up in every stack.
+        # functools.wraps keeps the module and the name the result cache keys on.
+        profile = self.profile(name)
+
+        @functools.wraps(function)
+        def profiled(*arguments):
+            profile.enable()
+            try:
+                return function(*arguments)
+            finally:
+                profile.disable()
+        return profiled
+
+    def stats(self, name):
+        return pstats.Stats(self.profiles[name])
+
+    def write(self, directory):
+        """
+        Saves the profile of each detector as <detector>.pstats, readable by pstats, snakeviz
+        or gprof2dot, and as <detector>.folded collapsed stacks for flame graphs.
+
+        Args:
+        - directory (str): Directory of the files, created if needed.
+
+        Returns:
+        - list of str: Paths of the written files.
+        """
+        os.makedirs(directory, exist_ok=True)
+        written = []
+        for name in self.profiles:
+            stats = self.stats(name)
+            stats_filename = os.path.join(directory, f"{name}.pstats")
+            stats.dump_stats(stats_filename)
+            stacks_filename = os.path.join(directory, f"{name}.folded")
+            with open(stacks_filename, "w", encoding="utf-8") as file:
+                file.writelines(f"{stack}\n" for stack in collapsed_stacks(stats))
+            written += [stats_filename, stacks_filename]
+        return written
+
+    def hot_functions(self, top=15, file=None):
+        """
+        Prints the functions with the most self time of each detector.
+
+        Args:
+        - top (int, optional): Number of functions per detector.
+        - file (file, optional): Stream the table is printed to, the standard output by default.
+
+        Returns:
+        - None
+        """
+        report_data = []
+        for name in self.profiles:
+            stats = self.stats(name).sort_stats(pstats.SortKey.TIME)
+            for function in stats.fcn_list[:top]:
+                _, calls, self_time, cumulative_time, _ = stats.stats[function]
+                report_data.append([name, function_label(function), calls, f"{self_time:.4f}", f"{cumulative_time:.4f}"])
+        print(tabulate(report_data, headers=["Detector", "Function", "Calls", "Self (s)", "Cumulative (s)"], tablefmt="grid"), file=file)
+
+def profiled(profiler, name):
+    # Context profiling its block under name, unless profiler is None
+    return nullcontext() if profiler is None else profiler.profile(name)
@@ -4,8 +4,14 @@ def read_file(filename):
     file.close()
     return content
 
-def read_files(filenames):
-    contents = []
+def read_source(name):
+    # Content of a feature file from the name the reports give it, which is its path
+    return read_file(name)
+
+def iter_files(filenames):
+    # Yields (filename, content) one file at a time, so only one content is alive at once
     for filename in filenames:
-        contents.append(read_file(filename))
-    return contents
+        yield filename, read_file(filename)
+
+def read_files(filenames):
+    return [content for _, content in iter_files(filenames)]
@@ -0,0 +1,66 @@
+import csv
+import io
+import sys
+from contextlib import nullcontext, redirect_stdout
+from tabulate import tabulate
+
+# How the reports print their tables:
+# - "full": grid tables with whole cells
+# - "truncated": grid tables keeping the first snippet_lines lines of each cell
+# - "plain": tab-separated rows written as they are, without formatting, for pipes and files
+# - "summary": only the number of rows
+# - "quiet": nothing, the runner also silences the rest of the reports
+render_modes = ("full", "truncated", "plain", "summary", "quiet")
+mode = "full"
+snippet_lines = 3
+
+def auto_mode(stream=None):
+    # Formatting tables is only worth it for a terminal, where someone reads them
+    stream = sys.stdout if stream is None else stream
+    return "full" if stream.isatty() else "plain"
+
+def truncate_cell(cell, max_lines):
+    if not isinstance(cell, str):
+        return cell
+    lines = cell.split("\n")
+    if len(lines) <= max_lines:
+        return cell
+    return "\n".join(lines[:max_lines] + [f"... ({len(lines) - max_lines} more lines)"])
+
+def rows_needed(csv_filename=None):
+    # Whether a report has to build its rows, and read back their snippets: the summary and
+    # quiet modes only need their number, unless the rows are also saved as CSV
+    return bool(csv_filename) or mode not in ("summary", "quiet")
+
+def render_table(rows, headers, tablefmt="grid", count=None):
+    """
+    Prints the rows of a report according to the current mode. tabulate, which costs more
+    than the analysis on large projects, is only called for the modes showing tables.
+
+    Args:
+    - rows (list of lists or None): The rows of the report, None when rows_needed is false.
+    - headers (list of str): The column titles.
+    - tablefmt (str, optional): tabulate format of the tables.
+    - count (int, optional): Number of rows, printed in summary mode when rows is None.
+
+    Returns:
+    - None
+    """
+    if mode == "quiet":
+        return
+    if mode == "summary":
+        print(f"- {len(rows) if rows is not None else count} findings")
+        return
+    if mode == "plain":
+        writer = csv.writer(sys.stdout, delimiter="\t", lineterminator="\n")
+        writer.writerow(headers)
+        writer.writerows(rows)
+        return
+    if mode == "truncated":
+        rows = [[truncate_cell(cell, snippet_lines) for cell in row] for row in rows]
+    print(tabulate(rows, headers=headers, tablefmt=tablefmt))
+
+def silenced():
+    # Context where the reports print nothing in quiet mode. Tables are skipped anyway, only
+    # their few summary lines are dropped.
+    return redirect_stdout(io.StringIO()) if mode == "quiet" else nullcontext()
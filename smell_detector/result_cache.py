@@ -0,0 +1,74 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from gherkin_parser import parser_version
+
+def content_hash(content):
+    """
+    Computes the cache key of a feature file from its content.
+
+    Args:
+    - content (str): The content of the feature file.
+
+    Returns:
+    - str: Hexadecimal SHA-256 digest of the content.
+    """
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def analyzer_key(analyze):
+    """
+    Builds the key under which the result of a per-file analyzer is cached. It changes whenever
+    the `analysis_version` of the detector module or the parser version is bumped, so stale
+    results are never reused.
+
+    Args:
+    - analyze (callable): Per-file analysis function.
+
+    Returns:
+    - str: The cache key of the analyzer.
+    """
+    module = sys.modules[analyze.__module__]
+    return f"{analyze.__module__}.{analyze.__name__}:{getattr(module, 'analysis_version', 0)}:{parser_version}"
+
+def cache_path(cache_dir, digest):
+    # Spreading the entries over sub-directories keeps the directories small
+    return os.path.join(cache_dir, digest[:2], f"{digest}.json")
+
+def load_results(cache_dir, digest):
+    """
+    Loads the cached analyzer results of a feature file.
+
+    Args:
+    - cache_dir (str): Directory of the cache.
+    - digest (str): Content hash of the feature file.
+
+    Returns:
+    - dict: Cached results by analyzer key, empty if nothing is cached or the entry is unreadable.
+    """
+    try:
+        with open(cache_path(cache_dir, digest), "r", encoding="utf-8") as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+
+def store_results(cache_dir, digest, results):
+    """
+    Saves the analyzer results of a feature file. The entry is written to a temporary file
+    first and then moved in place, so concurrent workers never read a partial entry.
+
+    Args:
+    - cache_dir (str): Directory of the cache.
+    - digest (str): Content hash of the feature file.
+    - results (dict): Results by analyzer key.
+
+    Returns:
+    - None
+    """
+    path = cache_path(cache_dir, digest)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(file_descriptor, "w", encoding="utf-8") as cache_file:
+        json.dump(results, cache_file)
+    os.replace(temporary_path, path)
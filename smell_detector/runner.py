@@ -1,83 +1,344 @@
-import read_file
+import glob
 import os
-from utils import title, start_test, finish_test
-from untitled_feature import find_untitled_features
-from duplicate_scenario_title import find_duplicate_scenario_titles
-from duplicate_feature_title import find_duplicate_feature_titles
-from duplicate_test_case import find_duplicate_test_cases
-from absence_background import find_absence_background
-from vicious_tag import find_vicious_tags
-from duplicate_step import find_duplicate_steps
-from starting_with_the_left_foot import find_starting_with_the_left_foot
-from malformed_test import find_malformed_test
-
-feature_files_dir = "../"
-
-def execute_project(project):
-    # Catch all features in a specific project
-    path = f"{feature_files_dir}{project}/"
-    project_features = os.listdir(path)
-
-    # filenames structuration and contents construction
+import engine
+import instrumentation
+import rendering
+from profiling import profiled
+import result_cache
+from file_table import FileTable
+from discovery import discover_feature_files, is_selected
+from incremental import changed_feature_files, current_revision, load_index, outdated_files, index_entry, store_index, path_order
+from utils import title
+from detector_registry import detectors, select_detectors, combined_needs
+
+def collect_results(analyses, count=len(detectors)):
+    # Spreading the per-file results over one list per detector as they arrive
+    results = [[] for _ in range(count)]
+    for analysis in analyses:
+        for detector_results, result in zip(results, analysis):
+            detector_results.append(result)
+    return results
+
+def analyzers(selected_detectors, profiler=None):
+    # Profiled analyzers can not be sent to worker processes, see profiled_jobs
+    if profiler is None:
+        return [detector.analyze for detector in selected_detectors]
+    return [profiler.wrap(detector.name, detector.analyze) for detector in selected_detectors]
+
+def profiled_jobs(jobs, profiler):
+    # The profiles only see this process
+    return jobs if profiler is None else 1
+
+def report_results(selected_detectors, names, results, report_dir="reports", profile=None, project=None, profiler=None):
+    """
+    Merges the per-file results of each detector and reports them one smell after the other.
+
+    Args:
+    - selected_detectors (list of Detector): The detectors, see detector_registry.
+    - names (FileTable or list of str): Names of the feature files shown in the reports, see
+      group_table.
+    - results (list of lists): Per-file results of each detector, see collect_results.
+    - report_dir (str, optional): Directory of the CSV reports, None to only print them.
+    - profile (RunProfile, optional): Profile the time and findings of each report are added to.
+    - project (str, optional): Name of the project in the profile.
+    - profiler (DetectorProfiler, optional): Profiler of the reports, see profiling.
+
+    Returns:
+    - int: Number of findings reported.
+    """
+    findings = 0
+    with rendering.silenced():
+        for detector, detector_results in zip(selected_detectors, results):
+            title(detector.title, "blue")
+            with instrumentation.measure(*profile_stages(profile, project, detector)), profiled(profiler, detector.name):
+                detector_findings = detector.report(names, detector_results,
+                                                    report_dir and os.path.join(report_dir, os.path.basename(detector.csv_filename)))
+            if profile is not None:
+                profile.record_findings(project, detector.name, detector_findings)
+            findings += detector_findings
+    return findings
+
+def profile_stages(profile, project, detector=None):
+    # Measures a stage of a project adds up to: the project and the detector if any
+    if profile is None:
+        return []
+    if detector is None:
+        return [profile.total(project)]
+    return [profile.stage(project, detector.name), profile.total(project)]
+
+def profiled_findings(findings, profile, project):
+    # Passes the findings through while counting them per detector
+    for finding in findings:
+        if profile is not None:
+            profile.record_findings(project, finding.detector, 1)
+        yield finding
+
+def stream_findings(selected_detectors, names, analyses):
+    """
+    Yields the findings of the detectors as the per-file results arrive: those of the per-file
+    smells right after their file is analyzed, those of the cross-file smells once every file
+    is. Only the results of the cross-file detectors are kept until the end.
+
+    Args:
+    - selected_detectors (list of Detector): The detectors, see detector_registry.
+    - names (list of str): Names of the feature files shown in the findings, in the order of
+      the analyses. The list may be filled while the analyses arrive, e.g. FileTable.added.
+    - analyses (iterable): Result of each selected detector for each file.
+
+    Returns:
+    - generator of Finding: The findings.
+    """
+    per_file_detectors = [(position, detector) for position, detector in enumerate(selected_detectors) if not detector.cross_file]
+    cross_file_detectors = [(position, detector) for position, detector in enumerate(selected_detectors) if detector.cross_file]
+    cross_file_results = [[] for _ in cross_file_detectors]
+    for file_id, analysis in enumerate(analyses):
+        for position, detector in per_file_detectors:
+            yield from detector.findings([names[file_id]], [analysis[position]])
+        for detector_results, (position, _) in zip(cross_file_results, cross_file_detectors):
+            detector_results.append(analysis[position])
+    for detector_results, (_, detector) in zip(cross_file_results, cross_file_detectors):
+        yield from detector.findings(names, detector_results)
+
+def expand_paths(paths, extension=".feature", include=None, exclude=None):
+    """
+    Expands command-line paths into feature files: directories are walked by the discovery,
+    globs (with ** for any depth) are expanded and files are taken as they are.
+
+    Args:
+    - paths (list of str): Files, directories or globs.
+    - extension (str, optional): Extension of the feature files found in directories.
+    - include (list of str, optional): Globs the files found in directories must match, on
+      their path relative to the directory, see discovery.glob_regex.
+    - exclude (list of str, optional): Globs of the files and directories skipped in directories.
+
+    Returns:
+    - list of str: The feature files, without duplicates, in the order of the paths.
+
+    Raises:
+    - FileNotFoundError: If a path does not exist or a glob matches nothing.
+    """
+    return [filename for filenames in path_groups(paths, extension, include, exclude) for filename in filenames]
+
+def path_matches(path):
+    # Files and directories a command-line path stands for
+    matches = sorted(glob.glob(path, recursive=True)) if glob.has_magic(path) else [path]
+    if not matches or not os.path.exists(matches[0]):
+        raise FileNotFoundError(f"no such file or directory: {path}")
+    return matches
+
+def matched_files(matches, extension, include, exclude, seen):
+    # Feature files of the matches of a path as the directories are walked, but those already
+    # in seen
+    for match in matches:
+        filenames = discover_feature_files(match, include, exclude, extension) if os.path.isdir(match) else [match]
+        for filename in filenames:
+            if filename not in seen:
+                seen.add(filename)
+                yield filename
+
+def path_root(path):
+    # Directory a command-line path starts from: the directory itself, the directory of a file
+    # or the part of a glob before the first wildcard
+    if glob.has_magic(path):
+        parts = path.split("/")
+        fixed_parts = parts[:next(index for index, part in enumerate(parts) if glob.has_magic(part))]
+        return "/".join(fixed_parts) or "."
+    if os.path.isdir(path):
+        return path
+    return os.path.dirname(path) or "."
+
+def path_roots(paths):
+    """
+    Finds the directories command-line paths start from, see path_root.
+
+    Args:
+    - paths (list of str): Files, directories or globs.
+
+    Returns:
+    - list of str: The directories, without duplicates, in the order of the paths.
+    """
+    return list(dict.fromkeys(path_root(path) for path in paths))
+
+def group_table(root, filenames=()):
+    """
+    Builds the file table of a group of feature files. The files are named relative to the
+    directory holding the root of the group, so the names keep the directory of the project,
+    e.g. "sample/a.feature" for the files of ../sample, as the per-project runs named them.
+
+    Args:
+    - root (str): Directory the group starts from, see path_root.
+    - filenames (iterable of str, optional): Paths of the feature files, in id order.
+
+    Returns:
+    - FileTable: The table.
+    """
+    parent = os.path.dirname(os.path.normpath(root))
+    return FileTable(parent + "/" if parent else "").extend(filenames)
+
+def path_groups(paths, extension=".feature", include=None, exclude=None):
+    """
+    Expands command-line paths into one group of feature files per path, see expand_paths. A
+    file found from several paths only belongs to the group of the first one. The paths are
+    checked at once but the directories are only walked as the groups are consumed, so the
+    files can be analyzed while the rest of the walk goes on.
+
+    Args:
+    - paths (list of str): Files, directories or globs.
+    - extension (str, optional): Extension of the feature files found in directories.
+    - include (list of str, optional): Globs the files found in directories must match.
+    - exclude (list of str, optional): Globs of the files and directories skipped in directories.
+
+    Returns:
+    - list of generators of str: The feature files of each path, in the order of the paths.
+      The groups must be consumed in that order, as a file goes to the first group yielding it.
+
+    Raises:
+    - FileNotFoundError: If a path does not exist or a glob matches nothing.
+    """
+    seen = set()
+    return [matched_files(matches, extension, include, exclude, seen) for matches in [path_matches(path) for path in paths]]
+
+def group_findings(paths, groups, filename_groups, selected_detectors, selected_analyzers, jobs, cache_dir, needs, profile):
+    # Findings of each group in turn, streamed while its files are found and analyzed. They
+    # point at the paths of the files, which the machine-readable outputs resolve.
+    for path, table, filenames in zip(paths, groups, filename_groups):
+        timings = None if profile is None else instrumentation.new_timings(len(selected_detectors))
+        analyses = engine.iter_analyses(table.added(filenames), selected_analyzers, jobs, cache_dir, needs, timings)
+        with instrumentation.measure(*profile_stages(profile, path)):
+            yield from profiled_findings(stream_findings(selected_detectors, table.paths, analyses), profile, path)
+        if profile is not None:
+            profile.record_analysis(path, selected_detectors, table.paths, timings)
+
+def execute_paths(paths, detector_names=None, jobs=1, cache_dir=None, report_dir=None, findings_writer=None, profile=None,
+                  profiler=None, include=None, exclude=None):
+    """
+    Analyzes the feature files found under the given paths and reports their smells. Each path
+    is a group of its own, e.g. a project: cross-file smells only compare the files of a group,
+    and the reports of each group follow each other in the order of the paths.
+
+    Args:
+    - paths (list of str): Files, directories or globs, see expand_paths.
+    - detector_names (list of str, optional): Command-line names of the detectors to run, the
+      default ones of select_detectors by default.
+    - jobs (int, optional): Number of worker processes, 0 for one per CPU.
+    - cache_dir (str, optional): Directory of the persistent result cache.
+    - report_dir (str, optional): Directory of the CSV reports, None to only print them.
+    - findings_writer (NdjsonWriter or SarifWriter, optional): Writer the findings are given to
+      while the files are analyzed, instead of printing the reports.
+    - profile (RunProfile, optional): Profile the measures of the run are added to, under the
+      path of each group.
+    - profiler (DetectorProfiler, optional): Profiler of the analysis and the report of each
+      detector. The files are then analyzed in this process only.
+    - include (list of str, optional): Globs the files found in directories must match.
+    - exclude (list of str, optional): Globs of the files and directories skipped in directories.
+
+    Returns:
+    - int: Number of findings reported.
+    """
+    # The files get their ids as the walk finds them, see FileTable.added
+    filename_groups = path_groups(paths, include=include, exclude=exclude)
+    groups = [group_table(path_root(path)) for path in paths]
+    selected_detectors = select_detectors(detector_names)
+    # Only the selected detectors are imported and analyze the files, and the parser only
+    # builds the parts of the documents they read
+    selected_analyzers = analyzers(selected_detectors, profiler)
+    needs = combined_needs(selected_detectors)
+    jobs = profiled_jobs(jobs, profiler)
+
+    if findings_writer is not None:
+        return findings_writer.write(group_findings(paths, groups, filename_groups, selected_detectors, selected_analyzers, jobs, cache_dir, needs, profile))
+
+    # All groups are analyzed together, so the workers are shared, then reported in the order
+    # of the paths. The total of each group includes the whole shared analysis.
+    group_timings = None if profile is None else [instrumentation.new_timings(len(selected_detectors)) for _ in groups]
+    with instrumentation.measure(*[stage for path in paths for stage in profile_stages(profile, path)]):
+        group_analyses = engine.analyze_file_groups([table.added(filenames) for table, filenames in zip(groups, filename_groups)], selected_analyzers, jobs, cache_dir, needs, group_timings)
+    findings = 0
+    for path, table, analyses, timings in zip(paths, groups, group_analyses, group_timings or [None] * len(groups)):
+        with instrumentation.measure(*profile_stages(profile, path)):
+            results = collect_results(analyses, len(selected_detectors))
+        if profile is not None:
+            profile.record_analysis(path, selected_detectors, table.paths, timings)
+        findings += report_results(selected_detectors, table, results, report_dir, profile, path, profiler)
+    return findings
+
+def execute_changes(directory, base_revision, detector_names=None, jobs=1, cache_dir=None, index_dir=".smell_index", report_dir=None,
+                    findings_writer=None, profile=None, profiler=None, include=None, exclude=None):
+    """
+    Reports the per-file smells of the feature files of a directory changed since a git
+    revision and the cross-file smells of the whole directory. The results of every file are
+    kept in a persisted index with the hash of the content they come from, and only the files
+    whose content changed since are analyzed again, whether git reports them or not.
+
+    Args:
+    - directory (str): Directory inside a git repository.
+    - base_revision (str): Revision the working tree is compared with.
+    - detector_names (list of str, optional): Command-line names of the detectors to run, the
+      default ones of select_detectors by default.
+    - jobs (int, optional): Number of worker processes, 0 for one per CPU.
+    - cache_dir (str, optional): Directory of the persistent result cache.
+    - index_dir (str, optional): Directory of the indexes kept between runs.
+    - report_dir (str, optional): Directory of the CSV reports, None to only print them.
+    - findings_writer (NdjsonWriter or SarifWriter, optional): Writer the findings are given
+      to, instead of printing the reports.
+    - profile (RunProfile, optional): Profile the measures of the run are added to, under the
+      directory.
+    - profiler (DetectorProfiler, optional): Profiler of the analysis and the report of each
+      detector. The files are then analyzed in this process only.
+    - include (list of str, optional): Globs the files must match, relative to the directory.
+    - exclude (list of str, optional): Globs of the files and directories skipped.
+
+    Returns:
+    - int: Number of findings reported.
+
+    Raises:
+    - ValueError: If the directory is not a directory of a git repository or the revision is
+      unknown.
+    """
+    if not os.path.isdir(directory):
+        raise ValueError(f"{directory} is not a directory, only directories are compared with a revision")
+    project = directory
+    directory = directory.rstrip("/") + "/"
+    # Only the selected detectors are imported and analyze the files. The index is keyed on
+    # their analyzers, so another selection builds it again.
+    selected_detectors = select_detectors(detector_names)
+    index_analyzers = analyzers(selected_detectors, profiler)
+    needs = combined_needs(selected_detectors)
+    keys = [result_cache.analyzer_key(analyze) for analyze in index_analyzers]
+    index_path = os.path.join(index_dir, os.path.abspath(directory).strip(os.sep).replace(os.sep, "_") + ".json")
+    # Asked first, as it fails with a short message outside a git repository
+    revision = current_revision(directory)
+    changed, _ = changed_feature_files(directory, base_revision)
+    changed = [path for path in changed if is_selected(path, include, exclude)]
+
+    # The git diff only decides which per-file smells are reported: any file whose content no
+    # longer matches the index is analyzed again, and the files that are gone leave it. The
+    # files are hashed and analyzed as the walk finds them.
+    indexed_revision, index = load_index(index_path, keys)
+    outdated = outdated_files(discover_feature_files(directory, include, exclude), index, indexed_revision == revision)
     filenames = []
-    for feature in project_features:
-        filenames.append(f"{path}{feature}")
-    contents = read_file.read_files(filenames)
-
-    # Untitled Feature
-    title("Untitled Feature", "blue")
-    start_test()
-    find_untitled_features([str(filename).removeprefix(feature_files_dir) for filename in filenames], contents, "reports/untitled_feature.csv")
-    finish_test()
-
-    # Duplicate Feature Title
-    title("Duplicate Feature Title", "blue")
-    start_test()
-    find_duplicate_feature_titles([str(filename).removeprefix(feature_files_dir) for filename in filenames], contents, "reports/duplicate_feature_title.csv")
-    finish_test()
-
-    # Duplicate Scenario Title
-    title("Duplicate Title Scenario", "blue")
-    start_test()
-    find_duplicate_scenario_titles([str(filename).removeprefix(feature_files_dir) for filename in filenames], contents, "reports/duplicate_scenario_title.csv")
-    finish_test()
-
-    # Duplicate Scenario
-    title("Duplicate Scenario", "blue")
-    start_test()
-    find_duplicate_test_cases([str(filename).removeprefix(feature_files_dir) for filename in filenames], contents, "reports/duplicate_test_case.csv")
-    finish_test()
-
-    # Absence of Background
-    title("Absence of Background", "blue")
-    start_test()
-    find_absence_background([str(filename).removeprefix(feature_files_dir) for filename in filenames], contents, "reports/absence_background.csv")
-    finish_test()
-
-    # Vicious Tag
-    title("Vicious Tag", "blue")
-    start_test()
-    find_vicious_tags([str(filename).removeprefix(feature_files_dir) for filename in filenames], contents, "reports/vicious_tag.csv")
-    finish_test()
-
-    # Duplicate Step
-    title("Duplicate Step", "blue")
-    start_test()
-    find_duplicate_steps([str(filename).removeprefix(feature_files_dir) for filename in filenames], contents, "reports/duplicate_step.csv")
-    finish_test()
-
-    # Starting With The Left Foot
-    title("Starting With The Left Foot", "blue")
-    start_test()
-    find_starting_with_the_left_foot([str(filename).removeprefix(feature_files_dir) for filename in filenames], contents, "reports/starting_with_the_left_foot.csv")
-    finish_test()
-
-    # Malformed Test
-    title("Malformed Test", "blue")
-    start_test()
-    find_malformed_test([str(filename).removeprefix(feature_files_dir) for filename in filenames], contents, "reports/malformed_test.csv")
-    finish_test()
-
-def execute_projects(projects):
-    for project in projects:
-        execute_project(project)
+    timings = None if profile is None else instrumentation.new_timings(len(index_analyzers))
+    with instrumentation.measure(*profile_stages(profile, project)):
+        items = (((filename, state, digest), filename) for filename, state, digest in outdated)
+        for (filename, state, digest), results in engine.iter_keyed_analyses(items, index_analyzers, profiled_jobs(jobs, profiler),
+                                                                             cache_dir, needs, timings):
+            index[filename] = index_entry(state, digest, results)
+            filenames.append(filename)
+        store_index(index_path, keys, revision, index)
+    if profile is not None:
+        profile.record_analysis(project, selected_detectors, filenames, timings)
+
+    # Per-file smells are reported for the changed files only, cross-file smells against the
+    # whole directory. The files are named as in a normal run of the directory.
+    changed_files = group_table(directory, [f"{directory}{path}" for path in changed if f"{directory}{path}" in index])
+    indexed_files = group_table(directory, sorted(index, key=path_order))
+    findings = 0
+    for position, detector in enumerate(selected_detectors):
+        files = indexed_files if detector.cross_file else changed_files
+        detector_results = [index[filename]["results"][position] for filename in files.paths]
+        if findings_writer is not None:
+            with instrumentation.measure(*profile_stages(profile, project, detector)), profiled(profiler, detector.name):
+                findings += findings_writer.write(profiled_findings(detector.findings(files.paths, detector_results), profile, project))
+        else:
+            findings += report_results([detector], files, [detector_results], report_dir, profile, project, profiler)
+    return findings
@@ -0,0 +1,91 @@
+import json
+import os
+import pathlib
+from urllib.parse import quote
+
+sarif_version = "2.1.0"
+sarif_schema = "https://json.schemastore.org/sarif-2.1.0.json"
+
+# Base the artifact URIs under the root of the run are relative to, see section 3.14.14
+root_base_id = "SRCROOT"
+
+def rule_metadata(detector):
+    # reportingDescriptor of a detector, see section 3.49 of the SARIF specification
+    return {
+        "id": detector.name,
+        "name": detector.title.title().replace(" ", ""),
+        "shortDescription": {"text": detector.title},
+        "fullDescription": {"text": detector.description},
+        "defaultConfiguration": {"level": detector.severity},
+        "properties": {"tags": ["gherkin", "test-smell"]},
+    }
+
+def artifact_location(filename, root):
+    # Files under the root are relative references to its base, the others absolute file URIs
+    path = os.path.abspath(filename)
+    relative_path = os.path.relpath(path, root)
+    if relative_path == os.pardir or relative_path.startswith(os.pardir + os.sep):
+        return {"uri": pathlib.PurePath(path).as_uri()}
+    return {"uri": quote(pathlib.PurePath(relative_path).as_posix()), "uriBaseId": root_base_id}
+
+class SarifWriter:
+    """
+    Writes the findings of a run to a text stream as a SARIF 2.1.0 log, one result at a time:
+    the tool and its rules are written when the writer is created, the results as they come
+    and the end of the log when it is closed, so the results are never held in memory.
+
+    The files are located relative to a root directory, given as the SRCROOT base of the run,
+    so the log does not depend on the directory the tool was run from.
+    """
+    def __init__(self, stream, detectors, tool_name="smell_detector", root=None):
+        self.stream = stream
+        self.rule_indexes = {detector.name: index for index, detector in enumerate(detectors)}
+        self.count = 0
+        self.root = os.path.abspath(root or os.curdir)
+        header = json.dumps({
+            "$schema": sarif_schema,
+            "version": sarif_version,
+            "runs": [{
+                "tool": {"driver": {"name": tool_name, "rules": [rule_metadata(detector) for detector in detectors]}},
+                "originalUriBaseIds": {root_base_id: {"uri": pathlib.PurePath(self.root).as_uri().rstrip("/") + "/"}},
+            }],
+        }, ensure_ascii=False)
+        # Leaves the run open, right where its results go
+        stream.write(header[:-len("}]}")] + ', "results": [')
+
+    def result(self, finding):
+        physical_location = {"artifactLocation": artifact_location(finding.file, self.root)}
+        if finding.line is not None:
+            physical_location["region"] = {"startLine": finding.line}
+            if finding.column is not None:
+                physical_location["region"]["startColumn"] = finding.column
+        result = {
+            "ruleId": finding.detector,
+            "ruleIndex": self.rule_indexes[finding.detector],
+            "level": finding.severity,
+            "message": {"text": finding.message},
+            "locations": [{"physicalLocation": physical_location}],
+        }
+        if finding.snippet_hash is not None:
+            result["partialFingerprints"] = {"snippetHash/v1": finding.snippet_hash}
+        return result
+
+    def write(self, findings):
+        """
+        Writes findings as results of the run.
+
+        Args:
+        - findings (iterable of Finding): The findings, possibly a generator.
+
+        Returns:
+        - int: Number of findings written.
+        """
+        count = 0
+        for finding in findings:
+            self.stream.write(("\n" if self.count + count == 0 else ",\n") + json.dumps(self.result(finding), ensure_ascii=False))
+            count += 1
+        self.count += count
+        return count
+
+    def close(self):
+        self.stream.write("\n]}]}\n")
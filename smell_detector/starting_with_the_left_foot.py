@@ -1,7 +1,23 @@
 import csv
 import os
-import re
-from tabulate import tabulate
+from rendering import render_table, rows_needed
+from patterns import opening_keywords
+from findings import SourceSpan, SourceReader, KeptSources, snippet_hash
+from read_file import read_source
+
+# Bump whenever a change to the analysis can change the per-file results kept in the cache
+analysis_version = 2
+
+
+class LeftFoot:
+    """
+    A scenario starting with the left foot: its span and the line of its title.
+    """
+    __slots__ = ("span", "line")
+
+    def __init__(self, span, line):
+        self.span = span
+        self.line = line
 
 def find_starting_with_the_left_foot(feature_filenames, feature_files, csv_filename=None):
     """
@@ -9,52 +25,74 @@ def find_starting_with_the_left_foot(feature_filenames, feature_files, csv_filen
 
     Args:
     - feature_filenames (list of str): The names of the feature files.
-    - feature_files (list of str): The content of the feature files.
+    - feature_files (iterable of str or Document): The content of the feature files.
     - csv_filename (str, optional): Name of the CSV file to save the report.
 
     Returns:
     - None
     """
-    scenario_pattern = r"(Scenario:[\s\S]*?)(?=(?:([@#]\S*?)?Scenario:)|(?:([@#]\S*?)?Scenario Outline:)|(?:([@#]\S*?)?Example:)|(?:([@#]\S*?)?Rule:)|$)"
-    scenario_outline_pattern = r"(Scenario Outline:[\s\S]*?)(?=(?:([@#]\S*?)?Scenario:)|(?:([@#]\S*?)?Scenario Outline:)|(?:([@#]\S*?)?Example:)|(?:([@#]\S*?)?Rule:)|$)"
-    example_pattern = r"(Example:[\s\S]*?)(?=(?:([@#]\S*?)?Scenario:)|(?:([@#]\S*?)?Scenario Outline:)|(?:([@#]\S*?)?Example:)|(?:([@#]\S*?)?Rule:)|$)"
-    step_pattern = r"(?:Scenario:|Scenario Outline:|Example:)[\s\S]*?(?:(Given[\s\S]*?|And[\s\S]*?|When[\s\S]*?|Then[\s\S]*?))(?=When|Then|Scenario:|Scenario Outline:|Example:|Examples:|Rule:|$)"
-    partition_pattern = r"(Given[\s\S]*?|And[\s\S]*?|But[\s\S]*?|Then[\s\S]*?)(?=Given|And|But|When|Then|Scenario:|Scenario Outline:|Example:|Examples:|Rule:|$)"
+    # Documents are parsed and analyzed one at a time and only the contents of the files with
+    # registers are kept to be read back
+    sources = KeptSources(feature_filenames)
+    report_starting_with_the_left_foot(feature_filenames, sources.analyses(feature_files, analyze_starting_with_the_left_foot), csv_filename, sources.read_source)
+
+
+def analyze_starting_with_the_left_foot(document):
+    """
+    Finds the scenarios starting with the left foot in a single parsed feature file.
+
+    Args:
+    - document (Document): The parsed feature file.
+
+    Returns:
+    - tuple: Registers found in the file, as the start and end offsets and the hash of the text
+      of the scenario and the line of its title, and their number of occurrences.
+    """
+    left_foots = []
+    # Scenarios, Scenario Outlines and Examples of the feature
+    total_left_foots = left_foot_analysis(document, document.scenarios, left_foots, 0)
+    return left_foots, total_left_foots
+
+
+def report_starting_with_the_left_foot(feature_filenames, analyses, csv_filename=None, read_source=read_source):
+    """
+    Merges the per-file results of analyze_starting_with_the_left_foot and reports them.
+
+    Args:
+    - feature_filenames (list of str): The names of the feature files.
+    - analyses (iterable): The result of analyze_starting_with_the_left_foot for each file, in the same order.
+    - csv_filename (str, optional): Name of the CSV file to save the report.
+    - read_source (callable, optional): Returns the content or Document of a feature file from
+      its name, to read the scenarios back. Reads the file of that name by default.
 
+    Returns:
+    - int: Number of findings reported.
+    """
     left_foots = []
     total_left_foots = 0
-    for feature_index, (filename, feature_file) in enumerate(zip(feature_filenames, feature_files)):
-        # Find scenarios into feature
-        scenarios = [(group.strip(), feature_file[:match.start()].count('\n') + 1)
-                     for match in re.finditer(scenario_pattern, feature_file)
-                     for group in match.groups() if group]
-        scenarios_outline = [(group.strip(), feature_file[:match.start()].count('\n') + 1)
-                             for match in re.finditer(scenario_outline_pattern, feature_file)
-                             for group in match.groups() if group]
-        examples = [(group.strip(), feature_file[:match.start()].count('\n') + 1)
-                    for match in re.finditer(example_pattern, feature_file)
-                    for group in match.groups() if group]
-
-        # Calculating all feature scenarios
-        total_scenarios_feature = scenarios + scenarios_outline + examples
-
-        total_left_foots = left_foot_analysis(filename, total_scenarios_feature, step_pattern, partition_pattern,
-                                                     left_foots, total_left_foots)
+    for file_id, (registers, total) in enumerate(analyses):
+        for start, end, _, line in registers:
+            left_foots.append(LeftFoot(SourceSpan(file_id, start, end), line))
+        total_left_foots += total
 
     if left_foots:
-        report_data = [
-            [left_foot["filename"], left_foot["left_foot"]]
-            for left_foot in left_foots
-        ]
+        # The locations and scenarios are only formatted and read back here, when shown or saved
+        report_data = None
+        if rows_needed(csv_filename):
+            source_reader = SourceReader(feature_filenames, read_source)
+            report_data = [
+                [f"{feature_filenames[left_foot.span.file_id]}:{left_foot.line}", source_reader.text(left_foot.span)]
+                for left_foot in left_foots
+            ]
 
         print(f"- Total number of left foots: {total_left_foots}")
-        print(tabulate(report_data, headers=["Filename", "Left Foot"], tablefmt="grid"))
+        render_table(report_data, ["Filename", "Left Foot"], count=len(left_foots))
 
         # Generate CSV if filename is provided
         if csv_filename:
-            report_dir = './reports'
-            if not os.path.exists(report_dir):
-                os.mkdir(report_dir)
+            report_dir = os.path.dirname(csv_filename)
+            if report_dir and not os.path.exists(report_dir):
+                os.makedirs(report_dir)
 
             file_exists = os.path.isfile(csv_filename)  # Check if file already exists
             with open(csv_filename, mode='a', newline='', encoding='utf-8') as csvfile:
@@ -66,31 +104,36 @@ def find_starting_with_the_left_foot(feature_filenames, feature_files, csv_filen
     else:
         print("No registers with left foots.")
 
+    return len(left_foots)
 
-def left_foot_analysis(filename, registers, step_pattern, partition_pattern, left_foots, total_left_foots):
-    untreated_left_foots = []
-    for register_index, (register, register_line) in enumerate(registers):
-        registers[register_index] = re.sub("\n\n", "\n", register)
-        register = register.strip()
-        untreated_steps_scenarios = re.findall(step_pattern, register)
 
-        for untreated_steps_scenario in untreated_steps_scenarios:
-            untreated_steps_scenario = untreated_steps_scenario.strip()
-            steps_scenario = [step.strip() for step in re.split(partition_pattern, untreated_steps_scenario) if step.strip()]
+def iter_starting_with_the_left_foot_findings(feature_filenames, analyses):
+    """
+    Yields each scenario starting with the left foot, from the per-file results of
+    analyze_starting_with_the_left_foot, as the results arrive.
 
-            if not re.match(r"(Given|When)", steps_scenario[0]):
-                total_left_foots = left_foot_structure(filename, left_foots, register, register_line, total_left_foots)
-                total_left_foots += 1
+    Args:
+    - feature_filenames (list of str): The names of the feature files.
+    - analyses (iterable): The result of analyze_starting_with_the_left_foot for each file, in the same order.
 
+    Returns:
+    - generator of tuples: Filename, line, column (None, not tracked), message and snippet
+      hash of each finding.
+    """
+    for filename, (registers, _) in zip(feature_filenames, analyses):
+        for _, _, scenario_hash, line in registers:
+            yield filename, line, None, "Scenario does not start with a Given or When step", scenario_hash
 
-    return total_left_foots
 
+def left_foot_analysis(document, registers, left_foots, total_left_foots):
+    for register in registers:
+        # A scenario should start with a Given or a When step
+        if register.steps and register.steps[0].keyword not in opening_keywords:
+            # Offsets and hash of the text of the scenario, which is read back by the report
+            start, end = document.text_span(register.line, register.end_line)
+            left_foots.append((start, end, snippet_hash(document.text(register.line, register.end_line)), register.line))
+            total_left_foots += 1
 
-def left_foot_structure(filename, left_foots, scenario, line, total_left_foots):
-    left_foots.append({
-        "filename": f"{filename}:{line}",
-        "left_foot": scenario
-    })
     return total_left_foots
 
 
@@ -0,0 +1,74 @@
+import csv
+import io
+import re
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+import rendering
+from gherkin_parser import parse_feature_file
+from absence_background import analyze_absence_background, report_absence_background, iter_absence_background_findings
+
+def feature_file(*scenarios):
+    lines = ["Feature: Example feature"]
+    for index, given_steps in enumerate(scenarios):
+        lines.append(f"  Scenario: Scenario {index}")
+        lines.append(f"    Given {given_steps[0]}")
+        lines.extend(f"    And {step}" for step in given_steps[1:])
+        lines.append("    Then it works")
+    return "\n".join(lines)
+
+def reported(analysis, fraction):
+    # Messages of the report of one file and total number of absence backgrounds it prints
+    output = io.StringIO()
+    with mock.patch.object(rendering, "mode", "plain"), redirect_stdout(output):
+        report_absence_background(["a.feature"], [analysis], fraction=fraction)
+    rows = list(csv.reader(io.StringIO(output.getvalue()), delimiter="\t"))
+    if rows[0][0].startswith("No registers"):
+        return [], 0
+    total = int(rows[0][0].rsplit(" ", 1)[1])
+    # The steps of a message are on indented lines, so each message starts a line with its quote
+    return [message for row in rows[2:] for message in re.split("\n(?=')", row[1])], total
+
+class TestAbsenceBackground(unittest.TestCase):
+
+    def test_prefix_shared_by_all(self):
+        prefixes, total = analyze_absence_background(parse_feature_file(feature_file(
+            ["a user", "a cart", "a book"],
+            ["a user", "a cart"],
+            ["a user", "a cart", "a pen"],
+        )))
+        self.assertEqual(reported((prefixes, total), 1.0), (["'a user\n a cart' appears 3 times"], 3))
+
+    def test_no_prefix_shared_by_all(self):
+        prefixes, total = analyze_absence_background(parse_feature_file(feature_file(
+            ["a user", "a cart"],
+            ["a user", "a cart"],
+            ["an admin"],
+        )))
+        self.assertEqual(reported((prefixes, total), 1.0), ([], 0))
+        self.assertEqual(reported((prefixes, total), 0.6), (["'a user\n a cart' appears 2 times"], 2))
+
+    def test_fraction_keeps_the_longest_prefixes(self):
+        prefixes, total = analyze_absence_background(parse_feature_file(feature_file(
+            ["a user", "a cart", "a book"],
+            ["a user", "a cart", "a book"],
+            ["a user", "a wishlist"],
+            ["a user", "a wishlist"],
+        )))
+        self.assertEqual(reported((prefixes, total), 1.0), (["'a user' appears 4 times"], 4))
+        self.assertEqual(reported((prefixes, total), 0.5), ([
+            "'a user\n a cart\n a book' appears 2 times",
+            "'a user\n a wishlist' appears 2 times",
+        ], 4))
+
+    def test_findings_point_at_the_first_scenario(self):
+        analysis = analyze_absence_background(parse_feature_file(feature_file(
+            ["an admin"],
+            ["a user", "a cart"],
+            ["a user", "a cart"],
+        )))
+        findings = list(iter_absence_background_findings(["a.feature"], [analysis], 0.6))
+        self.assertEqual([finding[:3] for finding in findings], [("a.feature", 6, 5)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+import daemon
+import runner
+
+class TestDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        # Cleanups run after the daemon is stopped, unlike tearDown
+        self.addCleanup(shutil.rmtree, self.root)
+        self.socket_path = os.path.join(self.root, "daemon.sock")
+        self.write("project/a.feature", "Feature: A\n  Scenario: First\n    Given step 1\n")
+        self.write("project/nested/b.feature", "Feature: B\n  Scenario: First\n    Given step 1\n")
+        self.project = os.path.join(self.root, "project")
+
+    def write(self, path, content):
+        full_path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w", encoding="utf-8") as file:
+            file.write(content)
+
+    def path(self, path):
+        return os.path.join(self.root, path)
+
+    def start(self, make_watcher, paths=None):
+        original_make_watcher = daemon.make_watcher
+        daemon.make_watcher = make_watcher
+        self.addCleanup(setattr, daemon, "make_watcher", original_make_watcher)
+        thread = threading.Thread(target=daemon.serve, args=(paths or [self.project], self.socket_path), kwargs={"poll_interval": 0.05})
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(daemon.query, self.socket_path, {"command": "stop"})
+        # The socket accepts connections once the projects are analyzed
+        while True:
+            try:
+                daemon.query(self.socket_path, {"command": "files"})
+                break
+            except OSError:
+                time.sleep(0.01)
+
+    def wait_for_files(self, expected):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            files = daemon.query(self.socket_path, {"command": "files"})["files"]
+            if files == expected:
+                return files
+            time.sleep(0.05)
+        return files
+
+    def check_updates(self):
+        a, b, c = self.path("project/a.feature"), self.path("project/nested/b.feature"), self.path("project/nested/c.feature")
+        self.assertEqual(daemon.query(self.socket_path, {"command": "files"})["files"], [a, b])
+
+        self.write("project/nested/c.feature", "Feature: A\n")
+        self.write("project/nested/notes.txt", "Feature: A\n")
+        self.assertEqual(self.wait_for_files([a, b, c]), [a, b, c])
+        output = daemon.query(self.socket_path, {"command": "report", "detectors": ["duplicate_feature_title"]})["output"]
+        self.assertIn(c, output)
+        self.assertNotIn("UNTITLED FEATURE", output)
+
+        os.remove(a)
+        self.assertEqual(self.wait_for_files([b, c]), [b, c])
+
+    def test_inotify(self):
+        self.start(daemon.InotifyWatcher)
+        self.check_updates()
+
+    def test_polling(self):
+        self.start(daemon.PollingWatcher)
+        self.check_updates()
+
+    def test_files_and_globs(self):
+        self.write("other/d.feature", "Feature: D\n")
+        self.start(daemon.make_watcher, [self.path("project/*.feature"), self.path("other/d.feature")])
+        self.assertEqual(daemon.query(self.socket_path, {"command": "files"})["files"],
+                         [self.path("other/d.feature"), self.path("project/a.feature")])
+
+        # Only the files the paths match are added
+        self.write("project/e.feature", "Feature: E\n")
+        self.write("project/nested/f.feature", "Feature: F\n")
+        self.write("other/g.feature", "Feature: G\n")
+        expected = [self.path("other/d.feature"), self.path("project/a.feature"), self.path("project/e.feature")]
+        self.assertEqual(self.wait_for_files(expected), expected)
+
+    def test_watched_roots(self):
+        self.assertEqual(runner.path_roots([self.project, self.path("project/a.feature"), self.path("other/**/*.feature"), "*.feature"]),
+                         [self.project, self.path("other"), "."])
+
+    def test_unknown_command(self):
+        self.start(daemon.make_watcher)
+        self.assertIn("error", daemon.query(self.socket_path, {"command": "restart"}))
+        self.assertIn("error", daemon.query(self.socket_path, {"command": "report", "detectors": ["Duplicate Feature Title"]}))
+
+    def test_selected_detectors(self):
+        corpus = daemon.Corpus(detector_names=["untitled_feature"])
+        corpus.add_paths([self.project])
+        self.assertEqual([len(results) for results in corpus.results.values()], [1, 1])
+        self.assertIn("UNTITLED FEATURE", corpus.report())
+        with self.assertRaisesRegex(ValueError, "duplicate_feature_title"):
+            corpus.report(["duplicate_feature_title"])
+
+    def test_query_timeout(self):
+        # A socket accepting connections without ever answering
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+            server.bind(self.socket_path)
+            server.listen()
+            with self.assertRaises(TimeoutError):
+                daemon.query(self.socket_path, {"command": "files"}, timeout=0.05)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import subprocess
+import sys
+import unittest
+from detector_registry import detectors, select_detectors, combined_needs
+from gherkin_parser import parse_feature_file
+
+content = """@slow
+Feature: Login
+  Scenario Outline: Valid login
+    Given a user <name>
+    Then the user is logged in
+
+    Examples:
+      | name  |
+      | alice |
+"""
+
+class TestDetectorRegistry(unittest.TestCase):
+
+    def test_select_detectors(self):
+        selected = select_detectors(["duplicate_step", "untitled_feature"])
+        self.assertEqual([detector.name for detector in selected], ["untitled_feature", "duplicate_step"])
+        self.assertEqual(select_detectors(), [detector for detector in detectors if detector.name != "near_duplicate_test_case"])
+        self.assertEqual([detector.name for detector in select_detectors(["near_duplicate_test_case"])], ["near_duplicate_test_case"])
+        with self.assertRaises(ValueError):
+            select_detectors(["missing"])
+
+    def test_only_used_detectors_are_imported(self):
+        code = ("import sys, runner\n"
+                "runner.analyzers(runner.select_detectors(['untitled_feature']))\n"
+                "print('untitled_feature' in sys.modules, 'vicious_tag' in sys.modules)")
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.split(), ["True", "False"])
+
+    def test_combined_needs(self):
+        self.assertEqual(combined_needs(select_detectors(["untitled_feature"])), frozenset())
+        self.assertEqual(combined_needs(select_detectors(["untitled_feature", "vicious_tag"])), {"blocks", "tags"})
+
+    def test_parse_only_needed_parts(self):
+        document = parse_feature_file(content, frozenset())
+        self.assertEqual(document.feature.title, "Login")
+        self.assertEqual(document.scenarios, [])
+        self.assertEqual(document.feature.tags, [])
+
+        document = parse_feature_file(content, {"blocks"})
+        scenario = document.scenarios[0]
+        self.assertEqual(len(scenario.steps), 2)
+        self.assertEqual(scenario.examples[0].rows, [])
+        self.assertEqual(scenario.end_line, 9)
+        self.assertEqual(document.line_kinds, [])
+
+        document = parse_feature_file(content)
+        self.assertEqual(len(document.scenarios[0].examples[0].rows), 2)
+        self.assertEqual([tag.name for tag in document.feature.tags], ["@slow"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+import unittest
+from discovery import discover_feature_files
+
+class TestDiscoverFeatureFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        for path in ["a.feature", ".DS_Store", "notes.txt", "features/b.feature", "features/nested/c.feature",
+                     "features/drafts/d.feature", "build/e.feature", "vendor/f.feature"]:
+            full_path = os.path.join(self.root, path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, "w", encoding="utf-8") as file:
+                file.write("Feature: Example\n")
+        with open(os.path.join(self.root, ".gitignore"), "w", encoding="utf-8") as gitignore:
+            gitignore.write("# Build output\nbuild/\n")
+        with open(os.path.join(self.root, "features", ".gitignore"), "w", encoding="utf-8") as gitignore:
+            gitignore.write("drafts\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def discover(self, **kwargs):
+        return [os.path.relpath(path, self.root) for path in discover_feature_files(self.root, **kwargs)]
+
+    def test_recursive_discovery(self):
+        self.assertEqual(self.discover(), ["a.feature", "features/b.feature", "features/nested/c.feature", "vendor/f.feature"])
+
+    def test_without_gitignore(self):
+        self.assertIn("build/e.feature", self.discover(use_gitignore=False))
+        self.assertIn("features/drafts/d.feature", self.discover(use_gitignore=False))
+
+    def test_include_and_exclude(self):
+        self.assertEqual(self.discover(include=["features/*"], exclude=["*/nested"]), ["features/b.feature"])
+
+    def test_globs_do_not_cross_directories(self):
+        self.assertEqual(self.discover(include=["*.feature"]), ["a.feature"])
+        self.assertEqual(self.discover(include=["**/*.feature"], exclude=["features/**/c.feature"]),
+                         ["a.feature", "features/b.feature", "vendor/f.feature"])
+        with open(os.path.join(self.root, ".gitignore"), "a", encoding="utf-8") as gitignore:
+            gitignore.write("features/*.feature\n")
+        self.assertEqual(self.discover(), ["a.feature", "features/nested/c.feature", "vendor/f.feature"])
+
+    def test_gitignore_above_the_root(self):
+        os.makedirs(os.path.join(self.root, ".git"))
+        with open(os.path.join(self.root, ".gitignore"), "a", encoding="utf-8") as gitignore:
+            gitignore.write("nested/\n/features/b.feature\n")
+        with open(os.path.join(self.root, "features", "kept.feature"), "w", encoding="utf-8") as file:
+            file.write("Feature: Kept\n")
+        features = os.path.join(self.root, "features")
+        self.assertEqual([os.path.relpath(path, features) for path in discover_feature_files(features)], ["kept.feature"])
+
+    def test_symlink_loop(self):
+        os.symlink(self.root, os.path.join(self.root, "features", "loop"))
+        self.assertEqual(self.discover(), ["a.feature", "features/b.feature", "features/nested/c.feature", "vendor/f.feature"])
+
+if __name__ == '__main__':
+    unittest.main()
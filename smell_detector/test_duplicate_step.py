@@ -0,0 +1,76 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+import rendering
+from gherkin_parser import parse_feature_file
+from duplicate_step import analyze_duplicate_steps, report_duplicate_steps
+
+class TestDuplicateSteps(unittest.TestCase):
+
+    def test_keywords_inside_words(self):
+        feature_file = "\n".join([
+            "Feature: Example feature",
+            "  Scenario: First scenario",
+            "    Given the Android app Whenever it rains",
+            "    When the user opens it",
+            "    Then the Android app Whenever it rains",
+        ])
+        registers, total = analyze_duplicate_steps(parse_feature_file(feature_file))
+        self.assertEqual(total, 2)
+        self.assertEqual(registers[0][3], [(3, "the Android app Whenever it rains", 2)])
+
+    def test_tags_and_comments_in_steps(self):
+        feature_file = "\n".join([
+            "Feature: Example feature",
+            "  Scenario: First scenario",
+            "    Given user @john posts #{id}",
+            "    When user @john posts #{id}",
+            "    Then it works",
+            "",
+            "  # Next scenario",
+            "  @tag",
+            "  Scenario: Second scenario",
+            "    Given step 1",
+        ])
+        registers, total = analyze_duplicate_steps(parse_feature_file(feature_file))
+        self.assertEqual(total, 2)
+        self.assertEqual(len(registers), 1)
+        start, end, _, _ = registers[0]
+        self.assertEqual(feature_file[start:end], "\n".join(feature_file.split("\n")[1:5]))
+
+    def test_doc_string_content_is_not_a_step(self):
+        feature_file = "\n".join([
+            "Feature: Example feature",
+            "  Scenario: First scenario",
+            "    Given a document:",
+            "      \"\"\"",
+            "      Given a document:",
+            "      \"\"\"",
+            "    Then it is stored",
+        ])
+        registers, total = analyze_duplicate_steps(parse_feature_file(feature_file))
+        self.assertEqual((registers, total), ([], 0))
+    def test_summary_does_not_read_back(self):
+        feature_file = "\n".join([
+            "Feature: Example feature",
+            "  Scenario: First scenario",
+            "    Given it rains",
+            "    When it rains",
+        ])
+        analyses = [analyze_duplicate_steps(parse_feature_file(feature_file))]
+        read_source = mock.Mock(return_value=feature_file)
+        output = io.StringIO()
+        with mock.patch.object(rendering, "mode", "summary"), redirect_stdout(output):
+            self.assertEqual(report_duplicate_steps(["a.feature"], analyses, read_source=read_source), 1)
+        self.assertIn("- 1 findings", output.getvalue())
+        read_source.assert_not_called()
+
+        # The rows are still read back for the CSV
+        with mock.patch.object(rendering, "mode", "summary"), redirect_stdout(output), \
+                mock.patch("duplicate_step.open", mock.mock_open()):
+            report_duplicate_steps(["a.feature"], analyses, "steps.csv", read_source)
+        read_source.assert_called_once_with("a.feature")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+from gherkin_parser import parse_feature_file
+from duplicate_test_case import analyze_test_cases, find_duplicate_test_cases
+
+class TestDuplicateTestCases(unittest.TestCase):
+
+    def setUp(self):
+        self.feature_file = "\n".join([
+            "Feature: Example feature",
+            "  Scenario: First scenario",
+            "    Given step 1",
+            "    Then step 2",
+            "  Scenario: Second scenario",
+            "    Given step 1",
+            "    Then step 2",
+        ])
+
+    def test_index_holds_digests(self):
+        test_cases = analyze_test_cases(parse_feature_file(self.feature_file))
+        self.assertEqual([(line, title) for _, _, _, line, title in test_cases],
+                         [(2, "Scenario: First scenario"), (5, "Scenario: Second scenario")])
+        _, start, end, _, _ = test_cases[1]
+        self.assertEqual(self.feature_file[start:end], "Given step 1\n    Then step 2")
+        self.assertEqual(test_cases[0][0], test_cases[1][0])
+        self.assertEqual(len(test_cases[0][0]), 32)
+
+    def test_report_reads_bodies_back(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            # The contents may come from a generator, only read once
+            find_duplicate_test_cases(["file.feature", "other.feature"], iter([self.feature_file, "Feature: Other"]))
+        self.assertIn("- Total number of test cases: 2", output.getvalue())
+        self.assertIn("file.feature:5 - Scenario: Second scenario", output.getvalue())
+        self.assertIn("Given step 1", output.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
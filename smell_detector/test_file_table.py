@@ -0,0 +1,41 @@
+import unittest
+from pathlib import Path
+from file_table import FileTable
+from findings import SourceSpan, SourceReader
+from runner import group_table, path_root
+
+class TestFileTable(unittest.TestCase):
+
+    def test_ids_and_names(self):
+        files = FileTable("../").extend(["../project/a.feature", Path("../project/sub/b.feature")])
+        self.assertEqual(files.add("../other/a.feature"), 2)
+        self.assertEqual(len(files), 3)
+        self.assertEqual(files.names, ["project/a.feature", "project/sub/b.feature", "other/a.feature"])
+        self.assertEqual(files.paths[1], "../project/sub/b.feature")
+
+    def test_names_are_interned(self):
+        first = FileTable("../").extend(["../project/a.feature"])
+        second = FileTable("../").extend(["../project/" + "a.feature"])
+        self.assertIs(first.names[0], second.names[0])
+
+    def test_ids_as_paths_arrive(self):
+        files = FileTable("../")
+        paths = files.added(iter(["../project/a.feature", "../project/b.feature"]))
+        self.assertEqual(len(files), 0)
+        self.assertEqual(next(paths), "../project/a.feature")
+        self.assertEqual(files.names, ["project/a.feature"])
+        self.assertEqual(list(paths), ["../project/b.feature"])
+        self.assertEqual(len(files), 2)
+
+    def test_group_tables(self):
+        files = group_table(path_root("../project/**/*.feature"), ["../project/a.feature", "../project/sub/b.feature"])
+        self.assertEqual(list(files), ["project/a.feature", "project/sub/b.feature"])
+        self.assertEqual(files[1], "project/sub/b.feature")
+        self.assertEqual(list(group_table(".", ["a.feature"])), ["a.feature"])
+
+        # Snippets are read back from the paths, not from the names shown in the reports
+        reader = SourceReader(files, {"../project/sub/b.feature": "Feature: B"}.__getitem__)
+        self.assertEqual(reader.text(SourceSpan(1, 0, 7)), "Feature")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+from gherkin_parser import parse_feature_file, parse_feature_files
+
+class TestGherkinParser(unittest.TestCase):
+
+    def setUp(self):
+        self.feature_file = "\n".join([
+            "@featureTag",
+            "Feature: Example feature",
+            "  Some description",
+            "",
+            "  Background:",
+            "    Given a background step",
+            "",
+            "  @tag1 @tag2",
+            "  Scenario: First scenario",
+            "    Given step 1",
+            "    And step 2",
+            "      \"\"\"",
+            "      @notATag",
+            "      Scenario: not a scenario",
+            "      \"\"\"",
+            "    When step 3",
+            "    Then step 4",
+            "",
+            "  # A comment",
+            "  Rule: A rule",
+            "",
+            "    @outlineTag",
+            "    Scenario Outline: An outline",
+            "      Given <value>",
+            "      Then Android is used",
+            "      | a | b |",
+            "",
+            "      Examples:",
+            "        | value |",
+            "        | 1     |",
+        ])
+
+    def test_feature(self):
+        document = parse_feature_file(self.feature_file)
+        self.assertEqual(document.feature.title, "Example feature")
+        self.assertEqual(document.feature.line, 2)
+        self.assertEqual([tag.name for tag in document.feature.tags], ["@featureTag"])
+        self.assertEqual(len(document.backgrounds), 1)
+        self.assertEqual(document.backgrounds[0].steps[0].text, "a background step")
+
+    def test_scenarios(self):
+        document = parse_feature_file(self.feature_file)
+        self.assertEqual([scenario.title for scenario in document.scenarios], ["First scenario", "An outline"])
+        self.assertEqual(document.feature.scenarios, document.scenarios[:1])
+        self.assertEqual(document.rules[0].scenarios, document.scenarios[1:])
+
+        scenario = document.scenarios[0]
+        self.assertEqual([(tag.name, tag.line, tag.column) for tag in scenario.tags], [("@tag1", 8, 3), ("@tag2", 8, 9)])
+        self.assertEqual([(step.keyword, step.line) for step in scenario.steps],
+                         [("Given", 10), ("And", 11), ("When", 16), ("Then", 17)])
+        self.assertEqual(scenario.steps[1].end_line, 15)
+        self.assertEqual(scenario.end_line, 17)
+
+    def test_outline(self):
+        document = parse_feature_file(self.feature_file)
+        outline = document.scenarios[1]
+        self.assertEqual(outline.keyword, "Scenario Outline")
+        self.assertEqual(outline.steps[1].text, "Android is used")
+        self.assertEqual(outline.steps[1].argument, ["      | a | b |"])
+        self.assertEqual(outline.body_end_line, 26)
+        self.assertEqual(outline.examples[0].rows, [(29, ["value"]), (30, ["1"])])
+        self.assertEqual(outline.end_line, 30)
+
+    def test_positions(self):
+        document = parse_feature_file(self.feature_file)
+        offset = self.feature_file.index("When step 3")
+        self.assertEqual(document.position(offset), (16, 5))
+        self.assertEqual(document.offset(16, 5), offset)
+        self.assertEqual(document.position(0), (1, 1))
+        self.assertEqual(document.position(len(self.feature_file) - 1), (30, 17))
+
+    def test_text_spans(self):
+        document = parse_feature_file(self.feature_file)
+        for start_line, end_line in [(1, 1), (15, 18), (29, 30)]:
+            start, end = document.text_span(start_line, end_line)
+            self.assertEqual(self.feature_file[start:end], document.text(start_line, end_line))
+            start, end = document.text_span(start_line, end_line, strip=True)
+            self.assertEqual(self.feature_file[start:end], document.text(start_line, end_line).strip())
+        self.assertEqual(document.text_span(31, 31), (0, 0))
+
+    def test_documents_are_reused(self):
+        document = parse_feature_file(self.feature_file)
+        documents = parse_feature_files([document, "Feature: Another"])
+        self.assertIs(documents[0], document)
+        self.assertEqual(documents[1].feature.title, "Another")
+
+if __name__ == '__main__':
+    unittest.main()
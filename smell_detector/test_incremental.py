@@ -0,0 +1,121 @@
+import io
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+import result_cache
+import runner
+from duplicate_feature_title import analyze_feature_title
+from discovery import discover_feature_files
+from incremental import changed_feature_files, load_index, store_index, outdated_files, index_entry, file_state, path_order
+
+class TestIncremental(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.project = os.path.join(self.root, "project")
+        for path in ["a.feature", "b.feature", "nested/c.feature", "notes.txt"]:
+            self.write(path, "Feature: Example\n")
+        self.git("init", "-q")
+        self.commit("base")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, path, content):
+        full_path = os.path.join(self.project, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w", encoding="utf-8") as file:
+            file.write(content)
+
+    def git(self, *arguments):
+        subprocess.run(["git", "-C", self.root, *arguments], check=True, capture_output=True)
+
+    def commit(self, message):
+        self.git("add", ".")
+        self.git("-c", "user.name=test", "-c", "user.email=test@example.com", "commit", "-q", "-m", message)
+
+    def test_changed_feature_files(self):
+        self.write("nested/c.feature", "Feature: Changed\n")
+        self.write("d.feature", "Feature: New\n")
+        self.write("notes.txt", "changed\n")
+        os.remove(os.path.join(self.project, "a.feature"))
+        self.assertEqual(changed_feature_files(self.project, "HEAD"), (["d.feature", "nested/c.feature"], ["a.feature"]))
+
+    def test_nothing_changed(self):
+        self.assertEqual(changed_feature_files(self.project, "HEAD"), ([], []))
+
+    def test_git_errors(self):
+        with self.assertRaisesRegex(ValueError, "bad revision 'nosuchrev'"):
+            changed_feature_files(self.project, "nosuchrev")
+        with self.assertRaisesRegex(ValueError, "not a directory"):
+            runner.execute_changes(os.path.join(self.project, "a.feature"), "HEAD")
+        with mock.patch("subprocess.run", side_effect=FileNotFoundError("git")), self.assertRaisesRegex(ValueError, "git is needed"):
+            changed_feature_files(self.project, "HEAD")
+
+    def test_path_order(self):
+        for path in ["z.feature", "nested/b.feature", "nested/deeper/a.feature", "nested/z.feature", "other/a.feature"]:
+            self.write(path, "Feature: Example\n")
+        discovered = list(discover_feature_files(self.project))
+        self.assertEqual(discovered[:3], [os.path.join(self.project, path) for path in ["a.feature", "b.feature", "z.feature"]])
+        self.assertEqual(sorted(reversed(discovered), key=path_order), discovered)
+
+    def test_index_round_trip(self):
+        index_path = os.path.join(self.root, "index", "project.json")
+        self.assertEqual(load_index(index_path, ["key:1"]), (None, {}))
+        store_index(index_path, ["key:1"], "abc", {"project/b.feature": index_entry([1, 2], "h1", [[1, 2]]),
+                                                   "project/a.feature": index_entry([3, 4], "h2", [None])})
+        revision, files = load_index(index_path, ["key:1"])
+        self.assertEqual(revision, "abc")
+        self.assertEqual(list(files), ["project/a.feature", "project/b.feature"])
+        self.assertEqual(files["project/a.feature"]["results"], [None])
+        self.assertEqual(load_index(index_path, ["key:2"]), (None, {}))
+
+    def test_outdated_files(self):
+        filenames = [os.path.join(self.project, path) for path in ["a.feature", "b.feature", "nested/c.feature"]]
+        files = {filename: index_entry(state, digest, []) for filename, state, digest in outdated_files(filenames, {}, True)}
+        self.assertEqual(list(files), filenames)
+        self.assertEqual(list(outdated_files(filenames, files, True)), [])
+
+        # Touched without changing the content: hashed again, not analyzed again
+        os.utime(filenames[0], ns=(0, 0))
+        self.assertEqual(list(outdated_files(filenames, files, True)), [])
+        self.assertEqual(files[filenames[0]]["state"], file_state(filenames[0]))
+
+        # Changed behind the same state: only caught once the revision changed
+        os.utime(filenames[1], ns=(0, 0))
+        list(outdated_files(filenames, files, True))
+        with open(filenames[1], "w", encoding="utf-8") as file:
+            file.write("Feature: Changed\n")
+        os.utime(filenames[1], ns=(0, 0))
+        self.assertEqual(list(outdated_files(filenames, files, True)), [])
+        self.assertEqual([filename for filename, _, _ in outdated_files(filenames, files, False)], [filenames[1]])
+
+        # Files that are gone leave the index
+        list(outdated_files(filenames[1:], files, True))
+        self.assertNotIn(filenames[0], files)
+
+    def test_changes_outside_the_diff(self):
+        self.write("b.feature", "Feature: Other\n")
+        self.write("nested/c.feature", "Feature: Third\n")
+        self.commit("distinct titles")
+        index_dir = os.path.join(self.root, "index")
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(runner.execute_changes(self.project, "HEAD", ["duplicate_feature_title"], index_dir=index_dir), 0)
+
+            # Committed, so not in the diff against HEAD, but the index no longer matches
+            self.write("b.feature", "Feature: Example\n")
+            self.commit("duplicate title")
+            self.assertEqual(runner.execute_changes(self.project, "HEAD", ["duplicate_feature_title"], index_dir=index_dir), 1)
+
+        # Only the selected detector analyzed the files
+        with open(os.path.join(index_dir, os.listdir(index_dir)[0]), encoding="utf-8") as index_file:
+            self.assertEqual(json.load(index_file)["keys"], [result_cache.analyzer_key(analyze_feature_title)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+from line_classifier import classify_line
+from gherkin_parser import parse_feature_file
+
+class TestLineClassifier(unittest.TestCase):
+
+    def test_block_keywords(self):
+        self.assertEqual(classify_line("Feature: Example feature"), ("Feature", "Example feature"))
+        self.assertEqual(classify_line("  Scenario Outline:An outline "), ("Scenario Outline", "An outline"))
+        self.assertEqual(classify_line("    Examples:"), ("Examples", ""))
+        self.assertEqual(classify_line("  Scenario - not a block: x"), ("text", "Scenario - not a block: x"))
+
+    def test_step_keywords(self):
+        self.assertEqual(classify_line("    Given\tstep 1"), ("Given", "step 1"))
+        self.assertEqual(classify_line("    * step 2"), ("*", "step 2"))
+        self.assertEqual(classify_line("    Then"), ("Then", ""))
+        self.assertEqual(classify_line("    Thenceforth step"), ("text", "Thenceforth step"))
+        self.assertEqual(classify_line("    Given: not a step"), ("text", "Given: not a step"))
+
+    def test_other_kinds(self):
+        self.assertEqual(classify_line("   "), ("blank", ""))
+        self.assertEqual(classify_line("  # Scenario: commented"), ("comment", "# Scenario: commented"))
+        self.assertEqual(classify_line("  @tag1 @tag2"), ("tag", "@tag1 @tag2"))
+        self.assertEqual(classify_line("    | a | b |"), ("table_row", "| a | b |"))
+        self.assertEqual(classify_line('      """json'), ("docstring_delimiter", '"""'))
+
+    def test_document_line_kinds(self):
+        document = parse_feature_file("\n".join([
+            "Feature: Example feature",
+            "  Scenario: First scenario",
+            "    Given a document:",
+            "      \"\"\"",
+            "      Given a document:",
+            "      \"\"\"",
+            "    Then it is stored",
+        ]), {"blocks", "line_kinds"})
+        self.assertEqual(document.line_kinds, ["Feature", "Scenario", "Given", "docstring_delimiter", "docstring",
+                                               "docstring_delimiter", "Then"])
+        self.assertEqual(parse_feature_file("Feature: Example feature").line_kinds, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import io
+import json
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout, redirect_stderr
+import main
+import rendering
+import instrumentation
+from findings import snippet_hash
+
+class TestMain(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        # main sets the rendering for the whole process
+        self.addCleanup(setattr, rendering, "mode", rendering.mode)
+        self.addCleanup(setattr, rendering, "snippet_lines", rendering.snippet_lines)
+        self.addCleanup(setattr, instrumentation, "trace_memory", instrumentation.trace_memory)
+        self.write("clean/a.feature", "Feature: A\n  Scenario: First\n    Given step 1\n    When step 2\n    Then step 3\n")
+        self.write("smelly/b.feature", "Feature:\n  Scenario: First\n    Given step 1\n    When step 2\n    Then step 3\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, path, content):
+        full_path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w", encoding="utf-8") as file:
+            file.write(content)
+
+    def run_main(self, *arguments):
+        output = io.StringIO()
+        with redirect_stdout(output), redirect_stderr(output):
+            exit_code = main.main(list(arguments))
+        return exit_code, output.getvalue()
+
+    def test_exit_codes(self):
+        self.assertEqual(self.run_main(os.path.join(self.root, "clean"))[0], main.exit_clean)
+        self.assertEqual(self.run_main(os.path.join(self.root, "smelly"))[0], main.exit_findings)
+        self.assertEqual(self.run_main(os.path.join(self.root, "missing"))[0], main.exit_error)
+        for option in ("--near-duplicate-threshold", "--background-fraction"):
+            for value in ("0", "-1", "1.5"):
+                with self.assertRaises(SystemExit) as raised:
+                    self.run_main(self.root, option, value)
+                self.assertEqual(raised.exception.code, main.exit_error)
+
+    def test_detector_selection_and_globs(self):
+        exit_code, output = self.run_main(os.path.join(self.root, "**", "*.feature"), "--detector", "duplicate_step")
+        self.assertEqual(exit_code, main.exit_clean)
+        self.assertIn("DUPLICATE STEP", output)
+        self.assertNotIn("UNTITLED FEATURE", output)
+
+    def test_each_path_is_a_group(self):
+        self.write("other/c.feature", "Feature: A\n")
+        clean, other = os.path.join(self.root, "clean"), os.path.join(self.root, "other")
+        self.assertEqual(self.run_main(clean, other, "--detector", "duplicate_feature_title")[0], main.exit_clean)
+        self.assertEqual(self.run_main(self.root, "--detector", "duplicate_feature_title")[0], main.exit_findings)
+
+        # The reports name the files from the directory of the path
+        output = self.run_main(os.path.join(self.root, "smelly"), "--detector", "untitled_feature")[1]
+        self.assertIn("smelly/b.feature", output)
+        self.assertNotIn(self.root, output)
+
+        # The walk is streamed to the workers, a file still belongs to the first path finding it
+        smelly = os.path.join(self.root, "smelly")
+        outputs = [self.run_main(self.root, smelly, "--jobs", jobs, "--render", "full")[1] for jobs in ("1", "2")]
+        self.assertEqual(outputs[0], outputs[1])
+        output = self.run_main(self.root, smelly, "--jobs", "2", "--detector", "untitled_feature", "--render", "full")[1]
+        self.assertEqual(output.count("smelly/b.feature"), 1)
+
+    def test_csv_format(self):
+        report_dir = os.path.join(self.root, "reports")
+        self.run_main(os.path.join(self.root, "smelly"), "--detector", "untitled_feature", "--format", "csv", "--report-dir", report_dir)
+        self.assertEqual(os.listdir(report_dir), ["untitled_feature.csv"])
+
+    def test_ndjson_format(self):
+        output_filename = os.path.join(self.root, "findings.ndjson")
+        exit_code, output = self.run_main(self.root, "--format", "ndjson", "--output", output_filename)
+        self.assertEqual(exit_code, main.exit_findings)
+        self.assertEqual(output, "")
+        with open(output_filename, encoding="utf-8") as file:
+            findings = [json.loads(line) for line in file]
+        self.assertIn({"detector": "untitled_feature", "file": os.path.join(self.root, "smelly/b.feature"), "line": 1,
+                       "column": None, "severity": "warning", "message": "Feature has no title",
+                       "snippet_hash": snippet_hash("Feature:")}, findings)
+        # The bodies of both scenarios are the same
+        duplicates = [finding for finding in findings if finding["detector"] == "duplicate_test_case"]
+        self.assertEqual(len(duplicates), 2)
+        self.assertEqual(duplicates[0]["snippet_hash"], duplicates[1]["snippet_hash"])
+
+    def test_render_modes(self):
+        smelly = os.path.join(self.root, "smelly")
+        # Standard output is not a terminal here, so no grid by default
+        self.assertIn("Filename\tLine Number", self.run_main(smelly, "--detector", "untitled_feature")[1])
+        self.assertIn("+=====", self.run_main(smelly, "--detector", "untitled_feature", "--render", "full")[1])
+        self.assertIn("- 1 findings", self.run_main(smelly, "--detector", "untitled_feature", "--render", "summary")[1])
+        self.assertEqual(self.run_main(smelly, "--render", "quiet"), (main.exit_findings, ""))
+
+    def test_stats(self):
+        stats_filename = os.path.join(self.root, "stats.json")
+        exit_code, output = self.run_main(self.root, "--render", "quiet", "--stats", "--stats-output", stats_filename, "--trace-memory")
+        self.assertEqual(exit_code, main.exit_findings)
+        self.assertIn("Files/s", output)
+        with open(stats_filename, encoding="utf-8") as file:
+            profile = json.load(file)
+        self.assertTrue(profile["trace_memory"])
+        measures = {measure["stage"]: measure for measure in profile["measures"]}
+        self.assertEqual(measures["untitled_feature"]["findings"], 1)
+        self.assertEqual(measures["untitled_feature"]["files"], 2)
+        self.assertEqual(measures["total"]["findings"], sum(measure["findings"] for measure in profile["measures"]) / 2)
+        self.assertGreater(measures["total"]["bytes"], 0)
+        self.assertGreater(measures["total"]["peak_memory"], 0)
+
+    def test_profile(self):
+        profile_dir = os.path.join(self.root, "profile")
+        exit_code, output = self.run_main(self.root, "--render", "quiet", "--detector", "duplicate_step", "--profile", profile_dir,
+                                          "--profile-top", "2", "--jobs", "2")
+        self.assertEqual(exit_code, main.exit_clean)
+        self.assertIn("duplicate_step.py", output)
+        self.assertEqual(sorted(os.listdir(profile_dir)), ["duplicate_step.folded", "duplicate_step.pstats"])
+        stats = pstats.Stats(os.path.join(profile_dir, "duplicate_step.pstats"))
+        self.assertIn("analyze_duplicate_steps", {name for _, _, name in stats.stats})
+        with open(os.path.join(profile_dir, "duplicate_step.folded"), encoding="utf-8") as file:
+            stacks = file.read().splitlines()
+        self.assertTrue(any(stack.startswith("duplicate_step.py:") for stack in stacks))
+        self.assertTrue(all(stack.rsplit(" ", 1)[1].isdigit() for stack in stacks))
+
+if __name__ == '__main__':
+    unittest.main()
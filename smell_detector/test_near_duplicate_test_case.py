@@ -0,0 +1,67 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+from gherkin_parser import parse_feature_file
+from minhash import find_clusters
+from near_duplicate_test_case import analyze_near_duplicate_test_cases, report_near_duplicate_test_cases, near_duplicate_clusters
+
+def scenario(title, parameter, extra_steps=()):
+    return "\n".join([
+        f"  Scenario: {title}",
+        "    Given a user named alice",
+        "    And the user has 3 books in the cart",
+        f"    When the user pays with {parameter}",
+        "    Then the order is confirmed",
+        "    And an email is sent to the user",
+        "    And the cart is empty",
+        *extra_steps,
+    ])
+
+class TestNearDuplicateTestCases(unittest.TestCase):
+
+    def test_one_parameter_apart(self):
+        feature_file = "\n".join([
+            "Feature: Payments",
+            scenario("Card", "a card"),
+            scenario("Voucher", "a voucher"),
+            "  Scenario: Unrelated",
+            "    Given an empty catalog",
+            "    Then no book is listed",
+        ])
+        test_cases = analyze_near_duplicate_test_cases(parse_feature_file(feature_file))
+        clusters = find_clusters([signature for _, _, signature, _ in test_cases], 0.6)
+        self.assertEqual([members for members, _ in clusters], [[0, 1]])
+
+    def test_whitespace_and_keyword_variants(self):
+        feature_file = "\n".join([
+            "Feature: Payments",
+            scenario("Card", "a card"),
+            scenario("Same card", "a card").replace("    And the cart", "    * the   cart").replace("alice", "Alice"),
+        ])
+        test_cases = analyze_near_duplicate_test_cases(parse_feature_file(feature_file))
+        self.assertEqual(test_cases[0][2], test_cases[1][2])
+
+    def test_report_across_files(self):
+        documents = [
+            parse_feature_file("Feature: One\n" + scenario("Card", "a card")),
+            parse_feature_file("Feature: Two\n" + scenario("Voucher", "a voucher")),
+        ]
+        output = io.StringIO()
+        with redirect_stdout(output):
+            report_near_duplicate_test_cases(["one.feature", "two.feature"], [analyze_near_duplicate_test_cases(document) for document in documents], threshold=0.6)
+        self.assertIn("one.feature:2 - Scenario: Card", output.getvalue())
+        self.assertIn("two.feature:2 - Scenario: Voucher", output.getvalue())
+
+    def test_exact_duplicates_are_left_out(self):
+        documents = [
+            parse_feature_file("Feature: One\n" + scenario("Card", "a card") + "\n" + scenario("Card again", "a card")),
+            parse_feature_file("Feature: Two\n" + scenario("Voucher", "a voucher")),
+        ]
+        analyses = [analyze_near_duplicate_test_cases(document) for document in documents]
+        _, clusters = near_duplicate_clusters(analyses, 0.6)
+        self.assertEqual([members for members, _ in clusters], [[(0, 2, "Scenario: Card"), (0, 9, "Scenario: Card again"), (1, 2, "Scenario: Voucher")]])
+        _, clusters = near_duplicate_clusters(analyses[:1], 0.6)
+        self.assertEqual(clusters, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import cProfile
+import pstats
+import unittest
+from profiling import collapsed_stacks, function_label
+
+def leaf():
+    return sum(range(20000))
+
+def branch():
+    return leaf() + leaf()
+
+def root():
+    return branch() + leaf()
+
+class TestProfiling(unittest.TestCase):
+
+    def test_function_label(self):
+        self.assertEqual(function_label(("/tmp/module.py", 12, "name")), "module.py:12(name)")
+        self.assertEqual(function_label(("~", 0, "<built-in method builtins.len>")), "<built-in method builtins.len>")
+
+    def test_collapsed_stacks(self):
+        profile = cProfile.Profile()
+        profile.runcall(root)
+        stacks = {}
+        for line in collapsed_stacks(pstats.Stats(profile)):
+            stack, weight = line.rsplit(" ", 1)
+            stacks[tuple(frame.split("(")[-1].rstrip(")") for frame in stack.split(";"))] = int(weight)
+
+        # leaf is reached under branch and directly under root, its self time is shared out
+        leaf_paths = [path for path in stacks if path[-1] == "leaf"]
+        self.assertEqual(sorted(leaf_paths), [("root", "branch", "leaf"), ("root", "leaf")])
+        total = pstats.Stats(profile).stats
+        leaf_time = next(entry[2] for function, entry in total.items() if function[2] == "leaf")
+        self.assertAlmostEqual(sum(stacks[path] for path in leaf_paths), leaf_time * 1e6, delta=2)
+
+if __name__ == '__main__':
+    unittest.main()
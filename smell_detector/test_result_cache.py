@@ -0,0 +1,54 @@
+import os
+import shutil
+import tempfile
+import unittest
+import engine
+import untitled_feature
+from untitled_feature import analyze_untitled_feature
+from duplicate_scenario_title import analyze_scenario_titles
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.directory, "cache")
+        self.filename = os.path.join(self.directory, "file1.feature")
+        with open(self.filename, "w", encoding="utf-8") as feature_file:
+            feature_file.write("Feature:\n  Scenario: First scenario\n    Given step 1\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        untitled_feature.analysis_version = 1
+
+    def test_results_are_reused(self):
+        analyzers = [analyze_untitled_feature, analyze_scenario_titles]
+        first_run = engine.analyze_file(self.filename, analyzers, self.cache_dir)
+        self.assertEqual(first_run, [(1, "Feature:"), [("First scenario", 2)]])
+
+        # A cached entry is returned as it was stored, without parsing the file again
+        original_parse = engine.parse_feature_file
+        engine.parse_feature_file = None
+        try:
+            second_run = engine.analyze_file(self.filename, analyzers, self.cache_dir)
+        finally:
+            engine.parse_feature_file = original_parse
+        self.assertEqual(second_run, [[1, "Feature:"], [["First scenario", 2]]])
+
+    def test_version_bump_invalidates_results(self):
+        engine.analyze_file(self.filename, [analyze_untitled_feature], self.cache_dir)
+        untitled_feature.analysis_version = 2
+
+        calls = []
+        def counting_parse(content, needs=None):
+            calls.append(content)
+            return original_parse(content, needs)
+        original_parse = engine.parse_feature_file
+        engine.parse_feature_file = counting_parse
+        try:
+            engine.analyze_file(self.filename, [analyze_untitled_feature], self.cache_dir)
+        finally:
+            engine.parse_feature_file = original_parse
+        self.assertEqual(len(calls), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import io
+import json
+import unittest
+from detector_registry import detectors
+from findings import Finding
+from sarif import SarifWriter
+
+class TestSarif(unittest.TestCase):
+
+    def write_log(self, *finding_groups):
+        stream = io.StringIO()
+        writer = SarifWriter(stream, detectors, root="/work")
+        counts = [writer.write(iter(findings)) for findings in finding_groups]
+        writer.close()
+        return counts, json.loads(stream.getvalue())
+
+    def test_empty_log(self):
+        _, log = self.write_log()
+        self.assertEqual(log["version"], "2.1.0")
+        run = log["runs"][0]
+        self.assertEqual(run["results"], [])
+        self.assertEqual(run["originalUriBaseIds"], {"SRCROOT": {"uri": "file:///work/"}})
+        self.assertEqual([rule["id"] for rule in run["tool"]["driver"]["rules"]], [detector.name for detector in detectors])
+        self.assertEqual(run["tool"]["driver"]["rules"][6]["name"], "ViciousTag")
+
+    def test_results(self):
+        counts, log = self.write_log(
+            [Finding("malformed_test", "/work/project/../project/a.feature", 4, None, "error", "When appears zero times", "abc")],
+            [],
+            [Finding("vicious_tag", "/tmp/b c.feature", 3, 7, "note", "'@slow' appears 2 times on 2 Scenarios", None)],
+        )
+        self.assertEqual(counts, [1, 0, 1])
+        first, second = log["runs"][0]["results"]
+        self.assertEqual(first["ruleIndex"], 9)
+        self.assertEqual(first["level"], "error")
+        self.assertEqual(first["locations"][0]["physicalLocation"],
+                         {"artifactLocation": {"uri": "project/a.feature", "uriBaseId": "SRCROOT"}, "region": {"startLine": 4}})
+        self.assertEqual(first["partialFingerprints"], {"snippetHash/v1": "abc"})
+        self.assertEqual(second["locations"][0]["physicalLocation"],
+                         {"artifactLocation": {"uri": "file:///tmp/b%20c.feature"}, "region": {"startLine": 3, "startColumn": 7}})
+        self.assertNotIn("partialFingerprints", second)
+
+if __name__ == '__main__':
+    unittest.main()
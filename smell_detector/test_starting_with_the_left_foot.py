@@ -0,0 +1,39 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+import rendering
+from findings import snippet_hash
+from gherkin_parser import parse_feature_file
+from starting_with_the_left_foot import (analyze_starting_with_the_left_foot, report_starting_with_the_left_foot,
+                                         iter_starting_with_the_left_foot_findings)
+
+feature_file = "\n".join([
+    "Feature: Example feature",
+    "  Scenario: First scenario",
+    "    Then it works",
+    "",
+    "  Scenario: Second scenario",
+    "    Given step 1",
+    "    Then it works",
+])
+scenario = "\n".join(feature_file.split("\n")[1:3])
+
+class TestStartingWithTheLeftFoot(unittest.TestCase):
+
+    def test_scenarios_are_read_back(self):
+        analysis = analyze_starting_with_the_left_foot(parse_feature_file(feature_file))
+        output = io.StringIO()
+        with mock.patch.object(rendering, "mode", "full"), redirect_stdout(output):
+            self.assertEqual(report_starting_with_the_left_foot(["a.feature"], [analysis], read_source=lambda name: feature_file), 1)
+        self.assertIn("a.feature:2", output.getvalue())
+        self.assertIn("Scenario: First scenario", output.getvalue())
+        self.assertNotIn("Second scenario", output.getvalue())
+
+    def test_findings_hash_the_scenario(self):
+        analysis = analyze_starting_with_the_left_foot(parse_feature_file(feature_file))
+        findings = list(iter_starting_with_the_left_foot_findings(["a.feature"], [analysis]))
+        self.assertEqual(findings, [("a.feature", 2, None, "Scenario does not start with a Given or When step", snippet_hash(scenario))])
+
+if __name__ == '__main__':
+    unittest.main()
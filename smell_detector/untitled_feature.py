@@ -1,7 +1,11 @@
-import re
 import csv
 import os
-from tabulate import tabulate
+from rendering import render_table
+from gherkin_parser import iter_feature_files
+from findings import snippet_hash
+
+# Bump whenever a change to the analysis can change the per-file results kept in the cache
+analysis_version = 1
 
 def find_untitled_features(filenames, feature_files, csv_filename=None):
     """
@@ -10,31 +14,59 @@ def find_untitled_features(filenames, feature_files, csv_filename=None):
     
     Args:
     - filenames (list of str): The names of the feature files.
-    - feature_files (list of str): The content of the feature files.
+    - feature_files (list of str or Document): The content of the feature files.
     - csv_filename (str, optional): The name of the CSV file to save results.
     
     Returns:
     - None
     """
-    pattern = r"Feature:\s*$"  # "Feature:" followed by whitespace, and end of line
+    # Documents are parsed and analyzed one at a time and the reports only keep the results
+    documents = iter_feature_files(feature_files)
+    report_untitled_features(filenames, (analyze_untitled_feature(document) for document in documents), csv_filename)
+
+def analyze_untitled_feature(document):
+    """
+    Looks for an untitled feature in a single parsed feature file.
+
+    Args:
+    - document (Document): The parsed feature file.
+
+    Returns:
+    - tuple or None: Line number and matched line of the untitled feature, if any.
+    """
+    feature = document.feature
+    if feature and feature.keyword and not feature.title:
+        return feature.line, document.lines[feature.line - 1].lstrip()
+    return None
+
+def report_untitled_features(filenames, analyses, csv_filename=None):
+    """
+    Merges the per-file results of analyze_untitled_feature and reports them.
+
+    Args:
+    - filenames (list of str): The names of the feature files.
+    - analyses (iterable): The result of analyze_untitled_feature for each file, in the same order.
+    - csv_filename (str, optional): The name of the CSV file to save results.
+
+    Returns:
+    - int: Number of findings reported.
+    """
     results = []
 
-    for index, (feature_file, filename) in enumerate(zip(feature_files, filenames)):
-        for line_number, line in enumerate(feature_file.splitlines(), start=1):
-            match = re.search(pattern, line)
-            if match:
-                results.append((filename, line_number, line.lstrip()))  # Store filename, line number, and matched line
-                break
+    for filename, analysis in zip(filenames, analyses):
+        if analysis:
+            line_number, line = analysis
+            results.append((filename, line_number, line))  # Store filename, line number, and matched line
 
     if results:
         # Print the table
-        print(tabulate(results, headers=["Filename", "Line Number", "Matched Line"], tablefmt="grid"))
+        render_table(results, ["Filename", "Line Number", "Matched Line"])
 
         # Generate CSV if filename is provided
         if csv_filename:
-            report_dir = './reports'
-            if not os.path.exists(report_dir):
-                os.mkdir(report_dir)
+            report_dir = os.path.dirname(csv_filename)
+            if report_dir and not os.path.exists(report_dir):
+                os.makedirs(report_dir)
             file_exists = os.path.isfile(csv_filename)  # Check if file already exists
             with open(csv_filename, mode='a', newline='', encoding='utf-8') as csvfile:
                 csv_writer = csv.writer(csvfile)
@@ -45,6 +77,26 @@ def find_untitled_features(filenames, feature_files, csv_filename=None):
     else:
         print("No untitled features found.")
 
+    return len(results)
+
+def iter_untitled_feature_findings(filenames, analyses):
+    """
+    Yields the untitled features from the per-file results of analyze_untitled_feature, as
+    the results arrive.
+
+    Args:
+    - filenames (list of str): The names of the feature files.
+    - analyses (iterable): The result of analyze_untitled_feature for each file, in the same order.
+
+    Returns:
+    - generator of tuples: Filename, line, column (None, not tracked), message and snippet
+      hash of each finding.
+    """
+    for filename, analysis in zip(filenames, analyses):
+        if analysis:
+            line_number, line = analysis
+            yield filename, line_number, None, "Feature has no title", snippet_hash(line)
+
 # Example usage
 def run_example():
     feature_file_names = [
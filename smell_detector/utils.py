@@ -42,13 +42,3 @@ def title(title, color):
         print(f"{colors.BWhite}+{dashes}+{colors.Color_Off}")
         print(f"{colors.BWhite}| {title.upper()} |{colors.Color_Off}")
         print(f"{colors.BWhite}+{dashes}+{colors.Color_Off}")
-
-def start_test():
-    print(f"{colors.BGreen}+---------------+{colors.Color_Off}")
-    print(f"{colors.BGreen}| STARTING TEST |{colors.Color_Off}")
-    print(f"{colors.BGreen}+---------------+{colors.Color_Off}")
-
-def finish_test():
-    print(f"{colors.BRed}+----------------+{colors.Color_Off}")
-    print(f"{colors.BRed}| FINISHING TEST |{colors.Color_Off}")
-    print(f"{colors.BRed}+----------------+{colors.Color_Off}")
\ No newline at end of file
@@ -1,7 +1,26 @@
 import csv
 import os
-import re
-from tabulate import tabulate
+from rendering import render_table, rows_needed
+from gherkin_parser import iter_feature_files
+
+# Bump whenever a change to the analysis can change the per-file results kept in the cache
+analysis_version = 3
+
+
+class ViciousTags:
+    """
+    The tags repeated on every rule or scenario of a file: its id, the tag, number of
+    occurrences and line and column of the first occurrence of each of them, the number of
+    rules or scenarios and their type.
+    """
+    __slots__ = ("file_id", "tags", "scenarios", "type")
+
+    def __init__(self, file_id, tags, scenarios, type):
+        self.file_id = file_id
+        self.tags = tags
+        self.scenarios = scenarios
+        self.type = type
+
 
 def find_vicious_tags(feature_filenames, feature_files, csv_filename=None):
     """
@@ -9,72 +28,79 @@ def find_vicious_tags(feature_filenames, feature_files, csv_filename=None):
 
     Args:
     - feature_filenames (list of str): The names of the feature files.
-    - feature_files (list of str): The content of the feature files.
+    - feature_files (list of str or Document): The content of the feature files.
     - csv_filename (str, optional): Name of the CSV file to save the report.
 
     Returns:
     - None
     """
+    # Documents are parsed and analyzed one at a time and the reports only keep the results
+    documents = iter_feature_files(feature_files)
+    report_vicious_tags(feature_filenames, (analyze_vicious_tags(document) for document in documents), csv_filename)
 
-    rule_tag_pattern = r"((?:@[\S]+\s*)+)(?=\s*Rule:)"
-    scenario_tag_pattern = r"((?:@[\S]+\s*)+)(?=\s*Scenario:)"
-    scenario_outline_tag_pattern = r"((?:@[\S]+\s*)+)(?=\s*Scenario Outline:)"
-    example_tag_pattern = r"((?:@[\S]+\s*)+)(?=\s*Example:)"
-    # TODO: Implement for examples in the same Scenario Outline
 
-    total_rules = []
-    total_scenarios = []
+def analyze_vicious_tags(document):
+    """
+    Finds the vicious tags in a single parsed feature file.
+
+    Args:
+    - document (Document): The parsed feature file.
 
-    total_rule_pattern = r"^\s*(Rule:)\s*(.+)$"
-    total_scenario_pattern = r"^\s*(Scenario:|Example:|Scenario Outline:)\s*(.+)$"
+    Returns:
+    - tuple: Registers found in the file, as the (tag, count, line, column) of each vicious
+      tag, the position being the one of its first occurrence, the number of rules or
+      scenarios and their type, and their number of occurrences.
+    """
+    # TODO: Implement for examples in the same Scenario Outline
 
     vicious_tags = []
-    total_vicious_tags = 0
-    for feature_index, (filename, feature_file) in enumerate(zip(feature_filenames, feature_files)):
-        lines = feature_file.splitlines()
-        for idx, line in enumerate(lines, start=1):  # Enumerate lines with 1-based index
-            # Match Rule, Scenario, Example, and Scenario Outline titles
-            match_structure(line, total_rules, total_rule_pattern)
-            match_structure(line, total_scenarios, total_scenario_pattern)
 
-        # Find tags into feature
-        rules = re.findall(rule_tag_pattern, feature_file)
-        scenarios = re.findall(scenario_tag_pattern, feature_file)
-        scenarios_outline = re.findall(scenario_outline_tag_pattern, feature_file)
-        examples = re.findall(example_tag_pattern, feature_file)
+    # Tags written right above each Rule, Scenario, Scenario Outline and Example
+    rules = [rule.tags for rule in document.rules if rule.tags]
+    total_tagged_scenarios_feature = [scenario.tags for scenario in document.scenarios if scenario.tags]
 
-        rules = [t.strip() for t in rules if t.strip()]
-        scenarios = [t.strip() for t in scenarios if t.strip()]
-        scenarios_outline = [t.strip() for t in scenarios_outline if t.strip()]
-        examples = [t.strip() for t in examples if t.strip()]
+    total_vicious_tags = vicious_analysis(rules, vicious_tags, len(document.rules), 0, 'Rule')
+    total_vicious_tags = vicious_analysis(total_tagged_scenarios_feature, vicious_tags, len(document.scenarios), total_vicious_tags, 'Scenario')
+    return vicious_tags, total_vicious_tags
 
-        # Calculating all scenarios into feature
-        total_tagged_scenarios_feature = scenarios + scenarios_outline + examples
 
-        total_vicious_tags = vicious_analysis(filename, rules, vicious_tags, len(total_rules), total_vicious_tags, 'Rule')
-        total_vicious_tags = vicious_analysis(filename, total_tagged_scenarios_feature, vicious_tags, len(total_scenarios), total_vicious_tags, 'Scenario')
+def report_vicious_tags(feature_filenames, analyses, csv_filename=None):
+    """
+    Merges the per-file results of analyze_vicious_tags and reports them.
 
-        total_rules.clear()
-        total_scenarios.clear()
+    Args:
+    - feature_filenames (list of str): The names of the feature files.
+    - analyses (iterable): The result of analyze_vicious_tags for each file, in the same order.
+    - csv_filename (str, optional): Name of the CSV file to save the report.
 
-    if vicious_tags:
-        # Transforming vicious_tags into a string
-        for register in vicious_tags:
-            register["vicious_tag"] = '\n'.join(register["vicious_tag"])
+    Returns:
+    - int: Number of findings reported.
+    """
+    vicious_tags = []
+    total_vicious_tags = 0
+    for file_id, (registers, total) in enumerate(analyses):
+        for tags, scenarios, type in registers:
+            vicious_tags.append(ViciousTags(file_id, tags, scenarios, type))
+        total_vicious_tags += total
 
-        report_data = [
-            [vicious_tag["filename"], vicious_tag["vicious_tag"], vicious_tag["scenarios"], vicious_tag["type"]]
-            for vicious_tag in vicious_tags
-        ]
+    if vicious_tags:
+        # The filenames and tags are only formatted here, when shown or saved
+        report_data = None
+        if rows_needed(csv_filename):
+            report_data = [
+                [feature_filenames[vicious_tag.file_id], '\n'.join(tag_message(tag, count) for tag, count, _, _ in vicious_tag.tags),
+                 vicious_tag.scenarios, vicious_tag.type]
+                for vicious_tag in vicious_tags
+            ]
 
         print(f"- Total number of vicious tags: {total_vicious_tags}")
-        print(tabulate(report_data, headers=["Filename", "Vicious Tag", "Scenarios", "Type"], tablefmt="grid"))
+        render_table(report_data, ["Filename", "Vicious Tag", "Scenarios", "Type"], count=len(vicious_tags))
 
         # Generate CSV if filename is provided
         if csv_filename:
-            report_dir = './reports'
-            if not os.path.exists(report_dir):
-                os.mkdir(report_dir)
+            report_dir = os.path.dirname(csv_filename)
+            if report_dir and not os.path.exists(report_dir):
+                os.makedirs(report_dir)
 
             file_exists = os.path.isfile(csv_filename)  # Check if file already exists
             with open(csv_filename, mode='a', newline='', encoding='utf-8') as csvfile:
@@ -86,54 +112,61 @@ def find_vicious_tags(feature_filenames, feature_files, csv_filename=None):
     else:
         print("No registers with vicious tags.")
 
+    return len(vicious_tags)
 
-def match_structure(line, total_list, pattern):
-    match = re.match(pattern, line)
-    if match:
-        _, title_name = match.groups()  # Extract the title part after the colon
-        normalized_title = title_name.strip()  # Normalize by trimming whitespace
 
-        total_list.append(normalized_title)
+def iter_vicious_tag_findings(feature_filenames, analyses):
+    """
+    Yields each tag repeated on every rule or scenario of a file, from the per-file results of
+    analyze_vicious_tags, as the results arrive.
 
+    Args:
+    - feature_filenames (list of str): The names of the feature files.
+    - analyses (iterable): The result of analyze_vicious_tags for each file, in the same order.
+
+    Returns:
+    - generator of tuples: Filename, line and column of the first occurrence of the tag,
+      message and snippet hash (None, the tags are in the message) of each finding.
+    """
+    for filename, (registers, _) in zip(feature_filenames, analyses):
+        for tags, scenarios, type in registers:
+            for tag, count, line, column in tags:
+                yield filename, line, column, f"{tag_message(tag, count)} on {scenarios} {type}s", None
 
-def vicious_analysis(filename, registers, vicious_tags, total_scenarios, total_vicious_tags, type):
-    tags_scenarios_feature = []
 
-    for register_index, register in enumerate(registers):
-        register = register.strip()
-        tags = re.findall(r'@[\S]+', register)
+def tag_message(tag, count):
+    return f"'{tag}' appears {count} times"
 
-        tags_scenarios_feature.append(tags)
 
-    vicious_counts = vicious_counter(tags_scenarios_feature)
+def vicious_analysis(registers, vicious_tags, total_scenarios, total_vicious_tags, type):
+    vicious_counts = vicious_counter(registers)
 
-    total_vicious_tags = vicious_structure(filename, vicious_counts, vicious_tags,
+    total_vicious_tags = vicious_structure(vicious_counts, vicious_tags,
                                            total_scenarios, total_vicious_tags, type)
     return total_vicious_tags
 
 
-def vicious_counter(tags_scenarios_feature):
+def vicious_counter(registers):
+    # Number of occurrences and first occurrence of each tag name
     tag_counts = {}
-    for tags_scenario in tags_scenarios_feature:
-        for tag in tags_scenario:
-            tag_counts[tag] = tag_counts.get(tag, 0) + 1
+    for tags in registers:
+        for tag in tags:
+            if tag.name in tag_counts:
+                tag_counts[tag.name][0] += 1
+            else:
+                tag_counts[tag.name] = [1, tag]
     return tag_counts
 
 
-def vicious_structure(filename, vicious_counts, vicious_tags, total_scenarios, total_vicious_tags, type):
+def vicious_structure(vicious_counts, vicious_tags, total_scenarios, total_vicious_tags, type):
     vicious_tag = []
-    for tag, count in vicious_counts.items():
+    for name, (count, first_tag) in vicious_counts.items():
         if count >= total_scenarios > 1:
-            vicious_tag.append(f"'{tag}' appears {count} times")
+            vicious_tag.append((name, count, first_tag.line, first_tag.column))
             total_vicious_tags += count
 
     if vicious_tag:
-        vicious_tags.append({
-            "filename": filename,
-            "vicious_tag": vicious_tag,
-            "scenarios": total_scenarios,
-            "type": type
-        })
+        vicious_tags.append((vicious_tag, total_scenarios, type))
     return total_vicious_tags
 
 